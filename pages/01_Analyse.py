@@ -1,13 +1,10 @@
 import streamlit as st
+
 import pandas as pd
-import plotly.express as px
-from pathlib import Path
 
-# ------------------------------------------------------------
-# Pfade korrekt auflösen (wichtig, da Datei im pages/ Ordner liegt)
-# ------------------------------------------------------------
-BASE_DIR = Path(__file__).resolve().parents[1]
-DATA_PATH = BASE_DIR / "data" / "processed" / "df_cleaned_full.csv"
+from src.analyse_figures import DATA_PATH, get_analyse_figure, history_years
+from src.peak_detector import load_events
+from src.versioning import file_version
 
 # ------------------------------------------------------------
 # Seiteneinstellungen
@@ -18,12 +15,17 @@ st.set_page_config(
     layout="wide"
 )
 
-st.title("📈 Wie globale Streaming‑Peaks entstehen (2024–2025)")
+# Figuren kommen aus dem Cache, gebaut pro Datenversion
+data_version = file_version(DATA_PATH)
+# Zeitraum aus der Historie (wächst mit jedem Upload)
+years = history_years(data_version, DATA_PATH)
+
+st.title(f"📈 Wie globale Streaming‑Peaks entstehen ({years})")
 
 st.header("💥 Warum das Streaming explodiert und wann")
-st.markdown("""
+st.markdown(f"""
 Diese Analyse zeigt die drei zentralen Marktmechaniken, die das globale 
-Streaming‑Volumen prägen. Anhand der aggregierten Spotify‑Charts (2024–2025) 
+Streaming‑Volumen prägen. Anhand der aggregierten Spotify‑Charts ({years}) 
 lassen sich klare Muster erkennen, die erklären, **warum Peaks entstehen, 
 wie sie sich unterscheiden und welche Dynamiken dahinterstehen.**
 """)
@@ -31,113 +33,41 @@ wie sie sich unterscheiden und welche Dynamiken dahinterstehen.**
 st.markdown("---")
 
 # ------------------------------------------------------------
-# Daten laden
+# Figuren (aus dem Cache)
 # ------------------------------------------------------------
-df = pd.read_csv(DATA_PATH, parse_dates=["chart_week"])
-seasonal_trends = df.groupby("chart_week")["streams"].sum().reset_index()
+def show_figure(name):
+    st.plotly_chart(get_analyse_figure(name, data_version, DATA_PATH), use_container_width=True)
 
 # ------------------------------------------------------------
 # Abschnitt: Marktmechaniken
 # ------------------------------------------------------------
-fig = px.line(
-    seasonal_trends,
-    x="chart_week",
-    y="streams",
-    title="Globale Streaming‑Trends & Key Events (2024–2025)",
-    labels={"streams": "Gesamt‑Streams", "chart_week": "Woche"},
-    template="plotly_dark"
-)
-
-# Superstar‑Releases
-fig.add_annotation(
-    x="2024-04-25", y=3605841989,
-    text="Taylor Swift: Album Release (TTPD)",
-    showarrow=True, arrowhead=2, opacity=0.8,
-    ax=-60, ay=-40, bgcolor="#636EFA", bordercolor="white"
-)
-
-fig.add_annotation(
-    x="2025-10-09", y=3205166486,
-    text="Swift: Single (TFoO) & Album (TLoS)",
-    showarrow=True, arrowhead=2, opacity=0.8,
-    ax=-90, ay=-60, bgcolor="#00CC96", bordercolor="white"
-)
-
-# Sommerhits
-fig.add_annotation(
-    x="2024-05-23", y=3184277186,
-    text="Sommerhits",
-    showarrow=True, arrowhead=2, opacity=0.9,
-    ax=50, ay=-40, bgcolor="#FF8C00", bordercolor="white"
-)
-
-# Weihnachten
-fig.add_annotation(
-    x="2024-12-26", y=3893017659,
-    text="Weihnachtshits '24",
-    showarrow=True, arrowhead=2, opacity=0.8,
-    ax=0, ay=-50, bgcolor="#EF553B", bordercolor="white"
-)
-
-fig.add_annotation(
-    x="2025-12-25", y=3667133246,
-    text="Weihnachtshits '25",
-    showarrow=True, arrowhead=2, opacity=0.8,
-    ax=-40, ay=-60, bgcolor="#EF553B", bordercolor="white"
-)
-
-fig.update_traces(line_color="#1DB954", line_width=2)
-
-# Plot anzeigen
-st.plotly_chart(fig, use_container_width=True)
+show_figure("global_trend")
+
+# Erkannte Peaks (vom Online-Detektor gespeichert, Grundlage der Annotationen)
+peak_events = load_events()
+if peak_events:
+    with st.expander(f"📍 Automatisch erkannte Peaks ({len(peak_events)})"):
+        st.dataframe(
+            pd.DataFrame([{
+                "Woche": event["week"],
+                "Art": "Saisonal" if event["kind"] == "seasonal" else "Anomalie",
+                "Über Niveau": f"+{event['lift']:.0%}",
+                "Robuster z-Wert": event["z"],
+                "Top-Künstler (Zuwachs)": ", ".join(
+                    f"{a['name']} (+{a['gain'] / 1e6:.0f} Mio.)" for a in event["top_artists"]
+                ),
+                "Top-Tracks": ", ".join(t["name"] for t in event["top_tracks"]),
+            } for event in peak_events]),
+            hide_index=True,
+            use_container_width=True
+        )
 
 st.divider()
 
-# ------------------------------------------------------------
-# Peak-Wochen identifizieren
-# ------------------------------------------------------------
-
-# Durchschnitt und Standardabweichung der Streams berechnen
-mean_streams = seasonal_trends['streams'].mean()
-std_streams = seasonal_trends['streams'].std()
-
-# Threshold definieren: alles, was mehr als 1.5 Standardabweichungen über dem Durchschnitt liegt
-threshold = mean_streams + 1.5 * std_streams
-
-# Peak-Wochen identifizieren
-peaks = seasonal_trends[seasonal_trends['streams'] > threshold]
-
-# Liste der identifizierten Peak-Wochen erstellen
-peak_dates = peaks['chart_week'].tolist()
-
 # ------------------------------------------------------------
 # Visualisierung: Top 10 Künstler in den Peak-Wochen
 # ------------------------------------------------------------
-
-# Daten für die Peak-Wochen filtern
-peak_df_details = df[df['chart_week'].isin(peak_dates)]
-top_artists_peaks = peak_df_details[peak_df_details['rank'] <= 10]
-
-fig_peaks = px.bar(
-    top_artists_peaks,
-    x="chart_week",
-    y="streams",
-    color="artist_names",
-    title="Wer dominierte die Spitzenwochen im Streaming? (Top 10 Künstler)",
-    hover_data=["track_name"],
-    labels={
-        "streams": "Gesamt‑Streams",
-        "chart_week": "Woche",
-        "artist_names": "Künstler"
-    },
-    template="plotly_dark"
-)
-
-fig_peaks.update_traces(marker_line_color="black", marker_line_width=1) 
-
-fig_peaks.update_layout(barmode="stack")
-
-st.plotly_chart(fig_peaks, use_container_width=True)
+show_figure("peak_weeks")
 
 # ------------------------------------------------------------
 # Marktmechaniken erklären
@@ -223,83 +153,24 @@ Wettbewerb verteilt ist.
 
 st.markdown("---")
 
-# ------------------------------------------------------------
-# TOP 10 Künstler pro Woche
-# ------------------------------------------------------------
-top_artists_weekly = df[df['rank'] <= 10] \
-    .groupby(['chart_week', 'artist_names'])['streams'] \
-    .sum().reset_index()
-
-# Anzahl eines Künstlers in den TOP 10 pro Woche
-top_artists_count = top_artists_weekly \
-    .groupby(['chart_week', 'artist_names']) \
-    .size().reset_index(name='dominance')
-
-top_artists_count = top_artists_count.sort_values('chart_week')
-
-# ------------------------------------------------------------
-# TOP 5 Künstler für übersichtliche Visualisierung
-# ------------------------------------------------------------
-top_overall_artists = df.groupby('artist_names')['streams'] \
-    .sum().nlargest(5).index
-
-df_filtered = top_artists_weekly[
-    top_artists_weekly['artist_names'].isin(top_overall_artists)
-]
-
 # ------------------------------------------------------------
 # Area‑Chart: Dominanz der Top‑Künstler
 # ------------------------------------------------------------
-fig_area = px.area(
-    df_filtered,
-    x="chart_week",
-    y="streams",
-    color="artist_names",
-    title="Wöchentliche Dominanz der Top‑Künstler",
-    labels={
-        'streams': 'Streams in den Top 10',
-        'chart_week': 'Woche',
-        'artist_names': 'Künstler'
-    },
-    template="plotly_dark",
-    line_group="artist_names"
-)
-
-st.plotly_chart(fig_area, use_container_width=True)
+show_figure("dominance_area")
 
 st.markdown("---")
 
 # ------------------------------------------------------------
 # Diversität: Anzahl eindeutiger Künstler pro Woche
 # ------------------------------------------------------------
-diversity_analysis = df[df['rank'] <= 10] \
-    .groupby('chart_week')['artist_names'] \
-    .nunique().reset_index()
-
-diversity_analysis.columns = ['chart_week', 'unique_artists']
-
-fig_div = px.bar(
-    diversity_analysis,
-    x='chart_week',
-    y='unique_artists',
-    title='Chart‑Diversität: Anzahl eindeutiger Künstler in den Top 10',
-    labels={
-        'unique_artists': 'Anzahl verschiedener Künstler',
-        'chart_week': 'Woche'
-    },
-    template='plotly_dark',
-    color='unique_artists',
-    color_continuous_scale='RdYlGn'
-)
+show_figure("diversity_bars")
 
-fig_div.add_hline(
-    y=10,
-    line_dash='dash',
-    line_color='white',
-    annotation_text='Max. Diversität'
-)
+st.markdown("---")
 
-st.plotly_chart(fig_div, use_container_width=True)
+# ------------------------------------------------------------
+# Konzentration: Herfindahl-Index über alle Chart-Positionen
+# ------------------------------------------------------------
+show_figure("concentration_lines")
 
 # ------------------------------------------------------------
 # Interpretation der Marktmechaniken
@@ -359,7 +230,7 @@ with st.expander("🔍 Wie Dominanz und Vielfalt den Markt formen"):
     
     **Was die Grafik zeigt:**
     - Das Volumen bleibt relativ konstant.
-    - Die Diversität erreicht häufig den Maximalwert. 
+    - Die Diversität erreicht ihre höchsten Werte. 
     - Viele Künstler teilen sich die Top 10.
     
     **Interpretation:**  
@@ -381,89 +252,17 @@ Dieser Abschnitt untersucht, wie sich Marktanteile der führenden Künstler übe
 und welche Dynamiken hinter nachhaltigem Wachstum oder kurzfristigen Hype‑Peaks stehen.
 """)
 
-# ------------------------------------------------------------
-# Daten vorbereiten
-# ------------------------------------------------------------
-
-# Auf TOP 10 jeder Woche filtern
-top_10_weekly = df[df['rank'] <= 10].copy()
-
-# Summe der Streams pro Woche
-weekly_total = top_10_weekly.groupby('chart_week')['streams'].sum()
-
-# Stream‑Share pro Künstler und Woche
-artist_dominance = top_10_weekly.groupby(['chart_week', 'artist_names'])['streams'] \
-    .sum().reset_index()
-
-artist_dominance['stream_share'] = artist_dominance.apply(
-    lambda row: (row['streams'] / weekly_total[row['chart_week']]) * 100,
-    axis=1
-)
-
-# Top‑Künstler auswählen
-top_artist_list = artist_dominance.groupby('artist_names')['streams'] \
-    .mean().nlargest(10).index
-
-df_growth = artist_dominance[
-    artist_dominance['artist_names'].isin(top_artist_list)
-].copy()
-
-# Rolling Mean (4 Wochen)
-df_growth['rolling_avg'] = df_growth.groupby('artist_names')['stream_share'] \
-    .transform(lambda x: x.rolling(window=4, min_periods=1).mean())
-
-# Wachstumsrate
-df_growth['growth_rate'] = df_growth.groupby('artist_names')['stream_share'] \
-    .transform(lambda x: x.pct_change() * 100)
-
-# Cleanup
-df_growth['growth_rate'] = df_growth['growth_rate'] \
-    .replace([float('inf'), -float('inf')], 0).fillna(0)
-
-st.markdown("---")
-
 # ------------------------------------------------------------
 # Visualisierung 1: Rolling Mean
 # ------------------------------------------------------------
-fig_rolling = px.line(
-    df_growth,
-    x='chart_week',
-    y='rolling_avg',
-    color='artist_names',
-    title='Geglätteter Trend: 4‑Wochen Rolling Mean des Marktanteils',
-    labels={
-        'rolling_avg': 'Marktanteil (4W‑Schnitt %)',
-        'artist_names': 'Künstler',
-        'chart_week': 'Woche'
-    },
-    template='plotly_dark'
-)
-
-st.plotly_chart(fig_rolling, use_container_width=True)
+show_figure("rolling_share")
 
 st.markdown("---")
 
 # ------------------------------------------------------------
 # Visualisierung 2: Growth Dynamics
 # ------------------------------------------------------------
-fig_growth = px.scatter(
-    df_growth,
-    x='chart_week',
-    y='growth_rate',
-    color='artist_names',
-    size='stream_share',
-    title='Wachstums‑Dynamik: Wer explodiert in den Charts?',
-    labels={
-        'growth_rate': 'Wachstumsrate (%)',
-        'chart_week': 'Woche',
-        'artist_names': 'Künstler'
-    },
-    template='plotly_dark'
-)
-
-fig_growth.add_hline(y=0, line_dash="dash", line_color="gray")
-
-st.plotly_chart(fig_growth, use_container_width=True)
+show_figure("growth_scatter")
 
 # ------------------------------------------------------------
 # Interpretation (Expander)
@@ -10,12 +10,22 @@ import time
 import math
 
 # ____ Pipeline-Module _____
-from src.extraction_unique_entities import prepare_unique_tracks
-from src.spotify_client import SpotifyClient
+# Schwere Abhängigkeiten (requests/tqdm, Prophet/LightGBM, google-genai) werden
+# erst in dem Schritt importiert, der sie benötigt (siehe src/startup_profile.py).
+from src.extraction_unique_entities import prepare_regions
 from src.merge_dataframes import merge_new_data
 from src.features import build_features, genre_parser
-from src.predict_pipeline import run_prediction_pipeline
-from src.trend_reports import generate_gemini_report
+from src.genre_heatmap import get_genre_week_matrix, genre_heatmap_figure
+from src.track_index import get_track_index
+from src.weekly_topk import build_weekly_topk, get_topk, last_hist_week, first_future_week
+from src.artist_credits import primary_artist
+from src.concentration import concentration_frame
+from src.versioning import data_version, model_version
+from src.forecast_horizon import build_forecast_horizon
+from src.granularity import extract_granularity_from_filename, write_daily_partition, rollup_daily_to_weekly
+from src.model_registry import active_artefacts, load_registry
+from src.explanations import Explanations, contribution_figure
+from src.instrumentation import new_run, recent_records, resume_run, stage, summarize
 
 # ------------------------------------------------------------ 
 # Basisverzeichnisse 
@@ -26,6 +36,8 @@ RAW_DIR = DATA_DIR / "raw"
 INTERIM_DIR = DATA_DIR / "interim" 
 PROCESSED_DIR = DATA_DIR / "processed" 
 BACKUP_DIR = DATA_DIR / "backups" 
+DAILY_DIR = PROCESSED_DIR / "daily" 
+ROLLUP_DIR = PROCESSED_DIR / "rollups" 
 MODEL_DIR = BASE_DIR / "models" 
 
 for d in [RAW_DIR, INTERIM_DIR, BACKUP_DIR]: 
@@ -43,11 +55,13 @@ st.set_page_config(
 # ------------------------------------------------------------
 # Modell-Check
 # ------------------------------------------------------------
+# Aktive Version laut models/registry.json (ohne Registry: v1 aus dem Notebook)
+ACTIVE_ARTEFACTS = active_artefacts(MODEL_DIR)
 MODEL_FILES = {
-    "Prophet": "models/market_trend_prophet_v1.json",
-    "LightGBM": "models/rising_artist_lgbm_v1.txt",
-    "Threshold": "models/rising_artist_threshold.json",
-    "Feature Columns": "models/rising_artist_features.json"
+    "Prophet": ACTIVE_ARTEFACTS["prophet"],
+    "LightGBM": ACTIVE_ARTEFACTS["lgbm"],
+    "Threshold": ACTIVE_ARTEFACTS["threshold"],
+    "Feature Columns": ACTIVE_ARTEFACTS["features"]
 }
 
 missing_models = [name for name, path in MODEL_FILES.items() if not Path(path).exists()]
@@ -69,51 +83,80 @@ if missing_models:
         st.sidebar.write(f"• {m}")
 else:
     st.sidebar.success("System bereit!")
-    st.sidebar.caption("Alle Modelle geladen.")
+    st.sidebar.caption(f"Alle Modelle geladen (Version {load_registry(MODEL_DIR)['active']}).")
 
 # ------------------------------------------------------------
 # Datei-Upload 
 # ------------------------------------------------------------
 st.header("📁 Neue Chart-Daten hochladen")
-uploaded_file = st.file_uploader(
-    "Wähle die aktuelle Spotify-Charts CSV (Download von charts.spotify.com)",
-    type="csv"
+uploaded_files = st.file_uploader(
+    "Wähle die aktuellen Spotify-Charts CSVs (Download von charts.spotify.com, eine Datei pro Region)",
+    type="csv",
+    accept_multiple_files=True
 )
 
-if uploaded_file is None:
+if not uploaded_files:
     st.info("Bitte lade eine CSV-Datei hoch, um die Analyse zu starten.")
     st.stop()
 
 # ------------------------------------------------------------ 
-# Datei speichern 
+# Datei speichern & Schritt 1 ausführen (nur bei neuen Dateien)
 # ------------------------------------------------------------
-# Dateiname für raw_ "_origin" anhängen
-file_path_raw = Path(uploaded_file.name)
-origin_name = f"{file_path_raw.stem}_origin{file_path_raw.suffix}"
+# Nur bei neuen Dateien: Reruns durch Widgets schreiben und messen nichts erneut
+upload_key = tuple((f.name, f.size) for f in uploaded_files)
+
+if st.session_state.get("upload_key") != upload_key:
+    raw_paths = []
+    for uploaded_file in uploaded_files:
+        # Dateiname für raw_ "_origin" anhängen
+        file_path_raw = Path(uploaded_file.name)
+        origin_name = f"{file_path_raw.stem}_origin{file_path_raw.suffix}"
+
+        # Ursprungsdatei ohne Änderung in raw
+        raw_path = RAW_DIR / origin_name
+
+        with open(raw_path, "wb") as f: 
+            f.write(uploaded_file.getbuffer())
+        raw_paths.append(raw_path)
+
+    # Jeder neue Upload ist ein Messlauf (siehe Performance-Panel)
+    upload_run_id = new_run("upload")
+
+    try:
+        with stage("upload.extract", rows=len(raw_paths)):
+            extracted = prepare_regions(
+                input_paths=raw_paths, 
+                processed_dir=PROCESSED_DIR, 
+                output_dir=INTERIM_DIR
+            )
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
 
-# Ursprungsdatei ohne Änderung in raw
-raw_path = RAW_DIR / origin_name
+    st.session_state["upload_key"] = upload_key
+    st.session_state["upload_run_id"] = upload_run_id
+    st.session_state["upload_raw_paths"] = raw_paths
+    st.session_state["upload_extracted"] = extracted
 
-with open(raw_path, "wb") as f: 
-    f.write(uploaded_file.getbuffer())
+raw_paths = st.session_state["upload_raw_paths"]
+processed_paths, unique_path, date_str = st.session_state["upload_extracted"]
 
-st.success(f"Datei wurde erfolgreich hochgeladen.")
-st.caption(f"Speicherort der Originaldatei: `{raw_path}`")
+st.success(f"{len(raw_paths)} Datei(en) wurden erfolgreich hochgeladen.")
+st.caption(f"Speicherort der Originaldateien: `{RAW_DIR}`")
 
 # ------------------------------------------------------------ 
-# Schritt 1: Unique Tracks extrahieren 
+# Schritt 1: Unique Tracks extrahieren (pro Region parallel)
 # ------------------------------------------------------------
 st.subheader("🔍 Titel & Künstler automatisch erkennen")
 
-processed_path, unique_path, date_str = prepare_unique_tracks(
-    input_path=raw_path, 
-    processed_dir=PROCESSED_DIR, 
-    output_dir=INTERIM_DIR
-)
+# Tages- oder Wochencharts? (bestimmt Dateinamen und Merge-Pfad)
+granularity = extract_granularity_from_filename(raw_paths[0].name)
+enrich_tag = date_str if granularity == "weekly" else f"{granularity}_{date_str}"
 
 st.success(f"Titel und Künstler wurden erkannt und gespeichert.")
-st.caption(f"Verarbeitete Datei gespeichert unter: `{processed_path}`") 
-st.caption(f"Unique-Track-Datei gespeichert unter: `{unique_path}`")
+for processed_path in processed_paths:
+    st.caption(f"Verarbeitete Datei gespeichert unter: `{processed_path}`") 
+st.caption(f"Unique-Track-Datei (regionsübergreifend) gespeichert unter: `{unique_path}`")
 
 # ---------------------------------------------------------------- 
 # Schritt 2: Spotify Enrichment Pipeline mit anschließendem Merge 
@@ -121,12 +164,18 @@ st.caption(f"Unique-Track-Datei gespeichert unter: `{unique_path}`")
 st.subheader("🎼 Spotify-Daten erweitern")
 
 if st.button("🎧 Spotify-Infos laden"):
-    with st.spinner("Hole Spotify-IDs und Metadaten..."):
+    # Anreicherung & Scoring gehören zum Messlauf des Uploads
+    resume_run(st.session_state["upload_run_id"])
+    st.session_state["perf_run_id"] = st.session_state["upload_run_id"]
+
+    with st.spinner("Hole Spotify-IDs und Metadaten..."), stage("upload.enrich"):
+        from src.spotify_client import SpotifyClient
+
         client = SpotifyClient()
 
         df_enriched = client.run_full_pipeline(
             unique_tracks_csv=unique_path,
-            date_str=date_str,
+            date_str=enrich_tag,
             output_dir=INTERIM_DIR
         )
     st.success("Die Titel wurden erfolgreich mit Spotify-Infos angereichert.")
@@ -134,18 +183,49 @@ if st.button("🎧 Spotify-Infos laden"):
     # ------------------------------------------------------------ 
     # Schritt 3: Merge: Charts + enriched_data + Historie 
     # ------------------------------------------------------------
-    
-    df_final = merge_new_data(
-        charts_csv=PROCESSED_DIR / f"regional_global_weekly_{date_str}.csv", 
-        enriched_csv=INTERIM_DIR / f"enriched_data_{date_str}.csv", 
-        date_str=date_str, 
-        processed_dir=PROCESSED_DIR, 
-        hist_raw_path=PROCESSED_DIR / "hist_data_24-25.csv", 
-        hist_updated_path=PROCESSED_DIR / "hist_data_updated.csv",
-        backup_dir=BACKUP_DIR
-    )
+
+    if granularity == "daily":
+        # Tagescharts partitionieren, nur betroffene Wochen neu aufrollen
+        df_days = pd.concat([pd.read_csv(p) for p in processed_paths], ignore_index=True)
+        touched_days = write_daily_partition(df_days, DAILY_DIR)
+        hist_updated = PROCESSED_DIR / "hist_data_updated.csv"
+        charts_csv = rollup_daily_to_weekly(
+            DAILY_DIR, touched_days, ROLLUP_DIR,
+            history_path=hist_updated if hist_updated.exists() else PROCESSED_DIR / "hist_data_24-25.csv",
+        )
+        if not charts_csv:
+            # Teilwoche: nur ein Bruchteil der Streams → erst mergen, wenn alle 7 Tage da sind
+            st.info("Die hochgeladenen Tage ergeben noch keine vollständige Chart-Woche (7 Tage). "
+                    "Sie wurden gespeichert und werden gemergt, sobald die Woche komplett ist.")
+            st.stop()
+    else:
+        charts_csv = processed_paths
+    
+    with stage("upload.merge") as rec:
+        df_final = merge_new_data(
+            charts_csv=charts_csv, 
+            enriched_csv=INTERIM_DIR / f"enriched_data_{enrich_tag}.csv", 
+            date_str=date_str, 
+            processed_dir=PROCESSED_DIR, 
+            hist_raw_path=PROCESSED_DIR / "hist_data_24-25.csv", 
+            hist_updated_path=PROCESSED_DIR / "hist_data_updated.csv",
+            backup_dir=BACKUP_DIR
+        )
+        rec["rows"] = len(df_final)
 
     st.success("Die neuen Daten wurden erfolgreich mit der Historie verbunden.")
+
+    # Peak-Detektor um die neuen Wochen fortschreiben (Annotationen der Analyse-Seite)
+    from src.peak_detector import ingest_weeks
+
+    with stage("upload.peaks"):
+        ingest_weeks(df_final)
+
+    # Figuren der Analyse-Seite für die aktuelle Datenversion vorbauen
+    from src.analyse_figures import warm_figure_cache
+
+    with stage("upload.figures"):
+        warm_figure_cache(data_path=PROCESSED_DIR / "hist_data_updated.csv")
     
     st.write("Vorschau der angereicherten Daten:")
     st.dataframe(df_final.tail())
@@ -156,7 +236,8 @@ if st.button("🎧 Spotify-Infos laden"):
     st.header("🧠 Daten verarbeiten")
     st.subheader("🧩 Merkmale berechnen") 
     
-    df_features = build_features(df_final) 
+    with stage("upload.features", rows=len(df_final)):
+        df_features = build_features(df_final) 
     df_features["ds"] = pd.to_datetime(df_features["chart_week"], errors="coerce") 
     
     st.success("Die Daten wurden erfolgreich aufbereitet.")
@@ -165,8 +246,12 @@ if st.button("🎧 Spotify-Infos laden"):
     # Schritt 5a: Prediction Pipeline 
     # -------------------------------------------------------- 
     st.subheader("🤖 KI‑Vorhersage starten") 
-    
-    preds, probs = run_prediction_pipeline(df_features) 
+
+    from src.predict_pipeline import run_prediction_pipeline
+
+    # Feature-Beiträge entstehen im selben Scoring-Durchlauf (Erklärung = Lookup)
+    with stage("upload.predict", rows=len(df_features)):
+        preds, probs, contrib = run_prediction_pipeline(df_features, explain=True) 
     
     df_features["is_rising"] = preds 
     df_features["probability"] = probs 
@@ -179,78 +264,13 @@ if st.button("🎧 Spotify-Infos laden"):
     # Schritt 5b: Zukunfts-Horizont erzeugen (Forecast) 
     # -------------------------------------------------------- 
     
-    # Parameter: wie viele Wochen in die Zukunft?
-    FORECAST_WEEKS = 12  # z.B. 12 Wochen
-    
-    # Letztes historisches Datum bestimmen
-    last_ds = df_features["ds"].max()
-    
-    # Zukünftige Wochen erzeugen
-    future_dates = pd.date_range(
-        start=last_ds + pd.Timedelta(weeks=1),
-        periods=FORECAST_WEEKS,
-        freq="W"
-    )
-    
-    # DataFrame für zukünftige Wochen
-    future_dates_df = pd.DataFrame({
-        "ds_future": future_dates,
-        "key": 1
-    })
-    
-    # Pro Track die letzte bekannte Zeile nehmen
-    last_per_track = (
-        df_features.sort_values("ds")
-        .groupby("track_id")
-        .tail(1)
-    )
-    
-    # Sicherstellen, dass 'ds' existiert
-    if "ds" not in last_per_track.columns:
-        last_per_track["ds"] = last_per_track["chart_week"]
-    
-    # 'ds' umbenennen, damit der Merge sauber funktioniert
-    last_per_track = last_per_track.rename(columns={"ds": "ds_last"})
-    
-    # Cross Join: jeder Track × jede zukünftige Woche
-    last_per_track = last_per_track.assign(key=1)
-    
-    future_df = last_per_track.merge(
-        future_dates_df,
-        on="key",
-        how="outer"
-    ).drop(columns=["key"])
-    
-    # ds auf ds_future setzen
-    future_df["ds"] = future_df["ds_future"]
-    
-    # chart_week auf ds setzen (für Konsistenz)
-    future_df["chart_week"] = future_df["ds"]
-    
-    # Aufräumen
-    future_df = future_df.drop(columns=["ds_last", "ds_future"])
-    
-    # Zeitbasierte Regressoren aus der Historie ableiten
-    regressor_time = (
-        df_features.groupby("ds")[["genre_idx_lagged", "seasonality_score"]]
-        .mean()
-        .reset_index()
-    )
-    
-    future_df = future_df.drop(columns=["genre_idx_lagged", "seasonality_score"], errors="ignore")
-    future_df = future_df.merge(regressor_time, on="ds", how="left")
-    
-    # Robust füllen: erst bfill, dann ffill
-    future_df["genre_idx_lagged"] = future_df["genre_idx_lagged"].bfill().ffill()
-    future_df["seasonality_score"] = future_df["seasonality_score"].bfill().ffill()
-    
-    # Falls immer noch NaN (z. B. komplett fehlende Historie)
-    future_df["genre_idx_lagged"] = future_df["genre_idx_lagged"].fillna(0)
-    future_df["seasonality_score"] = future_df["seasonality_score"].fillna(0)
+    # Horizont: Länge und Frequenz hängen von der Granularität ab (weekly: 12 Wochen)
+    with stage("upload.horizon") as rec:
+        future_df = build_forecast_horizon(df_features, granularity="weekly")
+        rec["rows"] = len(future_df)
 
-    
-    # Prediction Pipeline auf Zukunft laufen lassen
-    future_preds, future_probs = run_prediction_pipeline(future_df)
+        # Prediction Pipeline auf Zukunft laufen lassen
+        future_preds, future_probs, future_contrib = run_prediction_pipeline(future_df, explain=True)
     
     future_df["is_rising"] = future_preds
     future_df["probability"] = future_probs
@@ -261,12 +281,42 @@ if st.button("🎧 Spotify-Infos laden"):
     
     # Historische + zukünftige Daten zusammenführen
     df_all = pd.concat([df_features, future_df], ignore_index=True)
+
+    # row_id verknüpft jede Zeile mit ihrer Zeile in der Beitragsmatrix
+    df_all["row_id"] = range(len(df_all))
+    st.session_state["explanations"] = Explanations(
+        df_all["row_id"], pd.concat([contrib, future_contrib], ignore_index=True)
+    )
     
     # In Session State speichern
     st.session_state["df_features"] = df_all
+    st.session_state["data_version"] = data_version(df_all)
+    st.session_state["weekly_topk"] = build_weekly_topk(df_all, k=10)
     
     st.success("Zukunftsprognosen wurden für alle Tracks berechnet.")
 
+# ------------------------------------------------------------ 
+# Performance-Panel (letzter Verarbeitungslauf)
+# ------------------------------------------------------------
+perf_run_id = st.session_state.get("perf_run_id")
+if perf_run_id and st.sidebar.checkbox("⏱️ Performance anzeigen"):
+    records = recent_records(perf_run_id)
+    with st.sidebar.expander("⏱️ Performance", expanded=True):
+        st.caption(f"Lauf `{perf_run_id}`")
+        summary = summarize([r for r in records if r["kind"] == "stage"])
+        if summary.empty:
+            st.write("Keine Messungen für diesen Lauf.")
+        else:
+            st.dataframe(
+                summary[["name", "calls", "wall_ms", "cpu_ms", "rss_peak_mb", "rows", "cache_hits", "cache_misses"]]
+                .round(1),
+                hide_index=True
+            )
+        http = summarize([r for r in records if r["kind"] == "http"])
+        if not http.empty:
+            st.caption("Spotify-API")
+            st.dataframe(http[["name", "calls", "wall_ms", "wall_ms_max"]].round(1), hide_index=True)
+
 # ------------------------------------------------------------ 
 # Dashboard (Visualisierungen)
 # ------------------------------------------------------------
@@ -276,15 +326,36 @@ if "df_features" not in st.session_state:
     st.info("Bitte lade zuerst Spotify-Infos und starte die KI-Vorhersage.")
     st.stop()
 
-df_all = st.session_state["df_features"].copy()
-df_display = df_all.copy()
+# Nur lesend verwendet → keine Kopie der (großen) Feature-Tabelle pro Rerun
+df_all = st.session_state["df_features"]
+
+# Top-K pro Woche (einmal pro Scoring-Lauf berechnet, siehe Schritt 5b)
+if "weekly_topk" not in st.session_state:
+    st.session_state["weekly_topk"] = build_weekly_topk(df_all, k=10)
+weekly_topk = st.session_state["weekly_topk"]
 
 # KPI-Bereich
-col1, col2, col3 = st.columns(3)
+col1, col2, col3, col4 = st.columns(4)
 col1.metric("Analysierte Tracks", f"{len(df_all):,}")
 col2.metric("Rising Artists", (df_all['probability'] >= 0.9).sum())
 col3.metric("Max. Wahrscheinlichkeit", f"{df_all['probability'].max():.2%}")
 
+# Marktkonzentration der letzten beiden historischen Wochen (nur diese Zeilen)
+hist_weeks = [w for w, fut in zip(weekly_topk["weeks"], weekly_topk["is_future"]) if not fut][-2:]
+if hist_weeks:
+    # Regionen zusammengefasst: eine Kennzahl für den gesamten hochgeladenen Markt
+    hhi = concentration_frame(
+        df_all.loc[df_all["ds"].isin(hist_weeks)].drop(columns="region", errors="ignore"),
+        dimensions=("artist",), period="ds"
+    ).set_index("ds")["hhi"] * 10_000
+    col4.metric(
+        "Marktkonzentration (HHI Künstler)",
+        f"{hhi.iloc[-1]:,.0f}",
+        delta=f"{hhi.iloc[-1] - hhi.iloc[0]:+,.0f}" if len(hhi) > 1 else None,
+        delta_color="inverse",
+        help="Herfindahl-Index der Künstler-Streams (0–10 000) in der letzten Chart-Woche; höher = weniger Vielfalt."
+    )
+
 st.divider()
 
 # Filter für Historie vs. Zukunft
@@ -294,69 +365,35 @@ view_mode = st.radio(
     horizontal=True
 )
 
-if view_mode == "Nur Historie":
-    df_display = df_display[df_display["is_future"] == False]
-elif view_mode == "Nur Forecast":
-    df_display = df_display[df_display["is_future"] == True]
-# "Beides" → keine Filterung
-
 # Heatmap 
-if "artist_genres" in df_display.columns:
+if "artist_genres" in df_all.columns:
     st.subheader("🔥 Genre Trend Heatmap")
 
-    # Kopie für die Heatmap erstellen, um df_display nicht für andere Charts zu verändern
-    df_heatmap = df_display.copy()
-    
-    # Explode: Erstellt pro Genre eine eigene Zeile
-    df_heatmap = df_heatmap.explode("artist_genres")
-
-    # Ungültige Genres entfernen
-    df_heatmap = df_heatmap.dropna(subset=["artist_genres"])
-    df_heatmap = df_heatmap[df_heatmap["artist_genres"] != ""]
-    
-    # Aggregation: Durchschnittliche Wahrscheinlichkeit pro Woche und Genre
-    genre_trend = (
-        df_heatmap.groupby(["ds", "artist_genres"])["probability"]
-        .mean()
-        .reset_index()
-        .sort_values("ds")
+    # Vorberechnete Genre × Woche Matrix (pro Daten- und Modellversion gecacht)
+    genre_matrix = get_genre_week_matrix(
+        st.session_state.get("data_version") or data_version(df_all),
+        model_version(MODEL_DIR),
+        df_all
     )
 
-    # Nur Top-Genres anzeigen (optional, verhindert eine zu lange Y-Achse)
-    top_genres = (
-        genre_trend.groupby("artist_genres")["probability"]
-        .sum()
-        .nlargest(20)
-        .index
-    )
-    genre_trend = genre_trend[genre_trend["artist_genres"].isin(top_genres)]
-
-    # Heatmap erzeugen
-    fig_heatmap = px.density_heatmap(
-        genre_trend, 
-        x="ds",
-        y="artist_genres",
-        z="probability",
-        color_continuous_scale="Viridis",
-        labels={
-            'probability': 'Trend-Stärke', 
-            'artist_genres': 'Genre',
-            'ds': 'Datum'
-        },
-        title="Genre-Momentum über die Zeit"
-    )
+    # Filter Historie/Forecast auf die Wochen-Spalten der Matrix anwenden
+    if view_mode == "Nur Historie":
+        week_mask = ~genre_matrix["is_future"]
+    elif view_mode == "Nur Forecast":
+        week_mask = genre_matrix["is_future"]
+    else:
+        week_mask = None
+
+    # Nur Top-Genres anzeigen (verhindert eine zu lange Y-Achse)
+    fig_heatmap = genre_heatmap_figure(genre_matrix, k=20, week_mask=week_mask, max_buckets=52)
 
-    fig_heatmap.update_coloraxes(colorbar_title="Kumulierte Trendstärke")
-   
     # Forecast-Bereich einfärben 
-    df_all = st.session_state["df_features"]
-    future_start = df_all[df_all["is_future"] == True]["ds"].min()
-    future_end = df_all["ds"].max()
+    future_weeks = genre_matrix["weeks"][genre_matrix["is_future"]]
     
-    if pd.notna(future_start):
+    if len(future_weeks) and view_mode != "Nur Historie":
         fig_heatmap.add_vrect(
-            x0=future_start,
-            x1=future_end,
+            x0=pd.Timestamp(future_weeks.min()),
+            x1=pd.Timestamp(future_weeks.max()),
             fillcolor="orange",
             opacity=0.15,
             layer="below",
@@ -372,35 +409,25 @@ if "artist_genres" in df_display.columns:
 st.subheader("🏆 TOP 10 Rising Artists")
 
 # Aktuelle (letzte historische Woche)
-hist_df = df_display[df_display["is_future"] == False]
-if not hist_df.empty:
-    last_hist_week = hist_df["ds"].max()
-    hist_last_week = hist_df[hist_df["ds"] == last_hist_week]
-
-    hist_unique = (
-        hist_last_week.sort_values("probability", ascending=False)
-        .drop_duplicates(subset=["artist_names", "track_name"])
-    )
-    top_10_hist = hist_unique.nlargest(10, "probability")
+if view_mode != "Nur Forecast":
+    top_10_hist = get_topk(weekly_topk, last_hist_week(weekly_topk), k=10)
 else:
     top_10_hist = pd.DataFrame()
 
 # Zukunft: nächste Woche nach letzter Historie
-future_df = df_display[df_display["is_future"] == True]
-if not future_df.empty:
-    first_future_week = future_df["ds"].min()
-    future_first_week = future_df[future_df["ds"] == first_future_week]
-
-    future_unique = (
-        future_first_week.sort_values("probability", ascending=False)
-        .drop_duplicates(subset=["artist_names", "track_name"])
-    )
-    top_10_future = future_unique.nlargest(10, "probability")
+if view_mode != "Nur Historie":
+    top_10_future = get_topk(weekly_topk, first_future_week(weekly_topk), k=10)
 else:
     top_10_future = pd.DataFrame()
 
 col_hist, col_future = st.columns(2)
 
+# Farbe nach Hauptkünstler (erster Credit), damit Features keine eigene Farbe bekommen
+if not top_10_hist.empty:
+    top_10_hist = top_10_hist.assign(primary_artist=primary_artist(top_10_hist["artist_names"]).to_numpy())
+if not top_10_future.empty:
+    top_10_future = top_10_future.assign(primary_artist=primary_artist(top_10_future["artist_names"]).to_numpy())
+
 
 st.markdown("**Aktuelle TOP 10 (letzte historische Woche)**")
 if not top_10_hist.empty:
@@ -408,13 +435,15 @@ if not top_10_hist.empty:
         top_10_hist,
         x="probability",
         y="track_name",
-        color="artist_names",
+        color="primary_artist",
+        hover_data=["artist_names"],
         orientation="h",
         range_x=[0, 1],
         labels={
             'track_name': 'Song',
             'probability': 'Wahrscheinlichkeit',
-            'artist_names': 'Künstler'
+            'primary_artist': 'Künstler',
+            'artist_names': 'Credits'
         },
         title="TOP 10 (Historie)"
     )
@@ -430,13 +459,15 @@ if not top_10_future.empty:
         top_10_future,
         x="probability",
         y="track_name",
-        color="artist_names",
+        color="primary_artist",
+        hover_data=["artist_names"],
         orientation="h",
         range_x=[0, 1],
         labels={
             'track_name': 'Song',
             'probability': 'Wahrscheinlichkeit',
-            'artist_names': 'Künstler'
+            'primary_artist': 'Künstler',
+            'artist_names': 'Credits'
         },
         title="TOP 10 (Forecast)"
     )
@@ -448,17 +479,33 @@ else:
 # SONG-FORECAST: Probability historisch vs. Zukunft
 st.subheader("📈 Song-spezifischer Probability-Forecast")
 
-selected_artist = st.selectbox("Künstler wählen:", df_all["artist_names"].unique())
-selected_song = st.selectbox(
-    "Song wählen:",
-    df_all[df_all["artist_names"] == selected_artist]["track_name"].unique()
+# Vorberechneter Index Künstler → Songs → Zeitreihe (pro Datenversion)
+track_index = get_track_index(
+    st.session_state.get("data_version") or data_version(df_all),
+    df_all
 )
 
-# Daten für diesen Song
-song_data = df_all[
-    (df_all["artist_names"] == selected_artist) &
-    (df_all["track_name"] == selected_song)
-].sort_values("ds")
+song_query = st.text_input("Song suchen (Titelanfang oder ungefährer Titel):", "")
+
+if song_query:
+    matches = track_index.search(song_query, limit=25)
+    selected = st.selectbox(
+        "Treffer:",
+        matches,
+        format_func=lambda m: f"{m[1]} – {m[0]}"
+    )
+    selected_artist, selected_song = selected if selected else (None, None)
+else:
+    selected_artist = st.selectbox("Künstler wählen:", track_index.artists)
+    selected_song = st.selectbox("Song wählen:", track_index.tracks(selected_artist))
+
+# Daten für diesen Song (zusammenhängender, nach ds sortierter Block)
+song_data = track_index.series(selected_artist, selected_song)
+
+# Bei mehreren Regionen: eine Region auswählen (Filter nur über den Song-Block)
+if "region" in song_data.columns and song_data["region"].nunique() > 1:
+    selected_region = st.selectbox("Region wählen:", sorted(song_data["region"].unique()))
+    song_data = song_data[song_data["region"] == selected_region]
 
 if not song_data.empty:
 
@@ -498,6 +545,23 @@ if not song_data.empty:
     )
 
     st.plotly_chart(fig_line, use_container_width=True)
+
+    # Warum diese Wahrscheinlichkeit? (Lookup in der Beitragsmatrix des Scoring-Laufs)
+    explanations = st.session_state.get("explanations")
+    if explanations is not None and "row_id" in song_data.columns:
+        week_labels = song_data["ds"].dt.strftime("%Y-%m-%d").tolist()
+        default_week = fut["ds"].iloc[0].strftime("%Y-%m-%d") if not fut.empty else week_labels[-1]
+        explain_week = st.select_slider(
+            "Woche für die Erklärung:", options=week_labels, value=default_week
+        )
+        row = song_data.iloc[week_labels.index(explain_week)]
+        st.plotly_chart(
+            contribution_figure(
+                explanations.row(row["row_id"]),
+                title=f"Einflussfaktoren {explain_week} (Wahrscheinlichkeit {row['probability']:.0%})"
+            ),
+            use_container_width=True
+        )
 else:
     st.info("Keine Daten für diesen Song gefunden.")
 
@@ -529,37 +593,42 @@ if st.button("🪄 Analyse-Bericht generieren"):
     current_time = time.time()
     elapsed = current_time - st.session_state.last_ai_call
 
-    if elapsed < COOLDOWN_SECONDS:
-        remaining = math.ceil(COOLDOWN_SECONDS - elapsed)
-        st.warning(f"Bitte warte noch {remaining} Sekunden.")
+    # Nur Forecast-Daten der ersten Zukunftswoche verwenden
+    df_all = st.session_state["df_features"]
+    report_week = first_future_week(st.session_state["weekly_topk"])
+
+    if report_week is None:
+        st.error("Keine Forecast-Daten verfügbar.")
     else:
-        with st.spinner("Gemini analysiert..."):
-            # Nur Forecast-Daten der ersten Zukunftswoche verwenden
-            df_all = st.session_state["df_features"].copy()
-            future_df = df_all[df_all["is_future"] == True]
-
-            if future_df.empty:
-                st.error("Keine Forecast-Daten verfügbar.")
-            else:
-                first_future_week = future_df["ds"].min()
-                df_future_week = future_df[future_df["ds"] == first_future_week]
-
-                future_unique = (
-                    df_future_week.sort_values("probability", ascending=False)
-                    .drop_duplicates(subset=["artist_names", "track_name"])
+        from src.trend_reports import cached_report, stream_gemini_report
+
+        df_future_week = df_all[df_all["ds"] == report_week]
+        top_10_future = get_topk(st.session_state["weekly_topk"], report_week, k=10)
+        explanations = st.session_state.get("explanations")
+
+        # Gespeicherter Bericht für dieselben Daten: kein API-Aufruf, kein Cooldown
+        report = cached_report(df_future_week, top_10_future, explanations)
+
+        if report:
+            st.caption("♻️ Gespeicherter Bericht für dieselben Daten")
+            st.markdown(report)
+        elif elapsed < COOLDOWN_SECONDS:
+            remaining = math.ceil(COOLDOWN_SECONDS - elapsed)
+            st.warning(f"Bitte warte noch {remaining} Sekunden.")
+        else:
+            st.session_state.last_ai_call = current_time
+            # Jeder Klick löst einen Rerun aus → der laufende Stream wird geschlossen und abgebrochen
+            st.button("⏹️ Abbrechen", key="cancel_ai_report")
+
+            try:
+                # Text erscheint Stück für Stück, der API-Aufruf läuft in einem Hintergrund-Thread
+                report = st.write_stream(
+                    stream_gemini_report(df_future_week, top_10_future, explanations)
                 )
-                top_10_future = future_unique.nlargest(10, "probability")
-
-                try:
-                    report = generate_gemini_report(df_future_week, top_10_future)
-                    st.session_state.last_ai_call = current_time
-    
-                    if report:
-                        st.markdown(report)
-                    else:
-                        st.error("Der Bericht konnte nicht generiert werden.")
-                except Exception as e:
-                    st.warning("Der KI-Dienst ist momentan überlastet. Bitte versuchen Sie es später erneut.")
+                if not report:
+                    st.error("Der Bericht konnte nicht generiert werden.")
+            except Exception as e:
+                st.warning("Der KI-Dienst ist momentan überlastet. Bitte versuchen Sie es später erneut.")
 
 st.markdown(
     """
@@ -0,0 +1,316 @@
+import argparse
+import json
+from pathlib import Path
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from .artist_credits import per_artist_totals
+from .concentration import concentration_frame
+from .figure_cache import FIGURE_CACHE_DIR, get_figure_json
+from .history_store import load_history
+from .peak_detector import event_annotations, peak_events
+from .versioning import file_version
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+# Die vom Upload fortgeschriebene Historie (merge_new_data) → neue Wochen erscheinen sofort in der Analyse
+DATA_PATH = BASE_DIR / "data" / "processed" / "hist_data_updated.csv"
+
+# Bei inhaltlichen Änderungen an den Figuren-Buildern erhöhen (invalidiert den Disk-Cache)
+FIGURES_VERSION = 5
+
+
+# ____ DATEN ____
+def load_chart_history(data_path=DATA_PATH, region="global"):
+    df = load_history(data_path)
+    # Die Analyse-Seite beschreibt den globalen Markt
+    if "region" in df.columns:
+        df = df[df["region"] == region]
+        df = df.assign(artist_names=df["artist_names"].cat.remove_unused_categories())
+    return df
+
+
+def year_range(weeks) -> str:
+    """Zeitraum der Historie für Titel, z. B. "2024–2025" (ein Jahr: "2025")."""
+    weeks = pd.to_datetime(pd.Series(weeks)).dropna()
+    if weeks.empty:
+        return ""
+    first, last = weeks.min().year, weeks.max().year
+    return str(first) if first == last else f"{first}–{last}"
+
+
+def weekly_streams(df):
+    return df.groupby("chart_week", observed=True)["streams"].sum().reset_index()
+
+
+def artist_growth_frame(df):
+    """Stream-Share, 4-Wochen-Rolling-Mean und Wachstumsrate der Top-Künstler (Top 10 je Woche)."""
+    top_10_weekly = df[df['rank'] <= 10]
+
+    # Summe der Streams pro Woche
+    weekly_total = top_10_weekly.groupby('chart_week', observed=True)['streams'].sum()
+
+    # Stream‑Share pro Künstler und Woche (Kollaborationen über die Credit-Bridge aufgeteilt)
+    artist_dominance = per_artist_totals(top_10_weekly, by='chart_week') \
+        .rename(columns={'artist': 'artist_names'})
+
+    artist_dominance['stream_share'] = (
+        artist_dominance['streams']
+        / artist_dominance['chart_week'].map(weekly_total)
+        * 100
+    )
+
+    # Top‑Künstler auswählen
+    top_artist_list = artist_dominance.groupby('artist_names', observed=True)['streams'] \
+        .mean().nlargest(10).index
+
+    df_growth = artist_dominance[
+        artist_dominance['artist_names'].isin(top_artist_list)
+    ].copy()
+
+    # Rolling Mean (4 Wochen)
+    df_growth['rolling_avg'] = df_growth.groupby('artist_names', observed=True)['stream_share'] \
+        .transform(lambda x: x.rolling(window=4, min_periods=1).mean())
+
+    # Wachstumsrate
+    df_growth['growth_rate'] = df_growth.groupby('artist_names', observed=True)['stream_share'] \
+        .transform(lambda x: x.pct_change() * 100)
+
+    # Cleanup
+    df_growth['growth_rate'] = df_growth['growth_rate'] \
+        .replace([float('inf'), -float('inf')], 0).fillna(0)
+
+    return df_growth
+
+
+# ____ FIGUREN ____
+def build_global_trend(df):
+    seasonal_trends = weekly_streams(df)
+
+    fig = px.line(
+        seasonal_trends,
+        x="chart_week",
+        y="streams",
+        title=f"Globale Streaming‑Trends & Key Events ({year_range(seasonal_trends['chart_week'])})",
+        labels={"streams": "Gesamt‑Streams", "chart_week": "Woche"},
+        template="plotly_dark"
+    )
+
+    # Annotationen aus den gespeicherten Peak-Events (src/peak_detector.py)
+    for annotation in event_annotations(peak_events(df)):
+        fig.add_annotation(**annotation)
+
+    fig.update_traces(line_color="#1DB954", line_width=2)
+    return fig
+
+
+def build_peak_weeks(df):
+    # Peak-Wochen aus dem Online-Detektor (robustes Niveau statt Mittelwert + 1.5 · Std)
+    peak_dates = pd.to_datetime([event["week"] for event in peak_events(df)])
+
+    # Daten für die Peak-Wochen filtern
+    peak_df_details = df[df['chart_week'].isin(peak_dates)]
+    top_artists_peaks = peak_df_details[peak_df_details['rank'] <= 10]
+
+    fig_peaks = px.bar(
+        top_artists_peaks,
+        x="chart_week",
+        y="streams",
+        color="artist_names",
+        title="Wer dominierte die Spitzenwochen im Streaming? (Top 10 Künstler)",
+        hover_data=["track_name"],
+        labels={
+            "streams": "Gesamt‑Streams",
+            "chart_week": "Woche",
+            "artist_names": "Künstler"
+        },
+        template="plotly_dark"
+    )
+
+    fig_peaks.update_traces(marker_line_color="black", marker_line_width=1)
+    fig_peaks.update_layout(barmode="stack")
+    return fig_peaks
+
+
+def build_dominance_area(df, top_n=5):
+    # Streams pro einzelnem Künstler (nicht pro Credit-String)
+    top_artists_weekly = per_artist_totals(df[df['rank'] <= 10], by='chart_week') \
+        .rename(columns={'artist': 'artist_names'})
+
+    # TOP-Künstler für übersichtliche Visualisierung
+    top_overall_artists = per_artist_totals(df, by='chart_week') \
+        .groupby('artist')['streams'].sum().nlargest(top_n).index
+
+    df_filtered = top_artists_weekly[
+        top_artists_weekly['artist_names'].isin(top_overall_artists)
+    ]
+
+    return px.area(
+        df_filtered,
+        x="chart_week",
+        y="streams",
+        color="artist_names",
+        title="Wöchentliche Dominanz der Top‑Künstler",
+        labels={
+            'streams': 'Streams in den Top 10',
+            'chart_week': 'Woche',
+            'artist_names': 'Künstler'
+        },
+        template="plotly_dark",
+        line_group="artist_names"
+    )
+
+
+def build_diversity_bars(df):
+    # Jeder beteiligte Künstler zählt einzeln (auch Features)
+    diversity_analysis = per_artist_totals(df[df['rank'] <= 10], by='chart_week', rule='full') \
+        .groupby('chart_week')['artist'] \
+        .nunique().reset_index()
+
+    diversity_analysis.columns = ['chart_week', 'unique_artists']
+
+    fig_div = px.bar(
+        diversity_analysis,
+        x='chart_week',
+        y='unique_artists',
+        title='Chart‑Diversität: eindeutige beteiligte Künstler in den Top 10 (inkl. Features)',
+        labels={
+            'unique_artists': 'Beteiligte Künstler (inkl. Features)',
+            'chart_week': 'Woche'
+        },
+        template='plotly_dark',
+        color='unique_artists',
+        color_continuous_scale='RdYlGn'
+    )
+    # Keine feste Obergrenze: mit Features können mehr als 10 Künstler beteiligt sein
+    return fig_div
+
+
+def build_concentration_lines(df):
+    """HHI (0–10 000) pro Woche für Tracks und Künstler – ein Durchlauf über alle Wochen."""
+    series = concentration_frame(df, dimensions=("track", "artist"))
+    series["hhi_points"] = series["hhi"] * 10_000
+    series["top1_pct"] = series["top1_share"] * 100
+    series["dimension"] = series["dimension"].map({"track": "Tracks", "artist": "Künstler"})
+
+    return px.line(
+        series,
+        x="chart_week",
+        y="hhi_points",
+        color="dimension",
+        hover_data={"top1_pct": ":.1f", "entropy": ":.2f", "gini": ":.3f"},
+        title="Marktkonzentration: Herfindahl-Index der Streams pro Woche",
+        labels={
+            "hhi_points": "HHI (0–10 000)",
+            "chart_week": "Woche",
+            "dimension": "Ebene",
+            "top1_pct": "Top‑1‑Anteil (%)",
+            "entropy": "Entropie",
+            "gini": "Gini",
+        },
+        template="plotly_dark"
+    )
+
+
+def build_rolling_share(df):
+    return px.line(
+        artist_growth_frame(df),
+        x='chart_week',
+        y='rolling_avg',
+        color='artist_names',
+        title='Geglätteter Trend: 4‑Wochen Rolling Mean des Marktanteils',
+        labels={
+            'rolling_avg': 'Marktanteil (4W‑Schnitt %)',
+            'artist_names': 'Künstler',
+            'chart_week': 'Woche'
+        },
+        template='plotly_dark'
+    )
+
+
+def build_growth_scatter(df):
+    fig_growth = px.scatter(
+        artist_growth_frame(df),
+        x='chart_week',
+        y='growth_rate',
+        color='artist_names',
+        size='stream_share',
+        title='Wachstums‑Dynamik: Wer explodiert in den Charts?',
+        labels={
+            'growth_rate': 'Wachstumsrate (%)',
+            'chart_week': 'Woche',
+            'artist_names': 'Künstler'
+        },
+        template='plotly_dark'
+    )
+
+    fig_growth.add_hline(y=0, line_dash="dash", line_color="gray")
+    return fig_growth
+
+
+FIGURE_BUILDERS = {
+    "global_trend": build_global_trend,
+    "peak_weeks": build_peak_weeks,
+    "dominance_area": build_dominance_area,
+    "diversity_bars": build_diversity_bars,
+    "concentration_lines": build_concentration_lines,
+    "rolling_share": build_rolling_share,
+    "growth_scatter": build_growth_scatter,
+}
+
+
+# ____ CACHE-ZUGRIFF ____
+@st.cache_data(max_entries=8)
+def history_years(data_version, data_path=DATA_PATH) -> str:
+    """year_range der Historie für den Seitentitel (nur die Spalte chart_week wird gelesen)."""
+    return year_range(load_history(data_path, columns=["chart_week"])["chart_week"])
+
+
+@st.cache_data(max_entries=32)
+def get_analyse_figure(name, data_version, data_path=DATA_PATH, params=None, cache_dir=FIGURE_CACHE_DIR):
+    """
+    Liefert die Figur als Dict aus dem Disk-Cache (JSON), gebaut nur bei einem Miss.
+    Zusätzlich im Speicher gecacht, damit Reruns nicht einmal die Datei lesen.
+    """
+    def builder():
+        # Historie nur bei einem Cache-Miss laden
+        return FIGURE_BUILDERS[name](load_chart_history(data_path), **(params or {}))
+
+    version = f"{data_version}:{FIGURES_VERSION}"
+    return json.loads(get_figure_json(name, version, builder, params=params, cache_dir=cache_dir))
+
+
+def warm_figure_cache(data_path=DATA_PATH, cache_dir=FIGURE_CACHE_DIR):
+    """
+    Baut alle Figuren der Analyse-Seite für die aktuelle Datenversion vor.
+    Wird nach dem Ingest aufgerufen; vorhandene Einträge bleiben unangetastet.
+    """
+    data_version = file_version(data_path)
+    df = None
+    built = []
+
+    for name, build in FIGURE_BUILDERS.items():
+        def builder(build=build):
+            nonlocal df
+            if df is None:
+                df = load_chart_history(data_path)
+            return build(df)
+
+        get_figure_json(name, f"{data_version}:{FIGURES_VERSION}", builder, cache_dir=cache_dir)
+        built.append(name)
+
+    print(f"Figuren-Cache aufgewärmt ({len(built)} Figuren, Version {data_version}).")
+    return data_version
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Figuren-Cache der Analyse-Seite aufwärmen.")
+    parser.add_argument("--data-path", type=Path, default=DATA_PATH)
+    parser.add_argument("--cache-dir", type=Path, default=FIGURE_CACHE_DIR)
+    args = parser.parse_args(argv)
+    warm_figure_cache(args.data_path, args.cache_dir)
+
+
+if __name__ == "__main__":
+    main()
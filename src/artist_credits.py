@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+
+# Spotify trennt Mehrfach-Credits in 'artist_names' mit ", "
+CREDIT_SEPARATOR = ", "
+
+# Künstlernamen, die selbst ein Komma enthalten (werden beim Split nicht getrennt)
+COMMA_ARTISTS = [
+    "Tyler, The Creator",
+    "Earth, Wind & Fire",
+    "Crosby, Stills, Nash & Young",
+    "Emerson, Lake & Palmer",
+    "Peter, Paul and Mary",
+]
+
+# Aufteilung der Streams eines Tracks auf seine Künstler:
+#   equal   – jeder Künstler erhält 1/n (Summe über Künstler = Track-Streams)
+#   full    – jeder Künstler erhält die vollen Streams (Reichweite, Summe > Total)
+#   primary – nur der erstgenannte Künstler
+SHARE_RULES = ("equal", "full", "primary")
+DEFAULT_SHARE_RULE = "equal"
+
+
+# ____ CREDITS SPLITTEN ____
+def split_credits(artist_names) -> list:
+    """'A, B, Tyler, The Creator' → ['A', 'B', 'Tyler, The Creator'] (Reihenfolge = Credit-Reihenfolge)."""
+    if artist_names is None or pd.isna(artist_names):
+        return []
+    text = str(artist_names)
+
+    protected = {}
+    for i, name in enumerate(COMMA_ARTISTS):
+        if name in text:
+            token = f"\x00{i}\x00"
+            protected[token] = name
+            text = text.replace(name, token)
+
+    credits = []
+    for part in text.split(CREDIT_SEPARATOR):
+        for token, name in protected.items():
+            part = part.replace(token, name)
+        part = part.strip()
+        if part and part not in credits:
+            credits.append(part)
+    return credits
+
+
+# ____ BRIDGE-TABELLE ____
+def build_credit_bridge(credit_strings):
+    """
+    Bridge Credit-String ↔ Künstler, einmal pro eindeutigem String gebaut.
+    Rückgabe: DataFrame mit credit_code (Position in `credit_strings`),
+    artist, credit_order, n_credits.
+    """
+    codes, artists, orders, counts = [], [], [], []
+    for code, value in enumerate(credit_strings):
+        credits = split_credits(value)
+        codes += [code] * len(credits)
+        artists += credits
+        orders += range(len(credits))
+        counts += [len(credits)] * len(credits)
+
+    return pd.DataFrame({
+        "credit_code": np.asarray(codes, dtype="int32"),
+        "artist": artists,
+        "credit_order": np.asarray(orders, dtype="int16"),
+        "n_credits": np.asarray(counts, dtype="int16"),
+    })
+
+
+def bridge_shares(bridge, rule=DEFAULT_SHARE_RULE) -> np.ndarray:
+    """Anteil jeder Bridge-Zeile nach Aufteilungsregel (vektorisiert)."""
+    if rule not in SHARE_RULES:
+        raise ValueError(f"Unbekannte Aufteilungsregel: {rule}. Erlaubt: {list(SHARE_RULES)}")
+    if rule == "equal":
+        return 1.0 / bridge["n_credits"].to_numpy(dtype=float)
+    if rule == "full":
+        return np.ones(len(bridge))
+    return (bridge["credit_order"].to_numpy() == 0).astype(float)
+
+
+def credit_matrix(bridge, n_strings, rule=DEFAULT_SHARE_RULE):
+    """
+    Dünnbesetzte Matrix (Credit-Strings × Künstler) mit den Anteilen.
+    Rückgabe: (csr_matrix, Künstlernamen)
+    """
+    # scipy erst hier importieren (nicht beim Kaltstart der Seiten)
+    from scipy import sparse
+
+    artist_codes, artists = pd.factorize(bridge["artist"])
+    matrix = sparse.csr_matrix(
+        (bridge_shares(bridge, rule), (bridge["credit_code"].to_numpy(), artist_codes)),
+        shape=(n_strings, len(artists))
+    )
+    return matrix, np.asarray(artists, dtype=object)
+
+
+def primary_artist(artist_names) -> pd.Series:
+    """Erstgenannter Künstler pro Zeile (Split nur über eindeutige Werte)."""
+    codes, uniques = pd.factorize(pd.Series(artist_names))
+    firsts = np.array([(split_credits(v) or [None])[0] for v in uniques] + [None], dtype=object)
+    return pd.Series(firsts[codes], index=getattr(artist_names, "index", None))
+
+
+# ____ AGGREGATION PRO KÜNSTLER ____
+def per_artist_totals(df, by="chart_week", value="streams", rule=DEFAULT_SHARE_RULE):
+    """
+    Summiert `value` pro (`by`, Künstler) über die Credit-Bridge.
+    1. Credit-Strings faktorisieren und nur die eindeutigen Strings splitten
+    2. Werte pro (Gruppe, Credit-String) als dünne Matrix G aufsummieren
+    3. Ein Sparse-Join G @ B verteilt die Summen auf die einzelnen Künstler
+    Rückgabe: DataFrame [by..., artist, value]
+    """
+    from scipy import sparse
+
+    by = [by] if isinstance(by, str) else list(by)
+    credit_codes, credit_strings = pd.factorize(df["artist_names"])
+    valid = credit_codes >= 0
+
+    bridge = build_credit_bridge(credit_strings)
+    B, artists = credit_matrix(bridge, len(credit_strings), rule)
+
+    group_codes, groups = pd.factorize(pd.MultiIndex.from_frame(df[by]) if len(by) > 1 else df[by[0]])
+    valid &= group_codes >= 0
+    G = sparse.csr_matrix(
+        (df[value].to_numpy(dtype=float)[valid], (group_codes[valid], credit_codes[valid])),
+        shape=(len(groups), len(credit_strings))
+    )
+
+    totals = (G @ B).tocoo()
+    out = pd.DataFrame(
+        groups[totals.row].to_frame(index=False, name=by) if len(by) > 1
+        else {by[0]: np.asarray(groups)[totals.row]}
+    )
+    out["artist"] = artists[totals.col]
+    out[value] = totals.data
+    return out[out[value] != 0].sort_values(by + ["artist"]).reset_index(drop=True)
+
+
+def per_artist_growth(totals, by="chart_week", value="streams", keys=()):
+    """Prozentuale Veränderung von `value` pro Künstler zwischen aufeinanderfolgenden Perioden."""
+    group_keys = [*keys, "artist"]
+    totals = totals.sort_values([*group_keys, by])
+    growth = (
+        totals.groupby(group_keys, sort=False)[value]
+        .pct_change()
+        .replace([float("inf"), -float("inf")], 0)
+        .fillna(0)
+    )
+    return totals.assign(growth_rate=growth)
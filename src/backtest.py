@@ -0,0 +1,392 @@
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .features import build_features
+from .history_store import load_history
+from .instrumentation import new_run, stage
+from .model_registry import load_registry, version_artefacts
+from .segment_trends import MIN_WEEKS as SEGMENT_MIN_WEEKS
+from .segment_trends import fit_segment_trends, segment_trend
+from .train import default_history_path, make_labels
+from .versioning import data_version
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+MODEL_DIR = BASE_DIR / "models"
+BACKTEST_DIR = BASE_DIR / "data" / "backtests"
+FEATURE_CACHE_DIR = BASE_DIR / "data" / "cache" / "backtest"
+
+# KPI der Radar-Seite ("Rising Artists" = Wahrscheinlichkeit ≥ 0.9)
+HIGH_CONFIDENCE = 0.9
+
+# Mindestanzahl Wochen vor dem Backtest-Start für den kausalen Prophet-Fit
+MIN_TREND_WEEKS = 26
+
+
+# ____ KAUSALE FEATURES ____
+def expanding_seasonality(df, period="chart_week", region_keys=()):
+    """
+    seasonality_score nur aus Daten bis zur jeweiligen Woche:
+    Ø Streams des Monats (alle Wochen ≤ t in diesem Monat) / Ø Streams aller Wochen ≤ t.
+    Entspricht build_features auf der bis t abgeschnittenen Historie, aber in einem Durchlauf.
+    """
+    keys = list(region_keys)
+    weekly = (
+        df.groupby([*keys, period], observed=True)["streams"]
+        .agg(["sum", "count"])
+        .reset_index()
+        .sort_values(period)
+    )
+    weekly["month"] = weekly[period].dt.month
+
+    month_cum = weekly.groupby([*keys, "month"], observed=True)[["sum", "count"]].cumsum()
+    total_cum = (
+        weekly.groupby(keys, observed=True)[["sum", "count"]].cumsum() if keys
+        else weekly[["sum", "count"]].cumsum()
+    )
+    weekly["seasonality_score"] = (
+        (month_cum["sum"] / month_cum["count"]) / (total_cum["sum"] / total_cum["count"])
+    )
+
+    return df[[*keys, period]].merge(
+        weekly[[*keys, period, "seasonality_score"]], on=[*keys, period], how="left"
+    )["seasonality_score"].to_numpy()
+
+
+def causal_features(df):
+    """
+    Features ohne Lookahead für alle Wochen auf einmal.
+    - genre_pop_idx (Ø pro Woche) und artist_growth_rate (pct_change auf Vorwochen)
+      sind schon kausal → einmal mit build_features berechnet
+    - seasonality_score nutzt in build_features die ganze Historie → expandierend neu berechnet
+    - prophet_trend kommt nicht von hier: run_backtest berechnet ihn mit causal_prophet
+      (Prophet nur auf Wochen vor dem Backtest-Start gefittet)
+    Nicht korrigierbar: track_popularity ist ein Snapshot vom Zeitpunkt des Enrichments.
+    """
+    region_keys = ["region"] if "region" in df.columns else []
+    features = build_features.__wrapped__(df)
+    features["seasonality_score"] = expanding_seasonality(features, "chart_week", region_keys)
+    features["ds"] = pd.to_datetime(features["chart_week"], errors="coerce")
+    return features
+
+
+def causal_prophet(model, cutoff):
+    """
+    Prophet mit derselben Konfiguration wie `model` (Regressoren, Saisonalitäten, Feiertage),
+    gefittet nur auf den Wochen vor `cutoff` – wie in Prophets eigener Cross-Validation.
+    Der Trend ab `cutoff` ist reine Extrapolation, also ohne Lookahead.
+    None, wenn vor `cutoff` weniger als MIN_TREND_WEEKS Wochen liegen.
+    """
+    import logging
+
+    from prophet.diagnostics import prophet_copy
+
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+
+    history = model.history[model.history["ds"] < pd.Timestamp(cutoff)]
+    if len(history) < MIN_TREND_WEEKS:
+        return None
+    columns = ["ds", "y", *model.extra_regressors] + (["cap"] if model.growth == "logistic" else [])
+    causal = prophet_copy(model, pd.Timestamp(cutoff))
+    causal.fit(history[columns])
+    return causal
+
+
+def causal_segment_trends(history_path, cutoff, n_genres, workers=None):
+    """
+    Segment-Trends wie in segment_trends.fit_segment_trends, aber nur auf den Wochen vor
+    `cutoff` gefittet (die gespeicherten Segmentmodelle kennen die ganze Historie).
+    None, wenn vor `cutoff` kein Segment SEGMENT_MIN_WEEKS Wochen hat.
+    """
+    df = load_history(history_path)
+    df = df[pd.to_datetime(df["chart_week"]) < pd.Timestamp(cutoff)]
+    try:
+        payload = fit_segment_trends(df, n_genres, workers)
+    except ValueError:
+        return None
+    return {key: seg["trend"] for key, seg in payload["segments"].items()}
+
+
+def load_feature_state(history_path, cache_dir=FEATURE_CACHE_DIR):
+    """
+    Kausale Features der Historie, auf Platte gecacht pro Datenversion
+    (mehrere Backtests, z. B. verschiedene Modellversionen, teilen sich den Zustand).
+    """
+    df = load_history(history_path)
+    cache_path = Path(cache_dir) / f"features_{data_version(df)}.pkl"
+    if cache_path.exists():
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+
+    with stage("backtest.features", rows=len(df)):
+        features = causal_features(df)
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(features, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp_path.replace(cache_path)
+    return features
+
+
+# ____ OUTCOMES ____
+def realized_outcomes(features):
+    """
+    Tatsächliches Ergebnis pro (Region, Track, Woche t): Label der Folgewoche t+1
+    (mehr als 15 Plätze gestiegen oder TOP 50). Aus den Charts gefallen → 0.
+    Die letzte Woche hat noch kein Ergebnis und wird verworfen.
+    """
+    keys = ["region"] if "region" in features.columns else []
+    weeks = np.sort(features["ds"].dropna().unique())
+    next_week = pd.Series(weeks[1:], index=weeks[:-1])
+
+    scored = features[features["ds"].isin(next_week.index)].copy()
+    scored["next_ds"] = scored["ds"].map(next_week)
+
+    outcome = features[[*keys, "track_id", "ds"]].assign(outcome=make_labels(features).to_numpy())
+    outcome = outcome.drop_duplicates([*keys, "track_id", "ds"]).rename(columns={"ds": "next_ds"})
+    scored = scored.merge(outcome, on=[*keys, "track_id", "next_ds"], how="left")
+    scored["outcome"] = scored["outcome"].fillna(0).astype(int)
+    return scored
+
+
+# ____ SCORING (PARALLEL) ____
+_worker_booster = None
+
+
+def _init_worker(model_path):
+    global _worker_booster
+    import lightgbm as lgb
+
+    _worker_booster = lgb.Booster(model_file=str(model_path))
+
+
+def _predict_chunk(X):
+    return _worker_booster.predict(X, num_threads=1)
+
+
+def score_weeks(frame, model_path, feature_cols, workers=None):
+    """
+    LightGBM-Scores für alle Wochen. Die Wochen werden in Blöcke geteilt und in
+    Prozessen bewertet (jeder Prozess lädt den Booster einmal).
+    """
+    X = frame[feature_cols].fillna(0).to_numpy(dtype=np.float64)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        _init_worker(model_path)
+        return _predict_chunk(X)
+
+    # Blockgrenzen an Wochengrenzen (frame ist nach ds sortiert)
+    week_starts = np.flatnonzero(np.r_[True, frame["ds"].to_numpy()[1:] != frame["ds"].to_numpy()[:-1]])
+    bounds = [week_starts[i] for i in np.linspace(0, len(week_starts), workers + 1, dtype=int)[:-1]] + [len(X)]
+    chunks = [X[a:b] for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+        return np.concatenate(list(pool.map(_predict_chunk, chunks)))
+
+
+# ____ AUSWERTUNG ____
+def weekly_report(scored, threshold, high_confidence=HIGH_CONFIDENCE):
+    """Precision, Recall und Lift (Precision / Basisrate) pro Woche und Region."""
+    keys = ["region"] if "region" in scored.columns else []
+    df = scored.assign(
+        flagged=scored["probability"] > threshold,
+        confident=scored["probability"] >= high_confidence,
+    )
+    df["hit"] = df["flagged"] & (df["outcome"] == 1)
+    df["confident_hit"] = df["confident"] & (df["outcome"] == 1)
+
+    report = (
+        df.groupby(["ds", *keys], observed=True)
+        .agg(
+            tracks=("outcome", "size"),
+            positives=("outcome", "sum"),
+            flagged=("flagged", "sum"),
+            hits=("hit", "sum"),
+            confident=("confident", "sum"),
+            confident_hits=("confident_hit", "sum"),
+        )
+        .reset_index()
+    )
+    report["base_rate"] = report["positives"] / report["tracks"]
+    report["precision"] = report["hits"] / report["flagged"].replace(0, np.nan)
+    report["recall"] = report["hits"] / report["positives"].replace(0, np.nan)
+    report["lift"] = report["precision"] / report["base_rate"].replace(0, np.nan)
+    report["precision_high_conf"] = report["confident_hits"] / report["confident"].replace(0, np.nan)
+    return report
+
+
+def summarize_report(report) -> dict:
+    """Gesamtwerte über alle Wochen (Mikro-Mittel) plus Median pro Woche."""
+    hits, flagged, positives = report["hits"].sum(), report["flagged"].sum(), report["positives"].sum()
+    base_rate = positives / report["tracks"].sum()
+    precision = hits / flagged if flagged else float("nan")
+    return {
+        "weeks": int(report["ds"].nunique()),
+        "precision": precision,
+        "recall": hits / positives if positives else float("nan"),
+        "lift": precision / base_rate if base_rate else float("nan"),
+        "base_rate": base_rate,
+        "precision_high_conf": (
+            report["confident_hits"].sum() / report["confident"].sum() if report["confident"].sum() else float("nan")
+        ),
+        "flagged_per_week": float(report.groupby("ds")["flagged"].sum().mean()),
+        "median_weekly_precision": float(report["precision"].median()),
+        "median_weekly_recall": float(report["recall"].median()),
+    }
+
+
+def run_backtest(
+    history_path=None,
+    version=None,
+    start=None,
+    end=None,
+    threshold=None,
+    workers=None,
+    model_dir=MODEL_DIR,
+    output_dir=BACKTEST_DIR
+):
+    """
+    Spielt die Historie Woche für Woche nach:
+    1. Kausale Features (gecacht pro Datenversion)
+    2. Prophet-Trend und Segment-Trends (kausal neu gefittet bis vor die erste bewertete Woche,
+       siehe causal_prophet/causal_segment_trends) + LightGBM-Score der gewählten Modellversion (Standard: aktiv)
+    3. Vergleich mit dem realisierten Ergebnis der Folgewoche
+    Wochen bis zum letzten Trainingsstand der Version sind als in_sample markiert.
+    Rückgabe: (Wochenbericht, Zusammenfassung).
+    """
+    from prophet.serialize import model_from_json
+    from .predict_pipeline import prophet_trend
+
+    started = time.perf_counter()
+    new_run("backtest")
+    history_path = Path(history_path) if history_path else default_history_path()
+    model_dir = Path(model_dir)
+
+    registry = load_registry(model_dir)
+    version = version or registry["active"]
+    artefacts = version_artefacts(version, model_dir)
+    entry = registry["versions"][version]
+
+    with open(artefacts["features"], "r") as f:
+        feature_cols = json.load(f)
+    if threshold is None:
+        with open(artefacts["threshold"], "r") as f:
+            threshold = json.load(f)["best_threshold"]
+
+    features = load_feature_state(history_path)
+    scored = realized_outcomes(features)
+    if start:
+        scored = scored[scored["ds"] >= pd.Timestamp(start)]
+    if end:
+        scored = scored[scored["ds"] <= pd.Timestamp(end)]
+    if scored.empty:
+        raise ValueError("Keine Wochen mit bekanntem Ergebnis im gewählten Zeitraum.")
+    scored = scored.sort_values("ds").reset_index(drop=True)
+
+    with open(artefacts["prophet"], "r") as f:
+        prophet_model = model_from_json(f.read())
+    # Der gespeicherte Prophet kennt die ganze Historie → Trend nur aus den Wochen vor dem Start
+    first_week = scored["ds"].min()
+    with stage("backtest.prophet_fit"):
+        causal = causal_prophet(prophet_model, first_week)
+    if causal is None:
+        print(
+            f"Warnung: weniger als {MIN_TREND_WEEKS} Wochen vor {first_week.date()} – "
+            "Prophet-Trend aus der ganzen Historie (Lookahead). Späteren --start wählen."
+        )
+    scored["prophet_trend"] = prophet_trend(scored, causal or prophet_model)
+    segment_fit = None
+    if "segment_trend" in feature_cols:
+        # Ebenso die Segmentmodelle: neu gefittet auf den Wochen vor dem Start, sonst neutral statt Lookahead
+        trends = None
+        if "segment_trends" in artefacts:
+            with open(artefacts["segment_trends"], "r") as f:
+                n_genres = len(json.load(f)["genres"])
+            with stage("backtest.segment_fit"):
+                trends = causal_segment_trends(history_path, first_week, n_genres, workers)
+        if trends is None:
+            print(
+                f"Warnung: kein Segment mit {SEGMENT_MIN_WEEKS} Wochen vor {first_week.date()} – "
+                "segment_trend wird neutral gesetzt (Feature ausgeschlossen)."
+            )
+        segment_fit = "excluded" if trends is None else "causal"
+        scored["segment_trend"] = segment_trend(scored, trends)
+
+    with stage("backtest.score", rows=len(scored), workers=workers):
+        scored["probability"] = score_weeks(scored, artefacts["lgbm"], feature_cols, workers)
+
+    report = weekly_report(scored, threshold)
+    # Validierungswochen (Early Stopping + Threshold) zählen ebenfalls als gesehen
+    data = entry.get("data", {})
+    last_trained = max(data.get("validation_weeks") or [data.get("last_week")]) if data.get("last_week") else None
+    report["in_sample"] = report["ds"] <= pd.Timestamp(last_trained) if last_trained else True
+
+    summary = {
+        "version": version,
+        "threshold": threshold,
+        "history": history_path.name,
+        # "causal": Trend nur bis vor first_week gefittet; "full_history": mit Lookahead
+        "prophet_trend": "full_history" if causal is None else "causal",
+        "prophet_fit_until": None if causal is None else str(first_week.date()),
+        # "causal": Segmentmodelle bis vor first_week gefittet; "excluded": neutral; None: Feature nicht genutzt
+        "segment_trend": segment_fit,
+        **summarize_report(report),
+        "out_of_sample": summarize_report(report[~report["in_sample"]]) if (~report["in_sample"]).any() else None,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"backtest_{version}_{datetime.now():%Y-%m-%d_%H-%M-%S}"
+    report.to_csv(output_dir / f"{stem}.csv", index=False)
+    (output_dir / f"{stem}.json").write_text(json.dumps(summary, indent=2, default=str))
+    print(f"Ergebnisse gespeichert unter: {output_dir / stem}.csv")
+    return report, summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Walk-forward-Backtest des Rising-Artist-Modells ohne Lookahead."
+    )
+    parser.add_argument("--history", type=Path, help="Historie (Standard: hist_data_updated.csv)")
+    parser.add_argument("--version", help="Modellversion aus models/registry.json (Standard: aktiv)")
+    parser.add_argument("--start", help="Erste bewertete Woche, z. B. 2024-06-06")
+    parser.add_argument("--end", help="Letzte bewertete Woche")
+    parser.add_argument("--threshold", type=float, help="Threshold statt des gespeicherten")
+    parser.add_argument("--workers", type=int, help="Prozesse für das Scoring (Standard: alle Kerne)")
+    args = parser.parse_args(argv)
+
+    try:
+        _, summary = run_backtest(
+            history_path=args.history, version=args.version, start=args.start, end=args.end,
+            threshold=args.threshold, workers=args.workers
+        )
+    except ValueError as e:
+        print(f"Fehler: {e}", file=sys.stderr)
+        return 1
+
+    print(
+        f"{summary['version']} @ {summary['threshold']}: {summary['weeks']} Wochen, "
+        f"Precision {summary['precision']:.3f}, Recall {summary['recall']:.3f}, Lift {summary['lift']:.2f} "
+        f"(Basisrate {summary['base_rate']:.3f}); Precision bei ≥ {HIGH_CONFIDENCE}: {summary['precision_high_conf']:.3f} "
+        f"({summary['seconds']:.1f} s)"
+    )
+    if summary["prophet_trend"] == "full_history":
+        print("Achtung: prophet_trend mit Lookahead (ganze Historie) – Ergebnisse sind optimistisch.")
+    if summary["segment_trend"] == "excluded":
+        print("Hinweis: segment_trend war neutral gesetzt – Ergebnisse unterschätzen das Modell eher.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from .synthetic_charts import generate_charts, to_history, write_raw_week
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+BENCHMARK_DIR = BASE_DIR / "data" / "benchmarks"
+
+# Skalen als "Wochen x Regionen"
+DEFAULT_SCALES = ["26x1", "104x1", "104x4"]
+
+# Faktor, ab dem eine Stufe im Vergleich als Regression gilt
+DEFAULT_TOLERANCE = 1.25
+
+
+def parse_scale(scale: str):
+    try:
+        weeks, regions = (int(x) for x in scale.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"Ungültige Skala: {scale} (erwartet z. B. 52x2)")
+    return weeks, regions
+
+
+def measure(fn, *args, repeat=3, **kwargs):
+    """
+    Misst eine Funktion: beste Wall-Time aus `repeat` Läufen ohne Tracing, danach ein
+    separater Lauf mit tracemalloc für den Peak-Speicher (Tracing verfälscht die Zeit).
+    Rückgabe: (Ergebnis, Messwerte).
+    """
+    times = []
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        result = fn(*args, **kwargs)
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    fn(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, {"seconds": min(times), "seconds_all": times, "peak_mb": peak / 1e6}
+
+
+# ____ STUFEN ____
+def bench_scale(weeks, regions, repeat=3, seed=0):
+    """Misst alle Pipeline-Stufen für eine Skala auf synthetischen Daten."""
+    from .extraction_unique_entities import prepare_regions
+    from .features import build_features
+    from .forecast_horizon import build_forecast_horizon
+    from .merge_dataframes import merge_new_data
+    from .predict_pipeline import load_artefacts, score_frame
+
+    load_artefacts()
+    charts, enriched = generate_charts(n_weeks=weeks + 1, n_regions=regions, seed=seed)
+    last_week = charts["chart_week"].max()
+    history = to_history(charts[charts["chart_week"] < last_week], enriched)
+
+    rows = []
+
+    def record(stage, n_rows, stats):
+        rows.append({"stage": stage, "weeks": weeks, "regions": regions, "rows": int(n_rows), **stats})
+        print(f"  {stage:<22} {stats['seconds']:>8.3f} s  {stats['peak_mb']:>8.1f} MB  ({n_rows:,} Zeilen)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        raw_paths = write_raw_week(charts, last_week, tmp / "raw")
+
+        # 1. Extraktion (eine Woche, alle Regionen)
+        (processed_paths, _, date_str), stats = measure(
+            prepare_regions, raw_paths, tmp / "processed", tmp / "interim", repeat=repeat
+        )
+        record("prepare_unique_tracks", len(raw_paths) * 200, stats)
+
+        # 2. Merge in die Historie (jeder Lauf startet von derselben Historie)
+        hist_path = tmp / "hist_base.csv"
+        history.to_csv(hist_path, index=False)
+        enriched_path = tmp / "interim" / f"enriched_data_{date_str}.csv"
+        enriched.to_csv(enriched_path, index=False)
+
+        hist_updated_path = tmp / "processed" / "hist_data_updated.csv"
+
+        def merge():
+            hist_updated_path.unlink(missing_ok=True)
+            return merge_new_data(
+                charts_csv=processed_paths,
+                enriched_csv=enriched_path,
+                date_str=date_str,
+                processed_dir=tmp / "processed",
+                hist_raw_path=hist_path,
+                hist_updated_path=hist_updated_path,
+                backup_dir=tmp / "backups"
+            )
+
+        df_merged, stats = measure(merge, repeat=repeat)
+        record("merge_new_data", len(df_merged), stats)
+
+        # 3. Features (ohne Streamlit-Cache)
+        df_features, stats = measure(build_features.__wrapped__, df_merged, repeat=repeat)
+        df_features["ds"] = pd.to_datetime(df_features["chart_week"])
+        record("build_features", len(df_features), stats)
+
+        # 4. Scoring (Prophet + LightGBM)
+        _, stats = measure(score_frame, df_features, repeat=repeat)
+        record("run_prediction_pipeline", len(df_features), stats)
+
+        # 5. Horizont (Cross Join Tracks × 12 Wochen)
+        future_df, stats = measure(build_forecast_horizon, df_features, repeat=repeat)
+        record("forecast_horizon", len(future_df), stats)
+
+    return rows
+
+
+# ____ ERGEBNISSE ____
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, repeat=3, seed=0, output_dir=BENCHMARK_DIR):
+    """Führt alle Skalen aus und speichert die Ergebnisse als JSON (eine Datei pro Lauf)."""
+    results = []
+    for scale in scales:
+        weeks, regions = parse_scale(scale)
+        print(f"Skala {weeks} Wochen × {regions} Region(en):")
+        results += bench_scale(weeks, regions, repeat=repeat, seed=seed)
+
+    commit = _git_commit()
+    report = {
+        "commit": commit,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "seed": seed,
+        "results": results,
+    }
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / f"bench_{datetime.now():%Y-%m-%d_%H-%M-%S}_{commit}.json"
+    path.write_text(json.dumps(report, indent=2))
+    print(f"Ergebnisse gespeichert unter: {path}")
+    return report, path
+
+
+def compare_reports(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """
+    Vergleicht zwei Läufe pro (Stufe, Skala).
+    Rückgabe: Liste der Regressionen (Zeit oder Speicher > tolerance × Baseline).
+    """
+    key = lambda row: (row["stage"], row["weeks"], row["regions"])
+    base = {key(row): row for row in baseline["results"]}
+
+    regressions = []
+    for row in current["results"]:
+        ref = base.get(key(row))
+        if ref is None:
+            continue
+        time_ratio = row["seconds"] / max(ref["seconds"], 1e-9)
+        mem_ratio = row["peak_mb"] / max(ref["peak_mb"], 1e-9)
+        flag = time_ratio > tolerance or mem_ratio > tolerance
+        print(
+            f"{row['stage']:<22} {row['weeks']:>4}x{row['regions']:<2} "
+            f"Zeit {time_ratio:>5.2f}×  Speicher {mem_ratio:>5.2f}×" + ("  ← Regression" if flag else "")
+        )
+        if flag:
+            regressions.append({**row, "time_ratio": time_ratio, "mem_ratio": mem_ratio})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark der Pipeline-Stufen auf synthetischen Chartdaten."
+    )
+    parser.add_argument("--scales", nargs="+", default=DEFAULT_SCALES,
+                        help="Skalen als WochenxRegionen, z. B. 26x1 104x4")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", type=Path, default=BENCHMARK_DIR)
+    parser.add_argument("--compare", type=Path,
+                        help="Baseline-JSON; Exit-Code 1 bei Regressionen")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    try:
+        report, _ = run_benchmarks(args.scales, args.repeat, args.seed, args.output_dir)
+    except ValueError as e:
+        print(f"Fehler: {e}", file=sys.stderr)
+        return 1
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare_reports(baseline, report, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} Regression(en) gegenüber {args.compare.name}.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import argparse
+import hashlib
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from .extraction_unique_entities import extract_date_from_filename, extract_region_from_filename
+from .history_store import load_history
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+RAW_DIR = BASE_DIR / "data" / "raw"
+HISTORY_PATH = BASE_DIR / "data" / "processed" / "df_cleaned_full.csv"
+MANIFEST_PATH = BASE_DIR / "data" / "interim" / "ingest_manifest.json"
+
+# Ordner mit Wochencharts: weekly-top-songs-global-2024, weekly-top-songs-de-2025, ...
+RAW_FOLDER_PATTERN = "weekly-top-songs-*"
+
+# Explizite Datentypen der Roh-CSVs (kein Type-Inference pro Datei)
+CHART_DTYPES = {
+    "rank": "int32",
+    "uri": "object",
+    "artist_names": "object",
+    "track_name": "object",
+    "source": "object",
+    "peak_rank": "int32",
+    "previous_rank": "int32",
+    "weeks_on_chart": "int32",
+    "streams": "int64",
+}
+
+# Spalten der Historie (wie in notebooks/01-03)
+KEEP_COLUMNS = [
+    "chart_week", "region", "rank", "uri", "artist_names",
+    "track_name", "peak_rank", "previous_rank", "weeks_on_chart", "streams"
+]
+
+HISTORY_KEYS = ["chart_week", "region", "uri"]
+
+
+# ____ DATEIEN FINDEN ____
+def find_chart_files(raw_dir=RAW_DIR, pattern=RAW_FOLDER_PATTERN):
+    """Alle Chart-CSVs in den Wochen-Ordnern (ohne Jupyter-Checkpoints)."""
+    files = []
+    for folder in sorted(Path(raw_dir).glob(pattern)):
+        if folder.is_dir():
+            files += [p for p in sorted(folder.glob("*.csv")) if "checkpoint" not in p.name]
+    return files
+
+
+def file_checksum(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# ____ PARSEN & VALIDIEREN ____
+def validate_chart_frame(df, path):
+    """Prüft Schema und Plausibilität einer Chart-Datei; wirft ValueError bei Fehlern."""
+    missing = [c for c in CHART_DTYPES if c not in df.columns and c != "source"]
+    if missing:
+        raise ValueError(f"{path}: fehlende Spalten {missing}")
+    if df.empty:
+        raise ValueError(f"{path}: keine Zeilen")
+    if (df["rank"] < 1).any():
+        raise ValueError(f"{path}: ungültige Ränge (< 1)")
+    if (df["streams"] < 0).any():
+        raise ValueError(f"{path}: negative Streams")
+    if df["uri"].duplicated().any():
+        raise ValueError(f"{path}: doppelte Track-URIs")
+
+
+def parse_chart_file(path, checksum=None):
+    """
+    Liest eine Wochen-CSV mit festen Datentypen, leitet chart_week und region
+    aus dem Dateinamen ab und gibt (DataFrame, Checksumme) zurück.
+    `checksum`: bereits berechnete Checksumme (sonst wird die Datei gehasht).
+    """
+    path = Path(path)
+    df = pd.read_csv(path, dtype=CHART_DTYPES, encoding="utf-8-sig")
+    validate_chart_frame(df, path)
+
+    df["chart_week"] = pd.to_datetime(extract_date_from_filename(path.name), format="%Y-%m-%d")
+    df["region"] = extract_region_from_filename(path.name)
+
+    # Whitespaces an den Enden entfernen (wie in notebooks/03)
+    df["artist_names"] = df["artist_names"].str.strip()
+    df["track_name"] = df["track_name"].str.strip()
+
+    return df[KEEP_COLUMNS], checksum or file_checksum(path)
+
+
+# ____ MANIFEST ____
+def load_manifest(manifest_path=MANIFEST_PATH) -> dict:
+    manifest_path = Path(manifest_path)
+    if manifest_path.exists():
+        return json.loads(manifest_path.read_text())
+    return {}
+
+
+def save_manifest(manifest, manifest_path=MANIFEST_PATH):
+    manifest_path = Path(manifest_path)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+
+
+def _manifest_key(path, raw_dir):
+    try:
+        return str(Path(path).resolve().relative_to(Path(raw_dir).resolve()))
+    except ValueError:
+        return str(Path(path).resolve())
+
+
+# ____ BACKFILL ____
+def backfill_history(
+    raw_dir=RAW_DIR,
+    history_path=HISTORY_PATH,
+    manifest_path=MANIFEST_PATH,
+    max_workers=None,
+    force=False
+):
+    """
+    Lädt alle Roh-Wochencharts in die Chart-Historie (df_cleaned_full.csv).
+    1. Dateien finden; bereits geladene (gleicher Pfad + Checksumme) überspringen
+    2. Neue Dateien parallel parsen (Prozess-Pool, feste Datentypen, Validierung)
+    3. An die Historie anhängen, über (chart_week, region, uri) deduplizieren, sortieren
+    4. Manifest aktualisieren
+    """
+    started = time.perf_counter()
+    files = find_chart_files(raw_dir)
+    manifest = {} if force else load_manifest(manifest_path)
+
+    # Vorab-Check über die Checksumme (günstig im Vergleich zum Parsen); jede Datei wird nur einmal gehasht
+    checksums = {p: file_checksum(p) for p in files}
+    pending = [
+        p for p in files
+        if manifest.get(_manifest_key(p, raw_dir), {}).get("sha256") != checksums[p]
+    ]
+
+    if not pending:
+        print(f"Keine neuen Dateien ({len(files)} bereits geladen).")
+        return 0
+
+    print(f"Lade {len(pending)} von {len(files)} Dateien...")
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(parse_chart_file, pending, [checksums[p] for p in pending], chunksize=8))
+
+    df_new = pd.concat([df for df, _ in results], ignore_index=True)
+
+    history_path = Path(history_path)
+    if history_path.exists() and not force:
+        df_hist = load_history(history_path, columns=KEEP_COLUMNS)
+        if "region" not in df_hist.columns:
+            df_hist.insert(1, "region", "global")
+        categorical = df_hist.select_dtypes("category").columns
+        df_all = pd.concat([df_hist.astype({c: object for c in categorical}), df_new], ignore_index=True)
+    else:
+        df_all = df_new
+
+    df_all = (
+        df_all.drop_duplicates(subset=HISTORY_KEYS, keep="last")
+        .sort_values(by=["chart_week", "region", "rank"])
+        .reset_index(drop=True)
+    )
+
+    history_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = history_path.with_suffix(".tmp")
+    df_all.to_csv(tmp_path, index=False, date_format="%Y-%m-%d")
+    tmp_path.replace(history_path)
+
+    now = datetime.now().isoformat(timespec="seconds")
+    for path, (df, checksum) in zip(pending, results):
+        manifest[_manifest_key(path, raw_dir)] = {
+            "sha256": checksum,
+            "rows": len(df),
+            "ingested_at": now,
+        }
+    save_manifest(manifest, manifest_path)
+
+    print(
+        f"{len(df_new)} Zeilen aus {len(pending)} Dateien geladen, "
+        f"Historie: {len(df_all)} Zeilen ({time.perf_counter() - started:.1f} s)."
+    )
+    return len(pending)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Backfill der Chart-Historie aus den Roh-Wochenordnern."
+    )
+    parser.add_argument("--raw-dir", type=Path, default=RAW_DIR)
+    parser.add_argument("--output", type=Path, default=HISTORY_PATH)
+    parser.add_argument("--manifest", type=Path, default=MANIFEST_PATH)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true",
+                        help="Manifest ignorieren und Historie komplett neu aufbauen.")
+    args = parser.parse_args(argv)
+
+    try:
+        backfill_history(args.raw_dir, args.output, args.manifest, args.workers, args.force)
+    except ValueError as e:
+        print(f"Fehler: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .artist_credits import per_artist_totals
+from .features import genre_parser
+from .history_store import load_history
+from .instrumentation import new_run, stage
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+CONCENTRATION_PATH = BASE_DIR / "data" / "interim" / "concentration.csv"
+
+DIMENSIONS = ("track", "artist", "genre")
+TOP_N = (1, 5, 10)
+
+METRIC_COLUMNS = ["n", "total", "rows", "hhi", "entropy", "gini"] + [f"top{n}_share" for n in TOP_N]
+
+
+# ____ STREAMS PRO EINHEIT ____
+def segment_keys(df, period="chart_week") -> list:
+    """Ein Segment = eine Woche (pro Region, falls die Historie mehrere enthält)."""
+    return ["region", period] if "region" in df.columns else [period]
+
+
+def _track_key(df):
+    for col in ("track_id", "uri"):
+        if col in df.columns:
+            return df[col]
+    return df["artist_names"].astype(str) + " – " + df["track_name"].astype(str)
+
+
+def genre_totals(df, keys) -> pd.DataFrame:
+    """
+    Streams pro (Segment, Genre), Streams eines Tracks gleichmäßig auf seine Genres verteilt.
+    Tracks ohne bekanntes Genre ('unknown', gut die Hälfte der Historie) zählen nicht mit –
+    sonst wäre 'unknown' jede Woche das dominierende „Genre“. Genre-Strings werden nur einmal geparst.
+    """
+    codes, uniques = pd.factorize(df["artist_genres"], use_na_sentinel=False)
+    parsed = [[g for g in genre_parser(v) if g != "unknown"] for v in uniques]
+    bridge = pd.DataFrame({
+        "code": np.repeat(np.arange(len(parsed)), [len(p) for p in parsed]),
+        "entity": [g for p in parsed for g in p],
+        "share": np.concatenate([np.full(len(p), 1.0 / max(len(p), 1)) for p in parsed]) if parsed else [],
+    })
+
+    per_string = (
+        df[keys].assign(code=codes, streams=df["streams"].to_numpy(dtype=float))
+        .groupby([*keys, "code"], observed=True, as_index=False)["streams"].sum()
+    )
+    rows = per_string.merge(bridge, on="code")
+    rows["streams"] *= rows["share"]
+    return rows.groupby([*keys, "entity"], observed=True, as_index=False)["streams"].sum()
+
+
+def entity_totals(df, dimension, keys) -> pd.DataFrame:
+    """Streams pro (Segment, Einheit): DataFrame [keys..., entity, streams]."""
+    if dimension == "track":
+        out = (
+            df[keys].assign(entity=_track_key(df).astype(str).to_numpy(), streams=df["streams"].to_numpy(dtype=float))
+            .groupby([*keys, "entity"], observed=True, as_index=False)["streams"].sum()
+        )
+    elif dimension == "artist":
+        # Kollaborationen über die Credit-Bridge aufgeteilt (wie auf der Analyse-Seite)
+        out = per_artist_totals(df, by=keys).rename(columns={"artist": "entity"})
+    elif dimension == "genre":
+        out = genre_totals(df, keys)
+    else:
+        raise ValueError(f"Unbekannte Dimension: {dimension}. Erlaubt: {list(DIMENSIONS)}")
+    return out[out["streams"] > 0]
+
+
+# ____ KENNZAHLEN ____
+def concentration_metrics(totals, keys, top_n=TOP_N) -> pd.DataFrame:
+    """
+    Kennzahlen pro Segment in einem Durchlauf über vorsortierte Segmente
+    (Sortierung nach Segment, Streams absteigend; Summen per np.add.reduceat):
+    - hhi       Σ s²                     (0–1; 1 = eine Einheit hat alles)
+    - entropy   −Σ s · ln s              (Shannon, in nats; 0 = maximal konzentriert)
+    - gini      (n + 1 − 2 Σ r · s) / n  (r = Rang, 1 = größte Einheit)
+    - topN_share Anteil der N größten Einheiten
+    """
+    if totals.empty:
+        return pd.DataFrame(columns=[*keys, *(c for c in METRIC_COLUMNS if c != "rows")])
+
+    segment_codes, segments = pd.factorize(
+        pd.MultiIndex.from_frame(totals[keys]) if len(keys) > 1 else totals[keys[0]], sort=True
+    )
+    values = totals["streams"].to_numpy(dtype=float)
+    order = np.lexsort((-values, segment_codes))
+    seg = segment_codes[order]
+    values = values[order]
+
+    starts = np.flatnonzero(np.r_[True, seg[1:] != seg[:-1]])
+    counts = np.diff(np.r_[starts, len(seg)])
+    total = np.add.reduceat(values, starts)
+
+    shares = values / np.repeat(total, counts)
+    rank = np.arange(len(seg)) - np.repeat(starts, counts) + 1
+
+    out = (
+        segments[seg[starts]].to_frame(index=False, name=keys) if len(keys) > 1
+        else pd.DataFrame({keys[0]: np.asarray(segments)[seg[starts]]})
+    )
+    out["n"] = counts
+    out["total"] = total
+    out["hhi"] = np.add.reduceat(shares ** 2, starts)
+    out["entropy"] = -np.add.reduceat(shares * np.log(shares), starts)
+    out["gini"] = (counts + 1 - 2 * np.add.reduceat(rank * shares, starts)) / counts
+    for n in top_n:
+        out[f"top{n}_share"] = np.add.reduceat(np.where(rank <= n, shares, 0.0), starts)
+    return out
+
+
+def concentration_frame(df, dimensions=DIMENSIONS, period="chart_week", top_n=TOP_N) -> pd.DataFrame:
+    """
+    Kennzahlen pro Segment und Dimension (langes Format):
+    [region, chart_week, dimension, n, total, rows, hhi, entropy, gini, top1_share, ...].
+    Genres nur, wenn `artist_genres` vorhanden ist.
+    """
+    keys = segment_keys(df, period)
+    rows = df.groupby(keys, observed=True).size().rename("rows").reset_index()
+
+    frames = []
+    for dimension in dimensions:
+        if dimension == "genre" and "artist_genres" not in df.columns:
+            continue
+        with stage(f"concentration.{dimension}", rows=len(df)):
+            metrics = concentration_metrics(entity_totals(df, dimension, keys), keys, top_n)
+        frames.append(metrics.assign(dimension=dimension))
+
+    if not frames:
+        return pd.DataFrame(columns=[*keys, "dimension", *METRIC_COLUMNS])
+    out = pd.concat(frames, ignore_index=True).merge(rows, on=keys, how="left")
+    metric_cols = [c for c in METRIC_COLUMNS if c in out.columns]
+    return out[[*keys, "dimension", *metric_cols]].sort_values([*keys, "dimension"]).reset_index(drop=True)
+
+
+# ____ INKREMENTELLE AKTUALISIERUNG ____
+def load_concentration(path=CONCENTRATION_PATH) -> pd.DataFrame:
+    path = Path(path)
+    if not path.exists():
+        return pd.DataFrame()
+    return pd.read_csv(path, parse_dates=["chart_week"])
+
+
+def changed_segments(df, stored, period="chart_week") -> pd.DataFrame:
+    """
+    Segmente, die neu sind oder sich geändert haben (andere Zeilenzahl oder Stream-Summe,
+    z. B. eine Woche, die aus Tagescharts neu aufgerollt wurde). Rückgabe: DataFrame [keys...].
+    """
+    keys = segment_keys(df, period)
+    current = df.groupby(keys, observed=True).agg(rows=("streams", "size"), total=("streams", "sum")).reset_index()
+    if stored.empty:
+        return current[keys]
+
+    known = stored[stored["dimension"] == "track"][[*keys, "rows", "total"]]
+    current[period] = pd.to_datetime(current[period])
+    if "region" in keys:
+        current["region"] = current["region"].astype(str)
+        known = known.assign(region=known["region"].astype(str))
+    merged = current.merge(known, on=keys, how="left", suffixes=("", "_stored"))
+    changed = (
+        merged["rows_stored"].isna()
+        | (merged["rows"] != merged["rows_stored"])
+        | ~np.isclose(merged["total"].astype(float), merged["total_stored"].astype(float), rtol=0, atol=0.5)
+    )
+    return merged.loc[changed, keys]
+
+
+def update_concentration(df, path=CONCENTRATION_PATH, period="chart_week") -> pd.DataFrame:
+    """
+    Berechnet nur neue oder geänderte Wochen und schreibt die Reihe atomar zurück.
+    Kennzahlen einer Woche hängen nur von dieser Woche ab → das Ergebnis ist identisch
+    zur vollständigen Neuberechnung. Rückgabe: die komplette Reihe.
+    """
+    path = Path(path)
+    stored = load_concentration(path)
+    keys = segment_keys(df, period)
+    todo = changed_segments(df, stored, period)
+    if todo.empty:
+        print(f"Konzentration: keine neuen Wochen ({stored[period].nunique()} gespeichert).")
+        return stored
+
+    if "region" in keys:
+        mask = pd.MultiIndex.from_frame(df[keys].astype({"region": str})).isin(
+            pd.MultiIndex.from_frame(todo.astype({"region": str}))
+        )
+    else:
+        mask = pd.to_datetime(df[period]).isin(todo[period])
+    fresh = concentration_frame(df[mask], period=period)
+
+    if not stored.empty:
+        fresh_keys = pd.MultiIndex.from_frame(fresh[keys].astype(str))
+        stored = stored[~pd.MultiIndex.from_frame(stored[keys].astype(str)).isin(fresh_keys)]
+    result = pd.concat([stored, fresh], ignore_index=True) if not stored.empty else fresh
+    result = result.sort_values([*keys, "dimension"]).reset_index(drop=True)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    result.to_csv(tmp_path, index=False)
+    tmp_path.replace(path)
+    print(f"Konzentration: {len(todo)} Wochen berechnet, {result[period].nunique()} gespeichert.")
+    return result
+
+
+# ____ ZUGRIFF FÜR SEITEN & FEATURES ____
+def concentration_series(series, dimension="artist", metric="hhi", region=None) -> pd.Series:
+    """Eine Kennzahl als Zeitreihe (Index = Woche)."""
+    part = series[series["dimension"] == dimension]
+    if region is not None and "region" in part.columns:
+        part = part[part["region"].astype(str) == region]
+    return part.set_index("chart_week")[metric].sort_index()
+
+
+def concentration_features(df, series, dimension="artist", metrics=("hhi", "top1_share"), period="ds") -> pd.DataFrame:
+    """
+    Kennzahlen der jeweiligen Woche als Feature-Spalten pro Zeile von df
+    (z. B. artist_hhi, artist_top1_share); Wochen ohne Kennzahl → NaN.
+    """
+    keys = ["region", "chart_week"] if "region" in df.columns and "region" in series.columns else ["chart_week"]
+    part = series[series["dimension"] == dimension][[*keys, *metrics]]
+    part = part.rename(columns={m: f"{dimension}_{m}" for m in metrics})
+
+    left = pd.DataFrame({"chart_week": pd.to_datetime(df[period]).to_numpy()})
+    if "region" in keys:
+        left["region"] = df["region"].astype(str).to_numpy()
+        part = part.assign(region=part["region"].astype(str))
+    part = part.assign(chart_week=pd.to_datetime(part["chart_week"]))
+    out = left.merge(part, on=keys, how="left")
+    out.index = df.index
+    return out[[f"{dimension}_{m}" for m in metrics]]
+
+
+# ____ CLI ____
+def main(argv=None):
+    from .train import default_history_path
+
+    parser = argparse.ArgumentParser(
+        description="Marktkonzentration (HHI, Entropie, Gini, Top-N-Anteil) pro Woche für Tracks, Künstler und Genres."
+    )
+    parser.add_argument("--history", type=Path, help="Historie (Standard: hist_data_updated.csv)")
+    parser.add_argument("--output", type=Path, default=CONCENTRATION_PATH)
+    parser.add_argument("--full", action="store_true", help="Alle Wochen neu berechnen")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    new_run("concentration")
+    try:
+        df = load_history(args.history or default_history_path())
+    except (OSError, ValueError) as e:
+        print(f"Fehler: {e}", file=sys.stderr)
+        return 1
+
+    if args.full and args.output.exists():
+        args.output.unlink()
+    series = update_concentration(df, args.output)
+
+    latest = series[series["chart_week"] == series["chart_week"].max()]
+    for _, row in latest.iterrows():
+        print(
+            f"  {row['dimension']:<7} HHI {row['hhi']:.4f}  Entropie {row['entropy']:.2f}  "
+            f"Gini {row['gini']:.3f}  Top-1 {row['top1_share']:.1%}  Top-10 {row['top10_share']:.1%}"
+        )
+    print(f"Fertig in {time.perf_counter() - started:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# Zeilen pro LightGBM-Aufruf (begrenzt den Speicher der float64-Zwischenergebnisse)
+SCORE_CHUNK_ROWS = 100_000
+
+# Spalte für den Basiswert (erwarteter Log-Odds-Wert des Modells)
+BASE_COLUMN = "base"
+
+FEATURE_LABELS = {
+    "artist_growth_rate": "Künstler-Wachstum",
+    "genre_pop_idx": "Genre-Popularität",
+    "seasonality_score": "Saisonalität",
+    "track_popularity": "Track-Popularität",
+    "prophet_trend": "Markttrend",
+    "segment_trend": "Segment-Trend",
+    BASE_COLUMN: "Basiswert",
+}
+
+
+# ____ BEITRAGSTABELLE PRO BLATT ____
+_leaf_tables = weakref.WeakKeyDictionary()
+
+
+def leaf_contribution_table(booster):
+    """
+    Pfad-Beiträge pro Blatt (Saabas-Methode): für jeden Baum und jedes Blatt die Summe der
+    Wertänderungen entlang des Pfads, getrennt nach Split-Feature, plus Basiswert (Wurzel).
+    Pro Blatt ergibt die Zeilensumme genau den Blattwert → Beiträge addieren sich zum Raw-Score.
+    Wird einmal pro Booster berechnet. Rückgabe: Liste von Arrays (Blätter × Features+1).
+    """
+    if booster in _leaf_tables:
+        return _leaf_tables[booster]
+
+    n_features = booster.num_feature()
+    tables = []
+    for tree in booster.dump_model()["tree_info"]:
+        root = tree["tree_structure"]
+        table = np.zeros((tree["num_leaves"], n_features + 1))
+
+        if "leaf_value" in root:
+            # Baum ohne Split: alles im Basiswert
+            table[:, n_features] = root["leaf_value"]
+            tables.append(table)
+            continue
+
+        stack = [(root, np.zeros(n_features + 1))]
+        stack[0][1][n_features] = root["internal_value"]
+        while stack:
+            node, path = stack.pop()
+            for side in ("left_child", "right_child"):
+                child = node[side]
+                value = child["leaf_value"] if "leaf_index" in child else child["internal_value"]
+                child_path = path.copy()
+                child_path[node["split_feature"]] += value - node["internal_value"]
+                if "leaf_index" in child:
+                    table[child["leaf_index"]] = child_path
+                else:
+                    stack.append((child, child_path))
+        tables.append(table)
+
+    _leaf_tables[booster] = tables
+    return tables
+
+
+def _path_contributions(booster, chunk):
+    """Beiträge per Blatt-Lookup: pred_leaf (ein Baumdurchlauf) + Summe der Blatt-Tabellen."""
+    leaves = booster.predict(chunk, pred_leaf=True)
+    tables = leaf_contribution_table(booster)
+    contrib = np.zeros((len(chunk), booster.num_feature() + 1))
+    for t in range(leaves.shape[1]):
+        contrib += tables[t][leaves[:, t]]
+    return contrib
+
+
+# ____ SCORING MIT BEITRÄGEN ____
+def predict_chunked(booster, X, explain=False, method="path", chunk_rows=SCORE_CHUNK_ROWS):
+    """
+    LightGBM-Vorhersage in Blöcken.
+    Mit explain=True liefert ein Durchlauf pro Block beides: die Feature-Beiträge
+    (Log-Odds, letzte Spalte = Basiswert) und die Wahrscheinlichkeit als Sigmoid ihrer Zeilensumme.
+    - method="path": Blatt-Lookup (pred_leaf + Beitragstabelle), kaum teurer als predict
+    - method="shap": exakte TreeSHAP-Werte (pred_contrib), um Größenordnungen langsamer
+    Rückgabe: (probs, contrib) mit contrib als float32-DataFrame (None ohne explain).
+    """
+    if method not in ("path", "shap"):
+        raise ValueError(f"Unbekannte Methode: {method}")
+
+    n = len(X)
+    probs = np.empty(n, dtype=np.float64)
+    contrib = np.empty((n, X.shape[1] + 1), dtype=np.float32) if explain else None
+
+    for start in range(0, n, chunk_rows):
+        chunk = X.iloc[start:start + chunk_rows]
+        if explain:
+            if method == "shap":
+                raw = booster.predict(chunk, pred_contrib=True)
+            else:
+                raw = _path_contributions(booster, chunk)
+            contrib[start:start + len(chunk)] = raw
+            probs[start:start + len(chunk)] = 1.0 / (1.0 + np.exp(-raw.sum(axis=1)))
+        else:
+            probs[start:start + len(chunk)] = booster.predict(chunk)
+
+    if explain:
+        contrib = pd.DataFrame(contrib, columns=[*X.columns, BASE_COLUMN], index=X.index)
+    return probs, contrib
+
+
+# ____ SPEICHER PRO SCORING-LAUF ____
+class Explanations:
+    """
+    Feature-Beiträge eines Scoring-Laufs als float32-Matrix, Zugriff über die row_id
+    der gescorten Zeilen (Erklärung = Lookup statt erneutem Scoring).
+    """
+
+    def __init__(self, row_ids, contrib):
+        self.columns = list(contrib.columns)
+        self.matrix = np.ascontiguousarray(contrib.to_numpy(dtype=np.float32))
+        self.index = pd.Index(np.asarray(row_ids, dtype=np.int64))
+        if len(self.index) != len(self.matrix):
+            raise ValueError("row_ids und Beitragsmatrix haben unterschiedliche Längen.")
+
+    @property
+    def nbytes(self):
+        return self.matrix.nbytes + self.index.nbytes
+
+    def lookup(self, row_ids) -> pd.DataFrame:
+        """Beiträge für mehrere Zeilen (Index = row_id); unbekannte IDs werden ausgelassen."""
+        pos = self.index.get_indexer(np.asarray(row_ids, dtype=np.int64))
+        pos = pos[pos >= 0]
+        return pd.DataFrame(self.matrix[pos], columns=self.columns, index=self.index[pos])
+
+    def row(self, row_id) -> pd.Series:
+        """Beiträge einer Zeile, absteigend nach Betrag (Basiswert zuletzt)."""
+        pos = self.index.get_loc(int(row_id))
+        values = pd.Series(self.matrix[pos], index=self.columns)
+        features = values.drop(BASE_COLUMN)
+        return pd.concat([features.reindex(features.abs().sort_values(ascending=False).index), values[[BASE_COLUMN]]])
+
+    def top_drivers(self, row_id, n=3) -> list:
+        """Die n Features mit dem größten Beitrag: [(Label, Wert), ...]."""
+        values = self.row(row_id).drop(BASE_COLUMN).head(n)
+        return [(FEATURE_LABELS.get(name, name), float(value)) for name, value in values.items()]
+
+
+# ____ DARSTELLUNG ____
+def contribution_figure(contrib, title=None):
+    """Horizontales Balkendiagramm der Beiträge einer Zeile (grün = erhöht, rot = senkt)."""
+    import plotly.graph_objects as go
+
+    values = contrib.drop(BASE_COLUMN, errors="ignore")[::-1]
+    fig = go.Figure(go.Bar(
+        x=values.to_numpy(),
+        y=[FEATURE_LABELS.get(name, name) for name in values.index],
+        orientation="h",
+        marker_color=["#1DB954" if v >= 0 else "#E74C3C" for v in values.to_numpy()],
+        hovertemplate="%{y}: %{x:+.3f}<extra></extra>",
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title="Beitrag zur Wahrscheinlichkeit (Log-Odds)",
+        height=300,
+        margin=dict(l=10, r=10, t=50, b=40),
+    )
+    return fig
+
+
+def format_drivers(drivers) -> str:
+    return ", ".join(f"{label} ({value:+.2f})" for label, value in drivers)
@@ -1,6 +1,11 @@
 import pandas as pd
 import re
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from .granularity import extract_granularity_from_filename, granularity_config
+
+DEFAULT_REGION = "global"
 
 def extract_date_from_filename(filename: str) -> str: 
     """
@@ -12,11 +17,20 @@ def extract_date_from_filename(filename: str) -> str:
         raise ValueError(f"Kein Datum im Dateinnamen gefunden: {filename}")
     return match.group(0)
 
+def extract_region_from_filename(filename: str) -> str:
+    """
+    Extrahiert die Region aus einem Dateinamen wie:
+    regional-de-weekly-2026-01-08.csv → "de"
+    Ohne erkennbare Region wird "global" angenommen.
+    """
+    match = re.search(r"regional-([a-z0-9]+)-(?:weekly|daily)", filename.lower())
+    return match.group(1) if match else DEFAULT_REGION
+
 def prepare_unique_tracks(input_path: str, processed_dir: str, output_dir: str):
     """
     1. Die CSV-Datei laden
-    2. Datum aus Dateinamen extrahieren
-    3. Spalte chart_week einfügen (zunächst als String, später im Datumsformat)
+    2. Datum, Region und Granularität (weekly/daily) aus Dateinamen extrahieren
+    3. Periodenspalte (chart_week bzw. chart_date) und region einfügen
     4. Eindeutige Kombinationen aus track_name + artist_names erzeugen
     5. Datei speichern
     """
@@ -27,19 +41,23 @@ def prepare_unique_tracks(input_path: str, processed_dir: str, output_dir: str):
     processed_dir.mkdir(parents=True, exist_ok=True) 
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Datum extrahieren
+    # Datum und Region extrahieren
     date_str = extract_date_from_filename(input_path.name)
+    region = extract_region_from_filename(input_path.name)
+    granularity = extract_granularity_from_filename(input_path.name)
+    period_col = granularity_config(granularity)["period_col"]
 
     df = pd.read_csv(input_path)
 
-    # chart_week-Spalte einfügen
-    df.insert(0, "chart_week", date_str)
+    # Perioden- und region-Spalte einfügen
+    df.insert(0, period_col, date_str)
+    df.insert(1, "region", region)
 
-    # chart_week als Datum casten
-    df["chart_week"] = pd.to_datetime(df["chart_week"], format="%Y-%m-%d")
+    # Periode als Datum casten
+    df[period_col] = pd.to_datetime(df[period_col], format="%Y-%m-%d")
     
-    # Original-Datei mit Spalte "chart_week" speichern
-    processed_path = processed_dir / f"regional_global_weekly_{date_str}.csv" 
+    # Original-Datei mit Periodenspalte speichern
+    processed_path = processed_dir / f"regional_{region}_{granularity}_{date_str}.csv" 
     df.to_csv(processed_path, index=False)
 
     # Eindeutige Kombinationen extrahieren
@@ -52,8 +70,57 @@ def prepare_unique_tracks(input_path: str, processed_dir: str, output_dir: str):
     output_dir_path = Path(output_dir) 
     output_dir_path.mkdir(parents=True, exist_ok=True) 
     
-    output_path = output_dir_path / f"unique_tracks_to_enrich_{date_str}.csv"
+    suffix = date_str if region == DEFAULT_REGION else f"{region}_{date_str}"
+    if granularity != "weekly":
+        suffix = f"{granularity}_{suffix}"
+    output_path = output_dir_path / f"unique_tracks_to_enrich_{suffix}.csv"
     df_unique.to_csv(output_path, index=False)
 
     print(f"Gespeichert unter: {output_path}")
-    return processed_path, output_path, date_str
\ No newline at end of file
+    return processed_path, output_path, date_str
+
+def prepare_regions(input_paths, processed_dir: str, output_dir: str, max_workers=None):
+    """
+    Verarbeitet die Charts mehrerer Regionen derselben Periode (Woche oder Tag):
+    1. prepare_unique_tracks pro Region parallel (Prozess-Pool)
+    2. Eindeutige Tracks über alle Regionen deduplizieren,
+       damit jeder Track nur einmal angereichert wird
+    3. Gemeinsame Datei unique_tracks_to_enrich_YYYY-MM-DD.csv speichern
+    """
+    input_paths = [Path(p) for p in input_paths]
+
+    dates = {extract_date_from_filename(p.name) for p in input_paths}
+    if len(dates) != 1:
+        raise ValueError(f"Alle Dateien müssen dieselbe Periode enthalten, gefunden: {sorted(dates)}")
+
+    granularities = {extract_granularity_from_filename(p.name) for p in input_paths}
+    if len(granularities) != 1:
+        raise ValueError(f"Tages- und Wochencharts bitte getrennt hochladen: {sorted(granularities)}")
+
+    if len(input_paths) == 1:
+        results = [prepare_unique_tracks(input_paths[0], processed_dir, output_dir)]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(
+                prepare_unique_tracks,
+                input_paths,
+                [processed_dir] * len(input_paths),
+                [output_dir] * len(input_paths)
+            ))
+
+    processed_paths = [r[0] for r in results]
+    date_str = results[0][2]
+
+    # Regionsübergreifend deduplizieren
+    df_unique = (
+        pd.concat([pd.read_csv(r[1]) for r in results], ignore_index=True)
+        .drop_duplicates(subset=["track_name", "artist_names"])
+    )
+
+    granularity = granularities.pop()
+    prefix = "" if granularity == "weekly" else f"{granularity}_"
+    output_path = Path(output_dir) / f"unique_tracks_to_enrich_{prefix}{date_str}.csv"
+    df_unique.to_csv(output_path, index=False)
+
+    print(f"{len(input_paths)} Regionen verarbeitet, {len(df_unique)} eindeutige Tracks für das Enrichment.")
+    return processed_paths, output_path, date_str
@@ -0,0 +1,76 @@
+import threading
+import time
+
+# Fester Beispielbericht (Markdown wie ein echter Gemini-Bericht)
+DEFAULT_REPORT = """### 🎧 Trendprognose für die kommende Woche (Testbericht)
+
+- 📈 **Momentum:** Mehrere Artists zeigen laut Modell klare Aufwärtstendenzen.
+- ⭐ **Top-Kandidat:** Der höchstbewertete Artist führt die Prognose deutlich an.
+- 🎶 **Genres:** Die stärksten Genres der Woche bleiben stabil.
+
+*Erzeugt vom lokalen Fake-Client – keine echte Modellantwort.*
+"""
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class _FakeModels:
+    def __init__(self, client):
+        self._client = client
+
+    def generate_content(self, model, contents):
+        self._client.calls.append({"model": model, "contents": contents, "stream": False})
+        chunks = self._client.chunks()
+        time.sleep(self._client.first_token_delay + self._client.chunk_delay * len(chunks))
+        if self._client.error is not None:
+            raise self._client.error
+        if self._client.take_transient_failure():
+            raise RuntimeError("503 UNAVAILABLE: Das Modell ist überlastet (Fake).")
+        return FakeResponse(self._client.text)
+
+    def generate_content_stream(self, model, contents):
+        self._client.calls.append({"model": model, "contents": contents, "stream": True})
+        time.sleep(self._client.first_token_delay)
+        chunks = self._client.chunks()
+        if self._client.error is not None:
+            chunks = chunks[:self._client.fail_after]
+        for chunk in chunks:
+            yield FakeResponse(chunk)
+            time.sleep(self._client.chunk_delay)
+        if self._client.error is not None:
+            raise self._client.error
+
+
+class FakeGeminiClient:
+    """
+    Lokaler Ersatz für genai.Client (gleiche Schnittstelle: client.models.generate_content /
+    generate_content_stream). Liefert einen festen Text in Stücken mit einstellbaren Verzögerungen,
+    optional mit Fehler nach `fail_after` Stücken. `transient_failures` lässt die ersten
+    n Aufrufe von generate_content scheitern (für Retries). Aktiv im Dashboard mit GEMINI_FAKE=1.
+    """
+
+    def __init__(self, text=DEFAULT_REPORT, chunk_chars=24, first_token_delay=0.8,
+                 chunk_delay=0.05, error=None, fail_after=0, transient_failures=0):
+        self.text = text
+        self.chunk_chars = chunk_chars
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+        self.error = error
+        self.fail_after = fail_after
+        self.transient_failures = transient_failures
+        self.calls = []
+        self._lock = threading.Lock()
+        self.models = _FakeModels(self)
+
+    def take_transient_failure(self) -> bool:
+        with self._lock:
+            if self.transient_failures > 0:
+                self.transient_failures -= 1
+                return True
+            return False
+
+    def chunks(self) -> list:
+        return [self.text[i:i + self.chunk_chars] for i in range(0, len(self.text), self.chunk_chars)]
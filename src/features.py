@@ -2,6 +2,9 @@ import pandas as pd
 import ast
 import streamlit as st
 
+from .artist_credits import build_credit_bridge, bridge_shares, per_artist_growth, per_artist_totals
+from .instrumentation import stage
+
 # ____ GENRE PARSER ____
 def genre_parser(val):
     """Bringt die Zeilen der Spalte 'artist_genres' in ein einheitliches Format."""
@@ -28,57 +31,94 @@ def genre_parser(val):
     # Einzelnes Genre
     return [val_str]
 
+def parse_genres(series):
+    """
+    Wendet genre_parser nur auf die eindeutigen Werte an und verteilt das Ergebnis
+    zurück auf alle Zeilen (die Historie wiederholt dieselben Genre-Strings sehr oft).
+    """
+    try:
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    except TypeError:
+        # Bereits geparste Listen sind nicht hashbar
+        return series.apply(genre_parser)
+
+    parsed = [genre_parser(val) for val in uniques]
+    return pd.Series([parsed[c] for c in codes], index=series.index, dtype=object)
+
+def per_artist_growth_rate(df, period, region_keys=()):
+    """
+    Wachstumsrate pro einzelnem Künstler (Streams gleichmäßig auf die Credits verteilt),
+    zurück auf die Zeilen gemappt als anteilsgewichtetes Mittel über die Credits.
+    """
+    totals = per_artist_totals(df, by=[*region_keys, period], value="streams")
+    growth = per_artist_growth(totals, by=period, keys=region_keys)
+
+    credit_codes, credit_strings = pd.factorize(df["artist_names"])
+    bridge = build_credit_bridge(credit_strings)
+    bridge["share"] = bridge_shares(bridge)
+
+    rows = df[[*region_keys, period]].assign(row=df.index, credit_code=credit_codes)
+    rows = rows.merge(bridge, on="credit_code").merge(
+        growth[[*region_keys, period, "artist", "growth_rate"]],
+        on=[*region_keys, period, "artist"], how="left"
+    )
+    rows["weighted"] = rows["growth_rate"].fillna(0) * rows["share"]
+
+    rate = rows.groupby("row")["weighted"].sum() / rows.groupby("row")["share"].sum()
+    return rate.reindex(df.index).fillna(0)
+
 # ____ FEATURE ENGINEERING PIPELINE ____
 
 @st.cache_data
-def build_features(df):
+def build_features(df, per_artist=False):
     """
     Berechnet alle Features, die das LightGBM-Modell benötigt.
     Funktioniert für historische Daten und neue Wochen.
+    Ist eine Spalte 'region' vorhanden, werden alle Kennzahlen pro Region berechnet.
+    Tagescharts werden vorher zu Wochen verdichtet (granularity.rollup_daily_to_weekly),
+    Features gibt es daher nur pro Chart-Woche.
+    `per_artist=True` berechnet artist_growth_rate über die einzelnen Credits
+    (siehe artist_credits); Standard bleibt der Credit-String, mit dem das Modell trainiert wurde.
     """
-    df = df.copy()
+    df = df.copy().reset_index(drop=True)
+    period = "chart_week"
+
+    # Partitionsschlüssel (Multi-Region)
+    region_keys = ["region"] if "region" in df.columns else []
 
     # chart_week → datetime
-    if "chart_week" in df.columns:
-        df["chart_week"] = pd.to_datetime(df["chart_week"], errors="coerce")
+    if period in df.columns:
+        df[period] = pd.to_datetime(df[period], errors="coerce")
 
     # Genre Parsing
     if "artist_genres" in df.columns:
-        df["artist_genres"] = df["artist_genres"].apply(genre_parser)
+        df["artist_genres"] = parse_genres(df["artist_genres"])
 
     # Genre Popularity Index (genre_pop_idx)
     if "streams" in df.columns and "artist_genres" in df.columns:
-        genre_df = df.explode("artist_genres")
-
-        # Durchschnittliche Streams pro Genre pro Woche
-        genre_stats = (
-            genre_df.groupby(["chart_week", "artist_genres"])["streams"]
-            .mean()
-            .rename("genre_pop_idx")
-            .reset_index()
-        )
-
-        # Merge Genre-Stats zurück
-        genre_df = genre_df.merge(
-            genre_stats, on=["chart_week", "artist_genres"], how="left"
-        )
+        with stage("features.genre_pop_idx", rows=len(df)):
+            genre_df = df[[period, *region_keys, "artist_genres", "streams"]].explode("artist_genres")
 
-        # Durchschnittlicher Genre-Index pro Track
-        song_genre_index = (
-            genre_df.groupby(["chart_week", "track_id"])["genre_pop_idx"]
-            .mean()
-            .reset_index()
-        )
+            # Durchschnittliche Streams pro Genre pro Periode (und Region)
+            genre_df["genre_pop_idx"] = (
+                genre_df.groupby([period, *region_keys, "artist_genres"], observed=True)["streams"]
+                .transform("mean")
+            )
 
-        df = df.merge(song_genre_index, on=["chart_week", "track_id"], how="left")
+            # Durchschnittlicher Genre-Index pro Track (Zeile)
+            df["genre_pop_idx"] = genre_df.groupby(level=0)["genre_pop_idx"].mean()
     else:
         df["genre_pop_idx"] = 0
 
     # Artist Growth Rate
     if "streams" in df.columns:
-        df = df.sort_values(by=["artist_names", "chart_week"])
+        df = df.sort_values(by=[*region_keys, "artist_names", period])
+    if "streams" in df.columns and per_artist:
+        with stage("features.artist_growth_rate", rows=len(df), per_artist=True):
+            df["artist_growth_rate"] = per_artist_growth_rate(df, period, region_keys)
+    elif "streams" in df.columns:
         df["artist_growth_rate"] = (
-            df.groupby("artist_names")["streams"]
+            df.groupby([*region_keys, "artist_names"], observed=True)["streams"]
             .pct_change()
             .replace([float("inf"), -float("inf")], 0)
             .fillna(0)
@@ -88,15 +128,18 @@ def build_features(df):
 
     # Seasonality Score
     if "streams" in df.columns:
-        df["month"] = df["chart_week"].dt.month
-        monthly_avg = df.groupby("month")["streams"].transform("mean")
-        total_avg = df["streams"].mean()
+        df["month"] = df[period].dt.month
+        monthly_avg = df.groupby([*region_keys, "month"], observed=True)["streams"].transform("mean")
+        if region_keys:
+            total_avg = df.groupby(region_keys, observed=True)["streams"].transform("mean")
+        else:
+            total_avg = df["streams"].mean()
         df["seasonality_score"] = monthly_avg / total_avg
     else:
         df["seasonality_score"] = 1.0
 
     # Prophet‑Regressor: genre_idx_lagged (Lag des Genre‑Index)
-    df = df.sort_values("chart_week")
+    df = df.sort_values(period)
     df["genre_idx_lagged"] = df["genre_pop_idx"].shift(1)
     df["genre_idx_lagged"] = df["genre_idx_lagged"].fillna(method="bfill")
 
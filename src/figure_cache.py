@@ -0,0 +1,45 @@
+import hashlib
+import json
+from pathlib import Path
+
+from .instrumentation import count_cache
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+FIGURE_CACHE_DIR = BASE_DIR / "data" / "cache" / "figures"
+
+
+def figure_key(name, data_version, params=None) -> str:
+    """Schlüssel aus Figurenname, Datenversion und Figuren-Parametern."""
+    params_str = json.dumps(params or {}, sort_keys=True, default=str)
+    digest = hashlib.sha1(f"{data_version}:{params_str}".encode()).hexdigest()[:16]
+    return f"{name}_{digest}"
+
+
+def figure_path(name, data_version, params=None, cache_dir=FIGURE_CACHE_DIR) -> Path:
+    return Path(cache_dir) / f"{figure_key(name, data_version, params)}.json"
+
+
+def get_figure_json(name, data_version, builder, params=None, cache_dir=FIGURE_CACHE_DIR) -> str:
+    """
+    Liefert die serialisierte Plotly-Figur (JSON-String).
+    1. Cache-Treffer: Datei direkt lesen
+    2. Sonst: builder() aufrufen, fig.to_json() atomar speichern
+    Alte Versionen derselben Figur werden beim Schreiben entfernt.
+    """
+    path = figure_path(name, data_version, params, cache_dir)
+    if path.exists():
+        count_cache(hit=True)
+        return path.read_text(encoding="utf-8")
+
+    count_cache(hit=False)
+    fig_json = builder().to_json()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for old in path.parent.glob(f"{name}_*.json"):
+        old.unlink(missing_ok=True)
+
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(fig_json, encoding="utf-8")
+    tmp_path.replace(path)
+
+    return fig_json
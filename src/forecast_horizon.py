@@ -0,0 +1,61 @@
+import pandas as pd
+
+from .granularity import DEFAULT_GRANULARITY, granularity_config
+
+TIME_REGRESSORS = ["genre_idx_lagged", "seasonality_score"]
+
+
+def build_forecast_horizon(df_features, periods=None, granularity=DEFAULT_GRANULARITY):
+    """
+    Erzeugt den Zukunfts-Horizont für die Prediction Pipeline.
+    1. Zukünftige Perioden ab dem letzten historischen Datum ('ds') erzeugen
+       (Frequenz und Standardlänge hängen von der Granularität ab)
+    2. Pro Track (und Region) die letzte bekannte Zeile nehmen
+    3. Cross Join: jeder Track × jede zukünftige Periode
+    4. Zeitbasierte Regressoren aus der Historie ableiten und robust füllen
+    """
+    config = granularity_config(granularity)
+    periods = periods or config["horizon"]
+    period_col = config["period_col"]
+
+    # Letztes historisches Datum bestimmen
+    last_ds = df_features["ds"].max()
+
+    # Zukünftige Perioden erzeugen
+    future_dates = pd.date_range(
+        start=last_ds + config["step"],
+        periods=periods,
+        freq=config["freq"]
+    )
+    future_dates_df = pd.DataFrame({"ds": future_dates})
+
+    # Pro Track (und Region) die letzte bekannte Zeile nehmen
+    track_keys = ["region", "track_id"] if "region" in df_features.columns else ["track_id"]
+    last_per_track = (
+        df_features.sort_values("ds")
+        .groupby(track_keys, observed=True)
+        .tail(1)
+        .drop(columns=["ds"])
+    )
+
+    # Cross Join: jeder Track × jede zukünftige Periode
+    future_df = last_per_track.merge(future_dates_df, how="cross")
+
+    # Periodenspalte auf ds setzen (für Konsistenz)
+    future_df[period_col] = future_df["ds"]
+
+    # Zeitbasierte Regressoren aus der Historie ableiten
+    regressor_time = (
+        df_features.groupby("ds", observed=True)[TIME_REGRESSORS]
+        .mean()
+        .reset_index()
+    )
+
+    future_df = future_df.drop(columns=TIME_REGRESSORS, errors="ignore")
+    future_df = future_df.merge(regressor_time, on="ds", how="left")
+
+    # Robust füllen: erst bfill, dann ffill; falls immer noch NaN (z. B. komplett fehlende Historie) → 0
+    for col in TIME_REGRESSORS:
+        future_df[col] = future_df[col].bfill().ffill().fillna(0)
+
+    return future_df
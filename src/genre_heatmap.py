@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+from .features import genre_parser
+
+
+# ____ DICHTE GENRE × WOCHE MATRIX ____
+def build_genre_week_matrix(df, value_col="probability"):
+    """
+    Verdichtet den Display-Frame zu einer dichten Genre × Woche Matrix.
+
+    Rückgabe (dict):
+        genres     – Genre-Namen (Zeilen)
+        weeks      – Wochen als datetime64 (Spalten, sortiert)
+        is_future  – bool pro Woche (Forecast-Woche ja/nein)
+        sum, count – Summe und Anzahl von `value_col` pro Zelle
+    Mittelwerte lassen sich daraus für beliebige Zeit-Buckets exakt bilden.
+    """
+    genres = df["artist_genres"].apply(genre_parser)
+    lengths = genres.str.len().to_numpy()
+
+    flat_genres = pd.Series(np.concatenate(genres.to_numpy()) if len(genres) else [], dtype=object)
+    flat_ds = np.repeat(pd.to_datetime(df["ds"]).to_numpy(), lengths)
+    flat_values = np.repeat(df[value_col].to_numpy(dtype="float64"), lengths)
+
+    # Ungültige Genres entfernen
+    valid = flat_genres.notna().to_numpy() & (flat_genres != "").to_numpy() & ~np.isnan(flat_values)
+    genre_codes, genre_names = pd.factorize(flat_genres[valid], sort=True)
+    week_codes, week_values = pd.factorize(flat_ds[valid], sort=True)
+
+    n_genres, n_weeks = len(genre_names), len(week_values)
+    flat_idx = genre_codes * n_weeks + week_codes
+
+    sums = np.bincount(flat_idx, weights=flat_values[valid], minlength=n_genres * n_weeks)
+    counts = np.bincount(flat_idx, minlength=n_genres * n_weeks)
+
+    if "is_future" in df.columns:
+        future_weeks = pd.to_datetime(df.loc[df["is_future"] == True, "ds"]).unique()
+        is_future = np.isin(week_values, future_weeks)
+    else:
+        is_future = np.zeros(n_weeks, dtype=bool)
+
+    return {
+        "genres": np.asarray(genre_names, dtype=object),
+        "weeks": np.asarray(week_values, dtype="datetime64[ns]"),
+        "is_future": is_future,
+        "sum": sums.reshape(n_genres, n_weeks),
+        "count": counts.reshape(n_genres, n_weeks),
+    }
+
+
+@st.cache_data(max_entries=8)
+def get_genre_week_matrix(data_version, model_version, _df, value_col="probability"):
+    """
+    Gecachte Matrix pro Daten- und Modellversion. Der DataFrame selbst wird
+    nicht gehasht (Unterstrich-Argument), der Schlüssel sind die Versionen.
+    """
+    return build_genre_week_matrix(_df, value_col=value_col)
+
+
+# ____ TOP-K & DOWNSAMPLING ____
+def select_top_genres(matrix, k=20, week_mask=None):
+    """
+    Wählt die K Genres mit der höchsten kumulierten Trendstärke
+    (Summe der Wochen-Mittelwerte) per Partial Sort (argpartition).
+    """
+    sums, counts = matrix["sum"], matrix["count"]
+    if week_mask is not None:
+        sums, counts = sums[:, week_mask], counts[:, week_mask]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        score = np.where(counts > 0, sums / counts, 0.0).sum(axis=1)
+
+    k = min(k, len(score))
+    if k == 0:
+        return np.array([], dtype=int)
+
+    top = np.argpartition(-score, k - 1)[:k]
+    return top[np.argsort(-score[top], kind="stable")]
+
+
+def downsample_weeks(sums, counts, weeks, max_buckets=52):
+    """
+    Fasst benachbarte Wochen zu höchstens `max_buckets` Zeit-Buckets zusammen
+    (gewichteter Mittelwert über sum/count). Die Payload bleibt so konstant,
+    auch wenn die Historie mehrere Jahre umfasst.
+    """
+    n_weeks = sums.shape[1]
+    if n_weeks <= max_buckets:
+        starts = np.arange(n_weeks)
+    else:
+        bucket = int(np.ceil(n_weeks / max_buckets))
+        starts = np.arange(0, n_weeks, bucket)
+
+    bucket_sums = np.add.reduceat(sums, starts, axis=1) if n_weeks else sums
+    bucket_counts = np.add.reduceat(counts, starts, axis=1) if n_weeks else counts
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(bucket_counts > 0, bucket_sums / bucket_counts, np.nan)
+
+    return z, weeks[starts] if n_weeks else weeks
+
+
+# ____ PLOTLY-FIGUR ____
+def genre_heatmap_figure(matrix, k=20, week_mask=None, max_buckets=52):
+    """Erzeugt eine kompakte go.Heatmap (z-Array statt Long-Table)."""
+    if week_mask is None:
+        week_mask = np.ones(len(matrix["weeks"]), dtype=bool)
+
+    top = select_top_genres(matrix, k=k, week_mask=week_mask)
+    sums = matrix["sum"][top][:, week_mask]
+    counts = matrix["count"][top][:, week_mask]
+    weeks = matrix["weeks"][week_mask]
+
+    z, x = downsample_weeks(sums, counts, weeks, max_buckets=max_buckets)
+
+    fig = go.Figure(
+        go.Heatmap(
+            z=np.round(z, 4),
+            x=pd.to_datetime(x),
+            y=matrix["genres"][top],
+            colorscale="Viridis",
+            colorbar=dict(title="Kumulierte Trendstärke"),
+            hovertemplate="Datum: %{x}<br>Genre: %{y}<br>Trend-Stärke: %{z:.2f}<extra></extra>",
+        )
+    )
+    fig.update_layout(
+        title="Genre-Momentum über die Zeit",
+        xaxis_title="Datum",
+        yaxis=dict(title="Genre", autorange="reversed"),
+    )
+    return fig
@@ -0,0 +1,220 @@
+import re
+from pathlib import Path
+
+import pandas as pd
+
+DEFAULT_GRANULARITY = "weekly"
+
+# Zeitauflösungen der Charts: Periodenspalte, Frequenz für Horizonte, Standard-Horizont
+GRANULARITY_CONFIG = {
+    "weekly": {
+        "period_col": "chart_week",
+        "freq": "W",
+        "step": pd.Timedelta(weeks=1),
+        "horizon": 12,
+    },
+    "daily": {
+        "period_col": "chart_date",
+        "freq": "D",
+        "step": pd.Timedelta(days=1),
+        "horizon": 28,
+    },
+}
+
+# Spotify-Wochencharts laufen von Freitag bis Donnerstag und tragen das Datum des Donnerstags
+CHART_WEEKDAY = 3
+
+
+def granularity_config(granularity=DEFAULT_GRANULARITY) -> dict:
+    if granularity not in GRANULARITY_CONFIG:
+        raise ValueError(
+            f"Unbekannte Granularität: {granularity}. Erlaubt: {list(GRANULARITY_CONFIG)}"
+        )
+    return GRANULARITY_CONFIG[granularity]
+
+
+def extract_granularity_from_filename(filename: str) -> str:
+    """
+    Erkennt die Zeitauflösung aus einem Dateinamen wie:
+    regional-global-daily-2026-01-08.csv → "daily"
+    Ohne Angabe wird "weekly" angenommen.
+    """
+    match = re.search(r"-(weekly|daily)-", filename.lower())
+    return match.group(1) if match else DEFAULT_GRANULARITY
+
+
+def chart_week_of(dates) -> pd.Series:
+    """Ordnet Tagesdaten der Chart-Woche zu (Datum des folgenden bzw. selben Donnerstags)."""
+    dates = pd.to_datetime(pd.Series(dates))
+    return dates + pd.to_timedelta((CHART_WEEKDAY - dates.dt.weekday) % 7, unit="D")
+
+
+# ____ TAGES-PARTITIONEN ____
+def write_daily_partition(df_day, daily_dir) -> list:
+    """
+    Speichert Tagescharts als Partition pro Tag und Region:
+    daily_dir/chart_date=YYYY-MM-DD/<region>.csv
+    Gibt die betroffenen Tage zurück.
+    """
+    daily_dir = Path(daily_dir)
+    df_day = df_day.copy()
+    df_day["chart_date"] = pd.to_datetime(df_day["chart_date"])
+    if "region" not in df_day.columns:
+        df_day["region"] = "global"
+
+    touched = []
+    for (day, region), part in df_day.groupby(["chart_date", "region"]):
+        day_str = day.strftime("%Y-%m-%d")
+        part_dir = daily_dir / f"chart_date={day_str}"
+        part_dir.mkdir(parents=True, exist_ok=True)
+        part.to_csv(part_dir / f"{region}.csv", index=False)
+        touched.append(day)
+
+    return sorted(set(touched))
+
+
+def _read_week_partitions(daily_dir, week_end):
+    """Liest alle Tagespartitionen einer Chart-Woche (max. 7 Tage × Regionen)."""
+    days = pd.date_range(end=week_end, periods=7, freq="D")
+    frames = [
+        pd.read_csv(path, parse_dates=["chart_date"])
+        for day in days
+        for path in sorted((Path(daily_dir) / f"chart_date={day:%Y-%m-%d}").glob("*.csv"))
+    ]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+# ____ ROLLUP TAG → WOCHE ____
+# Eine Chart-Woche ist vollständig, wenn für die Region alle 7 Tage vorliegen;
+# nur vollständige Wochen werden gemergt (eine Teilwoche hätte nur einen Bruchteil der Streams)
+DAYS_PER_WEEK = 7
+
+PREVIOUS_COLUMNS = ["chart_week", "region", "track_id", "rank", "weeks_on_chart"]
+
+
+def track_ids(uri) -> pd.Series:
+    """track_id aus der Spotify-URI (wie in merge_new_data)."""
+    return pd.Series(uri).astype(str).str.replace("spotify:track:", "", regex=False)
+
+
+def rollup_week(df_days, previous=None):
+    """
+    Verdichtet die Tagescharts einer Woche zu einem Wochenchart pro Region:
+    Streams summiert, Rang über die Wochensumme neu vergeben.
+    `previous`: frühere Wochen [chart_week, region, track_id, rank, weeks_on_chart]
+    (gemergte Historie + Rollups) →
+    - previous_rank = Rang der Vorwoche (sonst -1)
+    - weeks_on_chart = zuletzt bekannter Wert + 1 (sonst 1)
+    """
+    df_days = df_days.copy()
+    df_days["chart_week"] = chart_week_of(df_days["chart_date"]).values
+
+    weekly = (
+        df_days.sort_values("chart_date")
+        .groupby(["chart_week", "region", "uri"], as_index=False)
+        .agg(
+            artist_names=("artist_names", "last"),
+            track_name=("track_name", "last"),
+            source=("source", "last"),
+            peak_rank=("peak_rank", "min"),
+            streams=("streams", "sum"),
+            days_covered=("chart_date", "nunique"),
+        )
+    )
+
+    weekly["rank"] = (
+        weekly.groupby(["chart_week", "region"])["streams"]
+        .rank(method="first", ascending=False)
+        .astype(int)
+    )
+    weekly["peak_rank"] = weekly[["peak_rank", "rank"]].min(axis=1)
+    weekly["track_id"] = track_ids(weekly["uri"]).values
+    keys = pd.MultiIndex.from_frame(weekly[["region", "track_id"]].astype(str))
+
+    if previous is not None and not previous.empty:
+        previous = previous.assign(
+            chart_week=pd.to_datetime(previous["chart_week"]),
+            region=previous["region"].astype(str),
+            track_id=previous["track_id"].astype(str),
+        )
+        previous = previous[previous["chart_week"] < weekly["chart_week"].min()]
+
+        prev_week = previous[previous["chart_week"] == weekly["chart_week"].min() - pd.Timedelta(weeks=1)]
+        prev_rank = prev_week.drop_duplicates(["region", "track_id"]).set_index(["region", "track_id"])["rank"]
+        weekly["previous_rank"] = prev_rank.reindex(keys).fillna(-1).astype(int).values
+
+        last_weeks = (
+            previous.sort_values("chart_week")
+            .drop_duplicates(["region", "track_id"], keep="last")
+            .set_index(["region", "track_id"])["weeks_on_chart"]
+        )
+        weekly["weeks_on_chart"] = (last_weeks.reindex(keys).fillna(0).astype(int) + 1).values
+    else:
+        weekly["previous_rank"] = -1
+        weekly["weeks_on_chart"] = 1
+
+    columns = ["chart_week", "region", "rank", "uri", "artist_names", "track_name", "source",
+               "peak_rank", "previous_rank", "weeks_on_chart", "streams", "days_covered"]
+    return weekly[columns].sort_values(["region", "rank"]).reset_index(drop=True)
+
+
+def _load_previous(history_path, weekly_dir, week_end):
+    """Frühere Wochen für rollup_week: gemergte Historie plus vollständige Rollups der Vorwoche."""
+    frames = []
+    if history_path is not None and Path(history_path).exists():
+        history = pd.read_csv(history_path, usecols=lambda c: c in PREVIOUS_COLUMNS)
+        if "region" not in history.columns:
+            history["region"] = "global"
+        frames.append(history)
+
+    prev_end = week_end - pd.Timedelta(weeks=1)
+    for path in Path(weekly_dir).glob(f"regional_*_weekly_{prev_end:%Y-%m-%d}.csv"):
+        rollup = pd.read_csv(path)
+        frames.append(rollup.assign(track_id=track_ids(rollup["uri"]).values))
+
+    if not frames:
+        return None
+    previous = pd.concat([f[PREVIOUS_COLUMNS] for f in frames], ignore_index=True)
+    # Historie zuerst → bei doppelten Wochen gilt der gemergte Stand
+    return previous.drop_duplicates(["chart_week", "region", "track_id"], keep="first")
+
+
+def rollup_daily_to_weekly(daily_dir, touched_days, weekly_dir, history_path=None) -> list:
+    """
+    Inkrementelles Rollup: nur die Wochen, die neue Tage enthalten, werden neu
+    berechnet (Kosten ~ betroffene Wochen, nicht ~ gesamte Tageshistorie).
+    - vollständige Wochen (7 Tage pro Region) → regional_<region>_weekly_YYYY-MM-DD.csv
+      (gleiches Schema wie die Wochencharts nach prepare_unique_tracks)
+    - Teilwochen → ..._partial.csv (nur zur Ansicht, werden ersetzt, sobald die Woche vollständig ist)
+    previous_rank/weeks_on_chart kommen aus `history_path` (gemergte Historie) und den Rollups.
+    Rückgabe: Pfade der vollständigen Wochen (nur diese werden gemergt).
+    """
+    weekly_dir = Path(weekly_dir)
+    weekly_dir.mkdir(parents=True, exist_ok=True)
+
+    paths, partial = [], []
+    for week_end in sorted(set(chart_week_of(touched_days))):
+        df_days = _read_week_partitions(daily_dir, week_end)
+        if df_days.empty:
+            continue
+
+        weekly = rollup_week(df_days, _load_previous(history_path, weekly_dir, week_end))
+        days_per_region = df_days.groupby("region")["chart_date"].nunique()
+        for region, part in weekly.groupby("region"):
+            path = weekly_dir / f"regional_{region}_weekly_{week_end:%Y-%m-%d}.csv"
+            partial_path = path.with_name(f"{path.stem}_partial.csv")
+            part = part.assign(chart_week=part["chart_week"].dt.strftime("%Y-%m-%d"))
+
+            days = int(days_per_region[region])
+            if days < DAYS_PER_WEEK:
+                part.to_csv(partial_path, index=False)
+                partial.append(f"{region} {week_end:%Y-%m-%d} ({days}/{DAYS_PER_WEEK} Tage)")
+                continue
+            part.to_csv(path, index=False)
+            partial_path.unlink(missing_ok=True)
+            paths.append(path)
+
+    print(f"Rollup Tag → Woche: {len(paths)} vollständige Wochendatei(en) aktualisiert.")
+    if partial:
+        print(f"Unvollständige Wochen (noch nicht gemergt): {', '.join(partial)}")
+    return paths
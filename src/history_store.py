@@ -0,0 +1,104 @@
+import pandas as pd
+
+# ____ SCHEMA DER CHART-HISTORIE ____
+# Eine Stelle für alle Datentypen der Historie (Seiten und Pipeline laden hierüber).
+#
+# Spalte              Typ        Hinweis
+# chart_week          datetime   Chart-Woche (Donnerstag)
+# region              category   "global", "de", ...
+# rank / peak_rank    int16      1-200
+# previous_rank       int16      -1 = Neueinsteiger
+# weeks_on_chart      int16
+# streams             int64      Summen über Wochen/Regionen bleiben exakt
+# uri, track_id       category   Dictionary-kodiert (wiederholt sich pro Woche)
+# artist_id           category
+# artist_names        category
+# track_name          category
+# source              category
+# artist_genres       category   Genre-String integer-kodiert (Codes via .cat.codes)
+# release_date        datetime
+# explicit            boolean    nullable (fehlende API-Daten → <NA>)
+# track_popularity    float32
+# artist_followers    float32
+# artist_popularity   float32
+# days_covered        int8       nur bei Rollups aus Tagescharts
+HISTORY_SCHEMA = {
+    "region": "category",
+    "rank": "int16",
+    "peak_rank": "int16",
+    "previous_rank": "int16",
+    "weeks_on_chart": "int16",
+    "streams": "int64",
+    "uri": "category",
+    "track_id": "category",
+    "artist_id": "category",
+    "artist_names": "category",
+    "track_name": "category",
+    "source": "category",
+    "artist_genres": "category",
+    "explicit": "boolean",
+    "track_popularity": "float32",
+    "artist_followers": "float32",
+    "artist_popularity": "float32",
+    "days_covered": "int8",
+}
+
+DATE_COLUMNS = ["chart_week", "release_date"]
+
+# Nullable Varianten, falls Integer-Spalten Lücken enthalten
+_NULLABLE_INT = {"int8": "Int8", "int16": "Int16", "int32": "Int32", "int64": "Int64"}
+
+
+def _to_boolean(series):
+    if series.dtype == "boolean":
+        return series
+    mapping = {"true": True, "false": False, "1": True, "0": False, "1.0": True, "0.0": False}
+    return series.astype("string").str.strip().str.lower().map(mapping).astype("boolean")
+
+
+def apply_schema(df, schema=HISTORY_SCHEMA):
+    """
+    Wandelt einen Historien-DataFrame in die kompakten Typen aus HISTORY_SCHEMA.
+    Unbekannte Spalten bleiben unverändert.
+    """
+    df = df.copy()
+
+    for col in DATE_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+
+    for col, dtype in schema.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        if dtype == "boolean":
+            df[col] = _to_boolean(df[col])
+        elif dtype in _NULLABLE_INT and df[col].isna().any():
+            df[col] = df[col].astype(_NULLABLE_INT[dtype])
+        elif dtype == "category" and isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        else:
+            df[col] = df[col].astype(dtype)
+
+    return df
+
+
+def load_history(path, columns=None):
+    """
+    Lädt die Chart-Historie (CSV) mit dem dokumentierten Schema.
+    Strings werden schon beim Parsen dictionary-kodiert (category).
+    `columns` lädt optional nur einen Teil der Spalten.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [c for c in header if columns is None or c in columns]
+
+    read_dtypes = {
+        col: dtype for col, dtype in HISTORY_SCHEMA.items()
+        if col in usecols and dtype in ("category", "float32")
+    }
+    df = pd.read_csv(path, usecols=usecols, dtype=read_dtypes)
+    return apply_schema(df)
+
+
+def memory_report(df) -> str:
+    """Kurzer Speicherbericht (MB) für Logs und Vergleiche."""
+    return f"{len(df):,} Zeilen, {df.memory_usage(deep=True).sum() / 1e6:.1f} MB"
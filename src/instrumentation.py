@@ -0,0 +1,208 @@
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+PERF_LOG_PATH = BASE_DIR / "logs" / "perf.jsonl"
+
+# Mit PERF_LOG=0 wird nur im Speicher protokolliert (kein JSONL)
+LOG_TO_FILE = os.getenv("PERF_LOG", "1") != "0"
+
+# Letzte Messungen für das Performance-Panel der Seite
+RECENT = deque(maxlen=2000)
+
+_current = contextvars.ContextVar("perf_stage", default=None)
+_run_id = contextvars.ContextVar("perf_run_id", default=None)
+_write_lock = threading.Lock()
+
+
+# ____ SPEICHER ____
+def peak_rss_mb():
+    """Höchststand des Arbeitsspeichers (RSS) des Prozesses in MB (None, falls nicht verfügbar)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KB, macOS: Bytes
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+# ____ LÄUFE ____
+def new_run(label=None) -> str:
+    """Startet einen neuen Lauf (z. B. ein Upload oder ein Pipeline-Lauf); alle Stufen tragen diese ID."""
+    run_id = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+    _run_id.set(run_id)
+    if label:
+        _emit({"kind": "run", "name": label, "run_id": run_id})
+    return run_id
+
+
+def resume_run(run_id):
+    """Setzt einen bestehenden Lauf fort (z. B. nach einem Streamlit-Rerun), ohne neuen Eintrag."""
+    _run_id.set(run_id)
+
+
+def current_run_id():
+    return _run_id.get()
+
+
+# ____ MESSUNG ____
+@contextmanager
+def stage(name, kind="stage", rows=None, **meta):
+    """
+    Misst einen Abschnitt: Wall-Time, CPU-Time, RSS-Höchststand, Zeilen, Cache-Treffer.
+    Der Abschnitt kann Werte nachtragen: `with stage("merge") as rec: rec["rows"] = len(df)`.
+    Verschachtelte Stufen tragen ihren Eltern-Namen ("parent").
+    """
+    parent = _current.get()
+    record = {
+        "kind": kind,
+        "name": name,
+        "parent": parent["name"] if parent else None,
+        "run_id": _run_id.get(),
+        "rows": rows,
+        "cache_hits": 0,
+        "cache_misses": 0,
+        **meta,
+    }
+    token = _current.set(record)
+    rss_before = peak_rss_mb()
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record["wall_ms"] = (time.perf_counter() - wall0) * 1000
+        # Prozess-CPU (alle Threads); bei parallelen Stufen nur grob zuordenbar
+        record["cpu_ms"] = (time.process_time() - cpu0) * 1000
+        record["rss_peak_mb"] = peak_rss_mb()
+        if rss_before is not None:
+            record["rss_growth_mb"] = record["rss_peak_mb"] - rss_before
+        _current.reset(token)
+        _emit(record)
+
+
+def instrumented(name=None, kind="stage"):
+    """Decorator-Variante von stage(); Zeilen werden aus len(Ergebnis) bzw. len(Ergebnis[0]) übernommen."""
+    def decorator(fn):
+        label = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(label, kind=kind) as record:
+                result = fn(*args, **kwargs)
+                record["rows"] = _row_count(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def _row_count(result):
+    if hasattr(result, "__len__") and hasattr(result, "columns"):
+        return len(result)
+    if isinstance(result, tuple) and result and hasattr(result[0], "__len__"):
+        return len(result[0])
+    return None
+
+
+def count_cache(hit: bool):
+    """Zählt einen Cache-Treffer/-Fehlschlag für die aktuell laufende Stufe."""
+    record = _current.get()
+    if record is not None:
+        record["cache_hits" if hit else "cache_misses"] += 1
+
+
+def set_rows(rows):
+    record = _current.get()
+    if record is not None:
+        record["rows"] = rows
+
+
+# ____ AUSGABE ____
+def _emit(record):
+    record = {"ts": datetime.now().isoformat(timespec="milliseconds"), **record}
+    RECENT.append(record)
+    if not LOG_TO_FILE:
+        return
+    try:
+        with _write_lock:
+            PERF_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+            with open(PERF_LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+    except OSError:
+        # Logging darf die Pipeline nie abbrechen
+        pass
+
+
+def recent_records(run_id=None, kind=None) -> list:
+    records = list(RECENT)
+    if run_id is not None:
+        records = [r for r in records if r.get("run_id") == run_id]
+    if kind is not None:
+        records = [r for r in records if r.get("kind") == kind]
+    return records
+
+
+def summarize(records):
+    """
+    Fasst Messungen pro (kind, name) zusammen: Anzahl, Summe/Max Wall-Time, CPU-Time,
+    RSS-Höchststand, Zeilen, Cache-Treffer. Rückgabe: DataFrame (absteigend nach Zeit).
+    """
+    import pandas as pd
+
+    records = [r for r in records if r.get("kind") != "run"]
+    if not records:
+        return pd.DataFrame()
+
+    df = pd.DataFrame(records)
+    for col in ["rows", "rss_peak_mb", "cpu_ms", "cache_hits", "cache_misses"]:
+        if col not in df.columns:
+            df[col] = None
+    summary = (
+        df.groupby(["kind", "name"], dropna=False)
+        .agg(
+            calls=("wall_ms", "size"),
+            wall_ms=("wall_ms", "sum"),
+            wall_ms_max=("wall_ms", "max"),
+            cpu_ms=("cpu_ms", "sum"),
+            rss_peak_mb=("rss_peak_mb", "max"),
+            rows=("rows", "max"),
+            cache_hits=("cache_hits", "sum"),
+            cache_misses=("cache_misses", "sum"),
+        )
+        .reset_index()
+        .sort_values("wall_ms", ascending=False)
+    )
+    return summary.reset_index(drop=True)
+
+
+def read_log(path=PERF_LOG_PATH, run_id=None) -> list:
+    """Liest das JSONL-Log (optional nur einen Lauf)."""
+    path = Path(path)
+    if not path.exists():
+        return []
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if run_id is None or record.get("run_id") == run_id:
+                records.append(record)
+    return records
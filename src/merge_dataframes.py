@@ -2,6 +2,14 @@ import pandas as pd
 from pathlib import Path
 from datetime import datetime
 
+from .instrumentation import stage
+from .history_store import apply_schema, load_history
+
+DEFAULT_REGION = "global"
+
+# Schlüssel einer Chart-Zeile in der Historie
+HISTORY_KEYS = ["chart_week", "region", "track_id"]
+
 def merge_new_data(
     charts_csv: str, 
     enriched_csv: str,
@@ -13,22 +21,30 @@ def merge_new_data(
 ):
     """
     Schritte: 
-    1. Charts und Meta laden
+    1. Charts (eine oder mehrere Regionen) und Meta laden
     2. 'track_id' aus 'uri' extrahieren
     3. Merge über 'track_id'
     4. Bereinigung der Daten
     5. Speichern als data_week_YYYY-MM-DD
     6. Historie aktualisieren und Backup erzeugen
     """
-    charts_csv = Path(charts_csv)
+    if isinstance(charts_csv, (str, Path)):
+        charts_csv = [charts_csv]
+    charts_csv = [Path(p) for p in charts_csv]
     enriched_csv = Path(enriched_csv)
     processed_dir.mkdir(parents=True, exist_ok=True)
     backup_dir.mkdir(parents=True, exist_ok=True)
 
     # ____ Charts + Meta laden ____
-    df_charts = pd.read_csv(charts_csv)
+    df_charts = pd.concat([pd.read_csv(p) for p in charts_csv], ignore_index=True)
     df_meta = pd.read_csv(enriched_csv)
 
+    # Regionsübergreifend angereichert → Metadaten nur einmal pro Track
+    df_meta = df_meta.drop_duplicates(subset=["track_id"])
+
+    if "region" not in df_charts.columns:
+        df_charts["region"] = DEFAULT_REGION
+
     # ____ track_id aus uri extrahieren
     df_charts["track_id"] = (
         df_charts["uri"]
@@ -58,31 +74,36 @@ def merge_new_data(
     df_week.to_csv(weekly_path, index=False)
 
     # ____ Historie aktualisieren und speichern ____
-    if hist_updated_path.exists():
-        df_hist = pd.read_csv(hist_updated_path)
-    else:
-        # Falls noch keine updated_Datei gibt, starte mit raw
-        df_hist = pd.read_csv(hist_raw_path)
+    with stage("merge.load_history") as rec:
+        if hist_updated_path.exists():
+            df_hist = load_history(hist_updated_path)
+        else:
+            # Falls noch keine updated_Datei gibt, starte mit raw
+            df_hist = load_history(hist_raw_path)
+        rec["rows"] = len(df_hist)
     
-    # Datumsfelder vereinheitlichen 
-    df_hist["chart_week"] = pd.to_datetime(df_hist["chart_week"], errors="coerce") 
-    df_hist["release_date"] = pd.to_datetime(df_hist["release_date"], errors="coerce")
+    # Ältere Historie kennt nur die globalen Charts
+    if "region" not in df_hist.columns:
+        df_hist.insert(1, "region", DEFAULT_REGION)
 
-    # Neue Woche anhängen
-    df_all = pd.concat([df_hist, df_week], ignore_index=True)
+    # Neue Woche anhängen (Kategorien werden danach neu aufgebaut)
+    categorical = df_hist.select_dtypes("category").columns
+    df_all = pd.concat([df_hist.astype({c: object for c in categorical}), df_week], ignore_index=True)
+    df_all["region"] = df_all["region"].fillna(DEFAULT_REGION)
 
     # Deduplizieren
-    df_all = df_all.drop_duplicates(subset=["chart_week", "track_id"], keep="last") 
+    df_all = df_all.drop_duplicates(subset=HISTORY_KEYS, keep="last") 
 
     # Sortieren
-    df_all = df_all.sort_values(by=["chart_week", "track_id"]).reset_index(drop=True)
+    df_all = df_all.sort_values(by=HISTORY_KEYS).reset_index(drop=True)
     
     # Datumsformat zurück zu Strings
     df_all["chart_week"] = df_all["chart_week"].dt.strftime("%Y-%m-%d")
     df_all["release_date"] = df_all["release_date"].dt.strftime("%Y-%m-%d")
     
     # Speichern der aktualisierten Historie 
-    df_all.to_csv(hist_updated_path, index=False)
+    with stage("merge.write_history", rows=len(df_all)):
+        df_all.to_csv(hist_updated_path, index=False)
 
     # ____ Backup erzeugen (max. ein Backup pro Tag) ____
         
@@ -96,6 +117,7 @@ def merge_new_data(
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S") 
     backup_path = backup_dir / f"hist_data_{today_str}_{timestamp}.csv" 
     df_all.to_csv(backup_path, index=False) 
-    
-    return df_all
+
+    # Kompakte Typen für Features/Scoring (siehe history_store.HISTORY_SCHEMA)
+    return apply_schema(df_all)
     
\ No newline at end of file
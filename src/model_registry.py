@@ -0,0 +1,94 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+MODEL_DIR = "models/"
+REGISTRY_FILE = "registry.json"
+
+# Artefakte aus notebooks/08_modeling.ipynb (gelten, solange keine registry.json existiert)
+DEFAULT_VERSION = "v1"
+DEFAULT_ARTEFACTS = {
+    "prophet": "market_trend_prophet_v1.json",
+    "lgbm": "rising_artist_lgbm_v1.txt",
+    "threshold": "rising_artist_threshold.json",
+    "features": "rising_artist_features.json",
+}
+
+
+def registry_path(model_dir=MODEL_DIR) -> Path:
+    return Path(model_dir) / REGISTRY_FILE
+
+
+def load_registry(model_dir=MODEL_DIR) -> dict:
+    """
+    Liest models/registry.json.
+    Ohne Datei: Registry mit der Notebook-Version v1 als aktiver Version.
+    """
+    path = registry_path(model_dir)
+    if not path.exists():
+        return {
+            "active": DEFAULT_VERSION,
+            "versions": {DEFAULT_VERSION: {"artefacts": dict(DEFAULT_ARTEFACTS), "source": "notebooks/08_modeling.ipynb"}},
+        }
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_registry(registry, model_dir=MODEL_DIR):
+    """Schreibt die Registry atomar (Dashboard/Service lesen sie parallel)."""
+    path = registry_path(model_dir)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(registry, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def version_artefacts(version, model_dir=MODEL_DIR) -> dict:
+    """Pfade der Artefakte einer Version: {"prophet": Path, "lgbm": Path, ...}."""
+    registry = load_registry(model_dir)
+    if version not in registry["versions"]:
+        raise ValueError(f"Unbekannte Modellversion: {version}")
+    # Fehlende Einträge (z. B. Prophet bei reinen LightGBM-Versionen) kommen aus v1
+    artefacts = {**DEFAULT_ARTEFACTS, **registry["versions"][version]["artefacts"]}
+    return {key: Path(model_dir) / name for key, name in artefacts.items()}
+
+
+def active_artefacts(model_dir=MODEL_DIR) -> dict:
+    """Pfade der Artefakte der aktiven Version."""
+    return version_artefacts(load_registry(model_dir)["active"], model_dir)
+
+
+def next_version(registry) -> str:
+    numbers = [int(v[1:]) for v in registry["versions"] if v[1:].isdigit()]
+    return f"v{max(numbers, default=0) + 1}"
+
+
+def register_version(version, artefacts, metrics=None, promote=False, model_dir=MODEL_DIR, **info) -> dict:
+    """
+    Trägt eine neue Artefakt-Version ein (Dateinamen relativ zu model_dir).
+    `promote=True` macht sie sofort zur aktiven Version.
+    """
+    registry = load_registry(model_dir)
+    if version in registry["versions"]:
+        raise ValueError(f"Version {version} existiert bereits.")
+
+    registry["versions"][version] = {
+        "artefacts": artefacts,
+        "metrics": metrics or {},
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        **info,
+    }
+    if promote:
+        registry["active"] = version
+    save_registry(registry, model_dir)
+    return registry
+
+
+def promote_version(version, model_dir=MODEL_DIR) -> dict:
+    registry = load_registry(model_dir)
+    if version not in registry["versions"]:
+        raise ValueError(f"Unbekannte Modellversion: {version}")
+    registry["active"] = version
+    save_registry(registry, model_dir)
+    return registry
@@ -0,0 +1,322 @@
+import argparse
+import json
+import sys
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .artist_credits import per_artist_totals
+from .instrumentation import new_run, stage
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+PEAK_STATE_PATH = BASE_DIR / "data" / "interim" / "peak_state.json"
+PEAK_EVENTS_PATH = BASE_DIR / "data" / "interim" / "peak_events.json"
+
+# Rollierendes Fenster für Median/MAD (Wochen) und Mindestlänge vor der ersten Meldung
+WINDOW_WEEKS = 12
+MIN_PERIODS = 8
+
+# Peak = mindestens Z_THRESHOLD robuste Standardabweichungen und MIN_LIFT über dem Niveau
+Z_THRESHOLD = 2.5
+MIN_LIFT = 0.15
+
+# MAD → Standardabweichung (Normalverteilung)
+MAD_SCALE = 1.4826
+
+# Gewicht des neuesten Jahres im saisonalen Faktor pro Kalenderwoche
+SEASONAL_ALPHA = 0.5
+
+TOP_CONTRIBUTORS = 3
+
+# Der Detektor beschreibt einen Markt: bei mehreren Regionen zählt nur diese
+# (eine neu hinzukommende Region würde sonst als Sprung im Volumen erscheinen)
+REGION = "global"
+
+
+# ____ DETEKTOR ____
+class PeakDetector:
+    """
+    Online-Erkennung von Peaks im wöchentlichen Stream-Volumen, O(1) pro neuer Woche
+    (Fenster fester Länge + ein Faktor pro Kalenderwoche + Vorwochen-Streams pro Track/Künstler).
+    - Niveau = Median der letzten WINDOW_WEEKS Wochen, Streuung = MAD · 1.4826
+    - Meldung, wenn die Woche Z_THRESHOLD robuste Standardabweichungen und MIN_LIFT über dem Niveau liegt
+    - Einordnung über die saisonale Basis (Faktor Woche/Niveau der Vorjahre, ±1 Kalenderwoche):
+      bleibt die Woche auch gegenüber Niveau · Faktor MIN_LIFT darüber → "anomaly", sonst "seasonal"
+    - Zuordnung: Tracks und Künstler mit dem größten Zuwachs gegenüber der Vorwoche
+    """
+
+    def __init__(self, window=WINDOW_WEEKS, min_periods=MIN_PERIODS, z_threshold=Z_THRESHOLD, min_lift=MIN_LIFT):
+        self.window = window
+        self.min_periods = min_periods
+        self.z_threshold = z_threshold
+        self.min_lift = min_lift
+        self.values = deque(maxlen=window)
+        self.seasonal = {}
+        self.last_week = None
+        self.prev_tracks = {}
+        self.prev_artists = {}
+
+    # Zustand als JSON (zwischen zwei Ingests gespeichert)
+    def to_dict(self) -> dict:
+        return {
+            "params": {
+                "window": self.window, "min_periods": self.min_periods,
+                "z_threshold": self.z_threshold, "min_lift": self.min_lift,
+            },
+            "values": list(self.values),
+            "seasonal": {str(k): list(v) for k, v in self.seasonal.items()},
+            "last_week": None if self.last_week is None else str(self.last_week.date()),
+            "prev_tracks": self.prev_tracks,
+            "prev_artists": self.prev_artists,
+        }
+
+    @classmethod
+    def from_dict(cls, state) -> "PeakDetector":
+        detector = cls(**state["params"])
+        detector.values.extend(state["values"])
+        detector.seasonal = {int(k): tuple(v) for k, v in state["seasonal"].items()}
+        detector.last_week = pd.Timestamp(state["last_week"]) if state["last_week"] else None
+        detector.prev_tracks = state["prev_tracks"]
+        detector.prev_artists = state["prev_artists"]
+        return detector
+
+    def _seasonal_factor(self, week_of_year, year) -> float:
+        """Größter Faktor der Kalenderwoche ±1 aus Vorjahren (Feiertage wandern um eine Woche)."""
+        factors = [
+            self.seasonal[w][0] for w in (week_of_year - 1, week_of_year, week_of_year + 1)
+            if w in self.seasonal and self.seasonal[w][1] < year
+        ]
+        return max(factors, default=1.0)
+
+    def update(self, week, total, tracks=None, artists=None):
+        """
+        Nimmt eine neue Woche auf. `tracks`/`artists`: {Name: Streams} der Woche (für die Zuordnung).
+        Rückgabe: Event-Dict oder None.
+        """
+        week = pd.Timestamp(week)
+        if self.last_week is not None and week <= self.last_week:
+            raise ValueError(f"Woche {week.date()} liegt nicht nach der letzten Woche {self.last_week.date()}.")
+
+        tracks, artists = tracks or {}, artists or {}
+        year, week_of_year = int(week.isocalendar().year), int(week.isocalendar().week)
+        event = None
+
+        if len(self.values) >= self.min_periods:
+            values = np.asarray(self.values, dtype=float)
+            level = float(np.median(values))
+            scale = MAD_SCALE * float(np.median(np.abs(values - level))) or level * 1e-3
+            z = (total - level) / scale
+            lift = total / level - 1
+
+            if z >= self.z_threshold and lift >= self.min_lift:
+                factor = self._seasonal_factor(week_of_year, year)
+                seasonal_lift = total / (level * factor) - 1
+                event = {
+                    "week": str(week.date()),
+                    "streams": float(total),
+                    "level": level,
+                    "expected": level * factor,
+                    "z": round(float(z), 2),
+                    "lift": round(float(lift), 4),
+                    "seasonal_lift": round(float(seasonal_lift), 4),
+                    "kind": "anomaly" if seasonal_lift >= self.min_lift else "seasonal",
+                    "top_artists": _top_gains(artists, self.prev_artists),
+                    "top_tracks": _top_gains(tracks, self.prev_tracks),
+                }
+
+            # Saisonaler Faktor: Verhältnis Woche/Niveau, exponentiell über die Jahre geglättet,
+            # mit dem Jahr der letzten Aktualisierung (Faktoren desselben Jahres zählen nicht)
+            ratio = total / level
+            old = self.seasonal.get(week_of_year)
+            factor = ratio if old is None else SEASONAL_ALPHA * ratio + (1 - SEASONAL_ALPHA) * old[0]
+            self.seasonal[week_of_year] = (factor, year)
+
+        self.values.append(float(total))
+        self.last_week = week
+        self.prev_tracks = {k: float(v) for k, v in tracks.items()}
+        self.prev_artists = {k: float(v) for k, v in artists.items()}
+        return event
+
+
+def _top_gains(current, previous, n=TOP_CONTRIBUTORS) -> list:
+    """Die n Einträge mit dem größten Zuwachs gegenüber der Vorwoche (neu in den Charts = voller Wert)."""
+    gains = sorted(
+        ((name, streams - previous.get(name, 0.0), streams) for name, streams in current.items()),
+        key=lambda item: item[1], reverse=True
+    )[:n]
+    return [{"name": name, "gain": float(gain), "streams": float(streams)} for name, gain, streams in gains if gain > 0]
+
+
+# ____ WOCHEN AUS DER HISTORIE ____
+def region_rows(df, region=REGION):
+    """Zeilen einer Region; Historien ohne Regionsspalte sind bereits ein Markt."""
+    if "region" not in df.columns:
+        return df
+    return df[df["region"] == region]
+
+
+def weekly_inputs(df, period="chart_week", region=REGION):
+    """
+    Pro Woche (Gesamt-Streams, {Track: Streams}, {Künstler: Streams}) in einem Durchlauf
+    (Kollaborationen über die Credit-Bridge aufgeteilt), nur für `region`.
+    Rückgabe: Generator, sortiert nach Woche.
+    """
+    df = region_rows(df, region)
+    totals = df.groupby(period, observed=True)["streams"].sum().sort_index()
+
+    track_names = df["artist_names"].astype(str) + " – " + df["track_name"].astype(str)
+    tracks = df[[period, "streams"]].assign(track=track_names.to_numpy()) \
+        .groupby([period, "track"], observed=True)["streams"].sum()
+    artists = per_artist_totals(df, by=period).set_index([period, "artist"])["streams"]
+
+    track_groups = {week: part.droplevel(0).to_dict() for week, part in tracks.groupby(level=0, observed=True)}
+    artist_groups = {week: part.droplevel(0).to_dict() for week, part in artists.groupby(level=0)}
+    for week, total in totals.items():
+        yield week, float(total), track_groups.get(week, {}), artist_groups.get(week, {})
+
+
+# ____ SPEICHER ____
+def _write_json(payload, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    tmp_path.replace(path)
+
+
+def load_events(events_path=PEAK_EVENTS_PATH) -> list:
+    path = Path(events_path)
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_detector(state_path=PEAK_STATE_PATH) -> PeakDetector:
+    path = Path(state_path)
+    if not path.exists():
+        return PeakDetector()
+    with open(path, "r", encoding="utf-8") as f:
+        return PeakDetector.from_dict(json.load(f))
+
+
+def detect_events(df, period="chart_week", region=REGION) -> list:
+    """Alle Wochen von df durch einen frischen Detektor (nur im Speicher, ohne Zustand zu schreiben)."""
+    detector = PeakDetector()
+    events = []
+    for week, total, tracks, artists in weekly_inputs(df, period, region):
+        event = detector.update(week, total, tracks, artists)
+        if event is not None:
+            events.append(event)
+    return events
+
+
+def peak_events(df, events_path=PEAK_EVENTS_PATH, period="chart_week") -> list:
+    """
+    Gespeicherte Events für die Wochen von df; ohne gespeicherte Events
+    (z. B. frischer Checkout) werden sie im Speicher aus df berechnet.
+    """
+    events = load_events(events_path)
+    if not events:
+        return detect_events(df, period)
+    weeks = {str(w.date()) for w in pd.to_datetime(df[period].unique())}
+    return [event for event in events if event["week"] in weeks]
+
+
+def ingest_weeks(df, state_path=PEAK_STATE_PATH, events_path=PEAK_EVENTS_PATH, period="chart_week",
+                 region=REGION) -> list:
+    """
+    Führt alle Wochen nach dem gespeicherten Stand durch den Detektor und speichert Zustand
+    und Events. Bereits aufgenommene Wochen werden nicht neu bewertet (neu aufbauen: Dateien löschen).
+    Rückgabe: alle Events.
+    """
+    detector = load_detector(state_path)
+    events = load_events(events_path)
+
+    df = region_rows(df, region)
+    if detector.last_week is not None:
+        df = df[pd.to_datetime(df[period]) > detector.last_week]
+    if df.empty:
+        return events
+
+    new_events = []
+    with stage("peaks.ingest", rows=len(df)):
+        for week, total, tracks, artists in weekly_inputs(df, period, region):
+            event = detector.update(week, total, tracks, artists)
+            if event is not None:
+                new_events.append(event)
+
+    events = events + new_events
+    _write_json(detector.to_dict(), state_path)
+    _write_json(events, events_path)
+    print(
+        f"Peaks: {df[period].nunique()} neue Wochen bis {detector.last_week.date()}, "
+        f"{len(new_events)} neue Events ({len(events)} gesamt)."
+    )
+    return events
+
+
+# ____ DARSTELLUNG ____
+EVENT_COLORS = {"anomaly": "#636EFA", "seasonal": "#EF553B"}
+
+
+def event_label(event) -> str:
+    """Kurztext für die Annotation: wichtigster Künstler + Zuwachs (saisonale Peaks markiert)."""
+    top = event["top_artists"][0]["name"] if event["top_artists"] else "Markt"
+    gain = f"+{event['lift']:.0%}"
+    return f"Saisonal: {top} ({gain})" if event["kind"] == "seasonal" else f"{top} ({gain})"
+
+
+def event_annotations(events, weeks=None) -> list:
+    """Plotly-Annotationen (Dicts für fig.add_annotation); optional nur für die Wochen in `weeks`."""
+    if weeks is not None:
+        weeks = {str(pd.Timestamp(w).date()) for w in weeks}
+    annotations = []
+    for i, event in enumerate(events):
+        if weeks is not None and event["week"] not in weeks:
+            continue
+        annotations.append(dict(
+            x=event["week"], y=event["streams"],
+            text=event_label(event),
+            hovertext="<br>".join(
+                f"{t['name']}: +{t['gain'] / 1e6:.1f} Mio." for t in event["top_tracks"]
+            ),
+            showarrow=True, arrowhead=2, opacity=0.85,
+            ax=-60 if i % 2 else 50, ay=-40 - 20 * (i % 2),
+            bgcolor=EVENT_COLORS[event["kind"]], bordercolor="white",
+        ))
+    return annotations
+
+
+# ____ CLI ____
+def main(argv=None):
+    from .analyse_figures import DATA_PATH, load_chart_history
+
+    parser = argparse.ArgumentParser(
+        description="Peaks im wöchentlichen Stream-Volumen erkennen (online, nur neue Wochen)."
+    )
+    parser.add_argument("--data-path", type=Path, default=DATA_PATH)
+    parser.add_argument("--rebuild", action="store_true", help="Zustand und Events verwerfen, alle Wochen neu")
+    args = parser.parse_args(argv)
+
+    new_run("peaks")
+    if args.rebuild:
+        PEAK_STATE_PATH.unlink(missing_ok=True)
+        PEAK_EVENTS_PATH.unlink(missing_ok=True)
+    try:
+        events = ingest_weeks(load_chart_history(args.data_path))
+    except (OSError, ValueError) as e:
+        print(f"Fehler: {e}", file=sys.stderr)
+        return 1
+
+    for event in events:
+        artists = ", ".join(a["name"] for a in event["top_artists"])
+        print(f"  {event['week']}  {event['kind']:<8} +{event['lift']:.0%} (z {event['z']:.1f})  {artists}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
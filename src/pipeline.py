@@ -0,0 +1,461 @@
+import argparse
+import contextvars
+import hashlib
+import json
+import pickle
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from .extraction_unique_entities import extract_date_from_filename, prepare_regions
+from .instrumentation import current_run_id, new_run, stage
+from .granularity import extract_granularity_from_filename, rollup_daily_to_weekly, write_daily_partition
+from .versioning import data_version, file_version, model_version
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DATA_DIR = BASE_DIR / "data"
+RAW_DIR = DATA_DIR / "raw"
+INTERIM_DIR = DATA_DIR / "interim"
+
+STATE_PATH = INTERIM_DIR / "pipeline_state.json"
+ARTIFACT_DIR = INTERIM_DIR / "pipeline"
+
+
+# ____ STUFEN ____
+# Jede Stufe: Funktion (ctx, deps) → Ergebnis. Ergebnisse werden als Pickle
+# gespeichert, damit übersprungene Stufen ihren Stand an Folgestufen weitergeben.
+def _stage_extract(ctx, deps):
+    processed_paths, unique_path, date_str = prepare_regions(
+        input_paths=ctx["raw_paths"],
+        processed_dir=ctx["processed_dir"],
+        output_dir=ctx["interim_dir"]
+    )
+    granularity = extract_granularity_from_filename(Path(ctx["raw_paths"][0]).name)
+    return {
+        "processed_paths": processed_paths,
+        "unique_path": unique_path,
+        "date_str": date_str,
+        "granularity": granularity,
+        "enrich_tag": _enrich_tag(granularity, date_str),
+    }
+
+
+def _enrich_tag(granularity, date_str):
+    return date_str if granularity == "weekly" else f"{granularity}_{date_str}"
+
+
+def _stage_enrich(ctx, deps):
+    from .spotify_client import SpotifyClient
+
+    extract = deps["extract"]
+    enriched_csv = Path(ctx["interim_dir"]) / f"enriched_data_{extract['enrich_tag']}.csv"
+    SpotifyClient().run_full_pipeline(
+        unique_tracks_csv=extract["unique_path"],
+        date_str=extract["enrich_tag"],
+        output_dir=ctx["interim_dir"]
+    )
+    return {"enriched_csv": enriched_csv}
+
+
+def _history_path(processed_dir):
+    """Aktuelle gemergte Historie (Fallback: Rohhistorie), wie in merge_new_data."""
+    updated = Path(processed_dir) / "hist_data_updated.csv"
+    return updated if updated.exists() else Path(processed_dir) / "hist_data_24-25.csv"
+
+
+def _stage_merge(ctx, deps):
+    from .merge_dataframes import merge_new_data
+
+    extract = deps["extract"]
+    processed_dir = Path(ctx["processed_dir"])
+    if extract["granularity"] == "daily":
+        # Tagescharts partitionieren, nur betroffene Wochen neu aufrollen
+        df_days = pd.concat([pd.read_csv(p) for p in extract["processed_paths"]], ignore_index=True)
+        touched_days = write_daily_partition(df_days, ctx["daily_dir"])
+        charts_csv = rollup_daily_to_weekly(
+            ctx["daily_dir"], touched_days, ctx["rollup_dir"],
+            history_path=_history_path(processed_dir),
+        )
+        if not charts_csv:
+            raise ValueError("Keine vollständige Chart-Woche (7 Tage) in den Tagescharts – nichts zu mergen.")
+    else:
+        charts_csv = extract["processed_paths"]
+
+    return merge_new_data(
+        charts_csv=charts_csv,
+        enriched_csv=deps["enrich"]["enriched_csv"],
+        date_str=extract["date_str"],
+        processed_dir=processed_dir,
+        hist_raw_path=processed_dir / "hist_data_24-25.csv",
+        hist_updated_path=processed_dir / "hist_data_updated.csv",
+        backup_dir=Path(ctx["backup_dir"])
+    )
+
+
+def _stage_features(ctx, deps):
+    from .features import build_features
+
+    df_features = build_features(deps["merge"])
+    df_features["ds"] = pd.to_datetime(df_features["chart_week"], errors="coerce")
+    return df_features
+
+
+def _stage_score(ctx, deps):
+    from .predict_pipeline import run_prediction_pipeline
+
+    df_features = deps["features"].copy()
+    preds, probs = run_prediction_pipeline(df_features)
+    df_features["is_rising"] = preds
+    df_features["probability"] = probs
+    df_features["is_future"] = False
+    return df_features
+
+
+def _stage_horizon(ctx, deps):
+    from .forecast_horizon import build_forecast_horizon
+    from .predict_pipeline import run_prediction_pipeline
+
+    future_df = build_forecast_horizon(deps["features"], granularity="weekly")
+    preds, probs = run_prediction_pipeline(future_df)
+    future_df["is_rising"] = preds
+    future_df["probability"] = probs
+    future_df["is_future"] = True
+    return future_df
+
+
+def _stage_combine(ctx, deps):
+    from .weekly_topk import build_weekly_topk
+
+    df_all = pd.concat([deps["score"], deps["horizon"]], ignore_index=True)
+    return {
+        "df_all": df_all,
+        "data_version": data_version(df_all),
+        # Modellstand der Wahrscheinlichkeiten – der Scoring-Service bewertet nach einem Promote neu
+        "model_version": model_version(ctx["model_dir"]),
+        "weekly_topk": build_weekly_topk(df_all, k=10),
+    }
+
+
+def _stage_concentration(ctx, deps):
+    from .concentration import update_concentration
+
+    # Nur neue oder geänderte Wochen werden berechnet
+    return update_concentration(deps["merge"], path=Path(ctx["interim_dir"]) / "concentration.csv")
+
+
+def _stage_peaks(ctx, deps):
+    from .peak_detector import ingest_weeks
+
+    # Online: nur Wochen der fortgeschriebenen Historie nach dem gespeicherten Detektor-Stand
+    interim_dir = Path(ctx["interim_dir"])
+    return ingest_weeks(
+        deps["merge"],
+        state_path=interim_dir / "peak_state.json",
+        events_path=interim_dir / "peak_events.json"
+    )
+
+
+def _stage_figures(ctx, deps):
+    from .analyse_figures import warm_figure_cache
+
+    # Dieselbe Historie, die merge_new_data gerade fortgeschrieben hat
+    return warm_figure_cache(
+        data_path=Path(ctx["processed_dir"]) / "hist_data_updated.csv",
+        cache_dir=Path(ctx["cache_dir"]) / "figures"
+    )
+
+
+def _merge_inputs(ctx):
+    """Historie (roh + fortgeschrieben) und Enrichment-Datei der Periode – nur vorhandene Dateien."""
+    processed_dir = Path(ctx["processed_dir"])
+    raw_name = Path(ctx["raw_paths"][0]).name
+    tag = _enrich_tag(extract_granularity_from_filename(raw_name), extract_date_from_filename(raw_name))
+    paths = [
+        processed_dir / "hist_data_24-25.csv",
+        processed_dir / "hist_data_updated.csv",
+        Path(ctx["interim_dir"]) / f"enriched_data_{tag}.csv",
+    ]
+    return [p for p in paths if p.exists()]
+
+
+# Abhängigkeiten (deps) und externe Eingabedateien (inputs) pro Stufe.
+# Der Fingerprint einer Stufe = Parameter + Eingabedateien + Fingerprints der Abhängigkeiten.
+STAGES = {
+    "extract": {"deps": [], "inputs": lambda ctx: ctx["raw_paths"], "run": _stage_extract},
+    "enrich": {"deps": ["extract"], "inputs": lambda ctx: [], "run": _stage_enrich},
+    "merge": {"deps": ["extract", "enrich"], "inputs": _merge_inputs, "run": _stage_merge},
+    "features": {"deps": ["merge"], "inputs": lambda ctx: [], "run": _stage_features},
+    "score": {"deps": ["features"], "inputs": lambda ctx: [], "run": _stage_score, "models": True},
+    "horizon": {"deps": ["features"], "inputs": lambda ctx: [], "run": _stage_horizon, "models": True},
+    "combine": {"deps": ["score", "horizon"], "inputs": lambda ctx: [], "run": _stage_combine},
+    "concentration": {"deps": ["merge"], "inputs": lambda ctx: [], "run": _stage_concentration},
+    "peaks": {"deps": ["merge"], "inputs": lambda ctx: [], "run": _stage_peaks},
+    "figures": {
+        "deps": ["merge", "peaks"],
+        "inputs": lambda ctx: [Path(ctx["processed_dir"]) / "hist_data_updated.csv"],
+        "run": _stage_figures
+    },
+}
+
+
+def topological_order(stages=STAGES) -> list:
+    """Stufen in Abhängigkeitsreihenfolge; ValueError bei Zyklen oder unbekannten Stufen."""
+    order, visiting, done = [], set(), set()
+
+    def visit(name):
+        if name in done:
+            return
+        if name not in stages:
+            raise ValueError(f"Unbekannte Stufe: {name}")
+        if name in visiting:
+            raise ValueError(f"Zyklus in der Pipeline bei Stufe: {name}")
+        visiting.add(name)
+        for dep in stages[name]["deps"]:
+            visit(dep)
+        visiting.discard(name)
+        done.add(name)
+        order.append(name)
+
+    for name in stages:
+        visit(name)
+    return order
+
+
+# ____ ZUSTAND ____
+def load_state(state_path=STATE_PATH) -> dict:
+    state_path = Path(state_path)
+    if state_path.exists():
+        return json.loads(state_path.read_text())
+    return {}
+
+
+def save_state(state, state_path=STATE_PATH):
+    state_path = Path(state_path)
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = state_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(state, indent=2, sort_keys=True))
+    tmp_path.replace(state_path)
+
+
+def stage_fingerprint(name, ctx, dep_fingerprints, stages=STAGES) -> str:
+    stage = stages[name]
+    h = hashlib.sha1()
+    h.update(name.encode())
+    h.update(ctx["week"].encode())
+    for path in stage["inputs"](ctx):
+        h.update(f"{Path(path).name}:{file_version(path)}".encode())
+    if stage.get("models"):
+        h.update(model_version(ctx["model_dir"]).encode())
+    for dep in stage["deps"]:
+        h.update(dep_fingerprints[dep].encode())
+    return h.hexdigest()[:16]
+
+
+# Artefakte liegen pro Periode unter <artifact_dir>/<week>/ – ein erneuter Lauf für eine
+# frühere Woche überschreibt nicht den Stand der aktuellen.
+def latest_week(artifact_dir=ARTIFACT_DIR):
+    """Jüngste Periode mit Artefakten (Wochen als YYYY-MM-DD sortieren lexikografisch) oder None."""
+    artifact_dir = Path(artifact_dir)
+    weeks = sorted(p.name for p in artifact_dir.iterdir() if p.is_dir()) if artifact_dir.exists() else []
+    return weeks[-1] if weeks else None
+
+
+def artifact_path(name, artifact_dir=ARTIFACT_DIR, week=None) -> Path:
+    """Artefakt einer Stufe; ohne `week` das der jüngsten Periode."""
+    week = week or latest_week(artifact_dir)
+    if week is None:
+        raise FileNotFoundError(f"Keine Pipeline-Artefakte unter {artifact_dir}")
+    return Path(artifact_dir) / week / f"{name}.pkl"
+
+
+def _save_artifact(name, result, artifact_dir, week):
+    path = artifact_path(name, artifact_dir, week)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp_path.replace(path)
+
+
+def load_artifact(name, artifact_dir=ARTIFACT_DIR, week=None):
+    with open(artifact_path(name, artifact_dir, week), "rb") as f:
+        return pickle.load(f)
+
+
+# ____ AUSFÜHRUNG ____
+def find_raw_files(week, raw_dir=RAW_DIR) -> list:
+    """Hochgeladene Chart-Dateien einer Periode (alle Regionen), z. B. *-2026-01-15_origin.csv."""
+    return sorted(p for p in Path(raw_dir).glob(f"*{week}*.csv") if p.is_file())
+
+
+def build_context(week, raw_paths=None, base_dir=BASE_DIR) -> dict:
+    data_dir = Path(base_dir) / "data"
+    raw_paths = [Path(p) for p in raw_paths] if raw_paths else find_raw_files(week, data_dir / "raw")
+    if not raw_paths:
+        raise ValueError(f"Keine Chart-Dateien für {week} in {data_dir / 'raw'} gefunden.")
+    return {
+        "week": week,
+        "raw_paths": raw_paths,
+        "interim_dir": data_dir / "interim",
+        "processed_dir": data_dir / "processed",
+        "backup_dir": data_dir / "backups",
+        "daily_dir": data_dir / "processed" / "daily",
+        "rollup_dir": data_dir / "processed" / "rollups",
+        "cache_dir": data_dir / "cache",
+        "model_dir": Path(base_dir) / "models",
+    }
+
+
+def run_pipeline(
+    ctx,
+    targets=None,
+    force=False,
+    max_workers=4,
+    stages=STAGES,
+    state_path=STATE_PATH,
+    artifact_dir=ARTIFACT_DIR
+):
+    """
+    Führt die Pipeline als DAG aus.
+    1. Fingerprint jeder Stufe aus Parametern, Eingabedateien und Vorgänger-Fingerprints
+    2. Stufen mit unverändertem Fingerprint (und vorhandenem Artefakt) werden übersprungen
+    3. Unabhängige Stufen laufen parallel (Thread-Pool), sobald ihre Abhängigkeiten fertig sind
+    Rückgabe: Liste mit Zeitbericht pro Stufe.
+    """
+    order = topological_order(stages)
+    if targets:
+        # Nur die Zielstufen und ihre Vorgänger
+        needed = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in stages:
+                raise ValueError(f"Unbekannte Stufe: {name}")
+            if name not in needed:
+                needed.add(name)
+                stack += stages[name]["deps"]
+        order = [name for name in order if name in needed]
+
+    if current_run_id() is None:
+        new_run(f"pipeline {ctx['week']}")
+
+    state = load_state(state_path)
+    fingerprints, results, report = {}, {}, {}
+    started = time.perf_counter()
+
+    def result_of(name):
+        if name not in results:
+            results[name] = load_artifact(name, artifact_dir, ctx["week"])
+        return results[name]
+
+    def execute(name):
+        t0 = time.perf_counter()
+        with stage(f"pipeline.{name}") as rec:
+            deps = {dep: result_of(dep) for dep in stages[name]["deps"]}
+            result = stages[name]["run"](ctx, deps)
+            if hasattr(result, "__len__") and hasattr(result, "columns"):
+                rec["rows"] = len(result)
+            _save_artifact(name, result, artifact_dir, ctx["week"])
+        return result, time.perf_counter() - t0
+
+    pending = list(order)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            # Alle Stufen starten, deren Abhängigkeiten abgeschlossen sind
+            for name in list(pending):
+                if any(dep not in fingerprints for dep in stages[name]["deps"]):
+                    continue
+                pending.remove(name)
+                fingerprint = stage_fingerprint(name, ctx, fingerprints, stages)
+                cached = state.get(name, {}).get("fingerprint") == fingerprint
+                if cached and not force and artifact_path(name, artifact_dir, ctx["week"]).exists():
+                    fingerprints[name] = fingerprint
+                    report[name] = {"stage": name, "status": "skipped", "seconds": 0.0}
+                    continue
+                print(f"▶ {name}")
+                # Eigener Kontext pro Stufe: Threads erben Lauf-ID und Eltern-Stufe
+                ctx_copy = contextvars.copy_context()
+                running[pool.submit(ctx_copy.run, execute, name)] = (name, fingerprint)
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, fingerprint = running.pop(future)
+                try:
+                    results[name], seconds = future.result()
+                except Exception:
+                    # Laufende Stufen abwarten, Zustand der fertigen Stufen behalten
+                    save_state(state, state_path)
+                    print(f"✖ {name} fehlgeschlagen")
+                    raise
+                # Neu berechnen: merge schreibt seine eigene Eingabe (hist_data_updated.csv) fort,
+                # sonst liefe die Stufe beim nächsten Aufruf ohne Änderung erneut
+                fingerprint = stage_fingerprint(name, ctx, fingerprints, stages)
+                fingerprints[name] = fingerprint
+                state[name] = {
+                    "fingerprint": fingerprint,
+                    "week": ctx["week"],
+                    "seconds": round(seconds, 3),
+                    "finished_at": datetime.now().isoformat(timespec="seconds"),
+                }
+                report[name] = {"stage": name, "status": "ran", "seconds": seconds}
+                print(f"✔ {name} ({seconds:.1f} s)")
+
+    save_state(state, state_path)
+    rows = [report[name] for name in order]
+    rows.append({"stage": "total", "status": "", "seconds": time.perf_counter() - started})
+    return rows
+
+
+def format_report(rows) -> str:
+    lines = [f"{'Stufe':<10} {'Status':<8} {'Sekunden':>9}"]
+    for row in rows:
+        lines.append(f"{row['stage']:<10} {row['status']:<8} {row['seconds']:>9.2f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Headless Pipeline: Extraktion → Enrichment → Merge → Features → Scoring → Horizont."
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Pipeline für eine Periode ausführen")
+    run.add_argument("--week", required=True, help="Periode der Chart-Dateien, z. B. 2026-01-15")
+    run.add_argument("--files", nargs="*", type=Path, help="Chart-Dateien explizit angeben")
+    run.add_argument("--stage", nargs="*", dest="targets", choices=list(STAGES),
+                     help="Nur diese Stufen (plus Vorgänger) ausführen")
+    run.add_argument("--force", action="store_true", help="Fingerprints ignorieren")
+    run.add_argument("--workers", type=int, default=4)
+
+    sub.add_parser("status", help="Letzten Stand jeder Stufe anzeigen")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        state = load_state()
+        for name in topological_order():
+            info = state.get(name)
+            print(f"{name:<10} " + (f"{info['week']}  {info['finished_at']}  {info['seconds']:.1f} s" if info else "–"))
+        return 0
+
+    try:
+        ctx = build_context(args.week, args.files)
+        rows = run_pipeline(ctx, targets=args.targets, force=args.force, max_workers=args.workers)
+    except ValueError as e:
+        print(f"Fehler: {e}", file=sys.stderr)
+        return 1
+
+    print(format_report(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,13 @@
 import json
 import pandas as pd
-from prophet.serialize import model_from_json
-import lightgbm as lgb
-import os
 import streamlit as st
 
+from .explanations import predict_chunked
+from .instrumentation import stage
+from .model_registry import active_artefacts
+from .segment_trends import load_segment_trends, segment_trend
+from .versioning import model_version
+
 MODEL_DIR = "models/"
 
 
@@ -14,47 +17,88 @@ _prophet_model = None
 _lgbm_model = None
 _best_t = None
 _feature_cols = None
+_segment_trends = None
+
+# (Modellordner, model_version) der geladenen Artefakte
+_loaded_key = None
 
-@st.cache_resource
 def load_artefacts(model_dir=MODEL_DIR):
-    """Lädt Prophet, LightGBM, Threshold und Feature-Liste."""
-    global _prophet_model, _lgbm_model, _best_t, _feature_cols
+    """
+    Lädt Prophet, LightGBM, Threshold und Feature-Liste der aktiven Version
+    (models/registry.json, ohne Registry die v1-Artefakte aus dem Notebook).
+    Prophet und LightGBM werden erst hier importiert, damit der Kaltstart
+    der Seiten nicht von diesen Bibliotheken abhängt.
+    Neu geladen wird, sobald sich model_version ändert (promote, update, neue Dateien).
+    """
+    global _loaded_key
 
-    if _prophet_model is not None:
+    key = (str(model_dir), model_version(model_dir))
+    if key == _loaded_key:
         return _prophet_model, _lgbm_model, _best_t, _feature_cols
 
+    with stage("models.load", version=key[1]):
+        _load_artefacts_files(model_dir)
+    _loaded_key = key
+
+    print(f"Modelle geladen. Optimaler Threshold: {_best_t}")
+
+    return _prophet_model, _lgbm_model, _best_t, _feature_cols
+
+
+def _load_artefacts_files(model_dir):
+    global _prophet_model, _lgbm_model, _best_t, _feature_cols, _segment_trends
+
+    from prophet.serialize import model_from_json
+    import lightgbm as lgb
+
+    artefacts = active_artefacts(model_dir)
+    _segment_trends = None
+
     # Prophet
-    with open(os.path.join(model_dir, "market_trend_prophet_v1.json"), "r") as f:
+    with open(artefacts["prophet"], "r") as f:
         _prophet_model = model_from_json(f.read())
 
     # LightGBM
-    _lgbm_model = lgb.Booster(
-        model_file=os.path.join(model_dir, "rising_artist_lgbm_v1.txt")
-    )
+    _lgbm_model = lgb.Booster(model_file=str(artefacts["lgbm"]))
 
     # Threshold
-    with open(os.path.join(model_dir, "rising_artist_threshold.json"), "r") as f:
+    with open(artefacts["threshold"], "r") as f:
         _best_t = json.load(f)["best_threshold"]
 
     # Feature-Liste
-    with open(os.path.join(model_dir, "rising_artist_features.json"), "r") as f:
+    with open(artefacts["features"], "r") as f:
         _feature_cols = json.load(f)
 
-    print(f"Modelle geladen. Optimaler Threshold: {_best_t}")
-
-    return _prophet_model, _lgbm_model, _best_t, _feature_cols
+    # Segment-Trends (pro Genre/Region, optional; siehe src/segment_trends.py)
+    if "segment_trends" in artefacts:
+        _segment_trends = load_segment_trends(artefacts["segment_trends"])
 
 # ____ PREDICTION PIPELINE ____ 
 
-@st.cache_data
-def run_prediction_pipeline(df):
+def run_prediction_pipeline(df, explain=False):
     """
     df: DataFrame mit Features + Spalte 'ds'
     Erwartet:
         - ds (datetime)
         - alle Feature-Spalten aus rising_artist_features.json
+    `explain=True` liefert zusätzlich die Feature-Beiträge (siehe src/explanations.py).
+    Gecacht pro Modellversion → nach promote/update wird neu gescort.
     """
-    prophet_model, lgbm_model, best_t, feature_cols = load_artefacts()
+    return _cached_prediction(df, explain, model_version(MODEL_DIR))
+
+
+@st.cache_data
+def _cached_prediction(df, explain, version):
+    return score_frame(df, explain=explain)
+
+
+def score_frame(df, explain=False, model_dir=MODEL_DIR):
+    """
+    Ungecachter Kern von run_prediction_pipeline (für Dienste außerhalb von Streamlit,
+    z. B. src/scoring_service.py). Rückgabe: (preds, probs) bzw. (preds, probs, contrib)
+    mit explain=True (contrib: float32-DataFrame, eine Spalte pro Feature + Basiswert).
+    """
+    prophet_model, lgbm_model, best_t, feature_cols = load_artefacts(model_dir)
 
     df = df.copy()
 
@@ -62,14 +106,9 @@ def run_prediction_pipeline(df):
     if "ds" not in df.columns:
         raise ValueError("Spalte 'ds' fehlt. Bitte chart_week → ds konvertieren.")
 
-    required_regressors = ["genre_idx_lagged", "seasonality_score"]
-    missing = [col for col in required_regressors if col not in df.columns]
-
-    if missing:
-        raise ValueError(f"Fehlende Prophet‑Regressoren: {missing}.")
-    
-    forecast = prophet_model.predict(df[["ds", "genre_idx_lagged", "seasonality_score"]])
-    df["prophet_trend"] = forecast["trend"].values
+    df["prophet_trend"] = prophet_trend(df, prophet_model)
+    if "segment_trend" in feature_cols:
+        df["segment_trend"] = segment_trend(df, _segment_trends)
 
     # LightGBM: Features vorbereiten
     # Fehlende Spalten automatisch ergänzen
@@ -80,9 +119,34 @@ def run_prediction_pipeline(df):
     X = df[feature_cols].fillna(0)
 
     # Vorhersage
-    probs = lgbm_model.predict(X)
+    with stage("score.lightgbm", rows=len(X), explain=explain):
+        probs, contrib = predict_chunked(lgbm_model, X, explain=explain)
     preds = (probs > best_t).astype(int)
 
+    if explain:
+        return preds, probs, contrib
     return preds, probs
-    
-print("Prediction Pipeline erfolgreich geladen.")
\ No newline at end of file
+
+
+def prophet_trend(df, prophet_model):
+    """
+    Prophet-Trend pro Zeile (auch für das Training in src/train.py).
+    Der Trend hängt nur von 'ds' ab → Prophet nur einmal pro Woche auswerten
+    (statt pro Zeile; bei vielen Regionen/Tracks um Größenordnungen schneller).
+    """
+    required_regressors = ["genre_idx_lagged", "seasonality_score"]
+    missing = [col for col in required_regressors if col not in df.columns]
+
+    if missing:
+        raise ValueError(f"Fehlende Prophet‑Regressoren: {missing}.")
+
+    weekly = (
+        df[["ds", "genre_idx_lagged", "seasonality_score"]]
+        .drop_duplicates(subset=["ds"])
+        .sort_values("ds")
+        .fillna(0)
+    )
+    with stage("score.prophet_trend", rows=len(weekly)):
+        forecast = prophet_model.predict(weekly)
+    trend_by_ds = pd.Series(forecast["trend"].values, index=weekly["ds"].values)
+    return df["ds"].map(trend_by_ds).values
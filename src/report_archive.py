@@ -0,0 +1,278 @@
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .instrumentation import new_run, stage
+from .model_registry import load_registry
+from .report_cache import report_key, shared_report_cache
+from .trend_reports import (
+    GEMINI_MODEL, RISING_THRESHOLD, TOP_GENRES, driver_lines, genre_list, make_client, request_report
+)
+from .weekly_topk import build_weekly_topk, get_topk
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+MODEL_DIR = BASE_DIR / "models"
+REPORT_ARCHIVE_DIR = BASE_DIR / "data" / "reports"
+
+DEFAULT_WORKERS = 4
+
+# Obergrenze für API-Aufrufe pro Minute (Cache-Treffer zählen nicht)
+REQUESTS_PER_MINUTE = 30
+
+# Wiederholungen pro Woche bei Fehlern, Wartezeit verdoppelt sich ab RETRY_BASE_SECONDS
+MAX_RETRIES = 3
+RETRY_BASE_SECONDS = 2.0
+
+
+# ____ PROMPT-EINGABEN FÜR ALLE WOCHEN ____
+def weekly_report_inputs(df_all, weekly_topk, explanations=None, weeks=None) -> dict:
+    """
+    Prompt-Eingaben für alle Wochen in einem Durchlauf über den Vorhersage-Datensatz
+    (groupby statt report_inputs pro Woche). Ergebnis pro Woche identisch zu
+    trend_reports.report_inputs → dieselben Cache-Schlüssel wie im Dashboard.
+    Wochen ohne Daten oder ohne Top 10 fehlen im Ergebnis. Rückgabe: {Woche: inputs}.
+    """
+    weeks = list(weekly_topk["weeks"] if weeks is None else weeks)
+    df = df_all[df_all["ds"].isin(weeks)]
+    ds = df["ds"]
+
+    n_tracks = ds.value_counts()
+    if "probability" in df.columns:
+        rising = (df["probability"] >= RISING_THRESHOLD).groupby(ds).sum()
+    else:
+        rising = pd.Series(0, index=n_tracks.index)
+
+    if "artist_genres" in df.columns:
+        exploded = pd.DataFrame({"ds": ds, "genre": df["artist_genres"].map(genre_list)}).explode("genre")
+        counts = exploded.dropna(subset=["genre"]).groupby(["ds", "genre"]).size().reset_index(name="n")
+        counts = counts.sort_values(["ds", "n", "genre"], ascending=[True, False, True], kind="stable")
+        genres = counts.groupby("ds").head(TOP_GENRES).groupby("ds")["genre"].agg(list)
+    else:
+        genres = pd.Series([["unknown"]] * len(n_tracks), index=n_tracks.index)
+
+    inputs = {}
+    for week in weeks:
+        top_10 = get_topk(weekly_topk, week, k=10)
+        if week not in n_tracks.index or top_10.empty:
+            continue
+        inputs[week] = {
+            "top_genres": [str(g) for g in genres.get(week, [])],
+            "top_artist": str(top_10.iloc[0].get("artist_names", "Unbekannter Artist")),
+            "top_song": str(top_10.iloc[0].get("track_name", "Unbekannter Song")),
+            "rising_count": int(rising.get(week, 0)),
+            "n_tracks": int(n_tracks[week]),
+            "drivers": driver_lines(top_10, explanations),
+        }
+    return inputs
+
+
+# ____ RATE-LIMIT & RETRIES ____
+class RateLimiter:
+    """Gleichmäßige Abstände zwischen Aufrufen (threadsicher): höchstens `per_minute` pro Minute."""
+
+    def __init__(self, per_minute=REQUESTS_PER_MINUTE):
+        self.interval = 60.0 / per_minute
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def with_retries(fn, retries=MAX_RETRIES, base_seconds=RETRY_BASE_SECONDS):
+    """fn() mit exponentiellem Backoff wiederholen; der letzte Fehler wird weitergereicht."""
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(base_seconds * 2 ** attempt)
+
+
+# ____ ARCHIV ____
+def archive_path(week, model_version, archive_dir=REPORT_ARCHIVE_DIR) -> Path:
+    return Path(archive_dir) / model_version / f"{pd.Timestamp(week).date()}.json"
+
+
+def _save_report(entry, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False, indent=2)
+    tmp_path.replace(path)
+
+
+def load_archive(model_version, archive_dir=REPORT_ARCHIVE_DIR) -> pd.DataFrame:
+    """Alle archivierten Berichte einer Modellversion, sortiert nach Woche."""
+    rows = []
+    for path in sorted((Path(archive_dir) / model_version).glob("*.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            rows.append(json.load(f))
+    if not rows:
+        return pd.DataFrame(columns=["week", "model_version", "llm_model", "text", "created_at"])
+    df = pd.DataFrame(rows)
+    df["week"] = pd.to_datetime(df["week"])
+    return df
+
+
+def generate_archive(df_all, weekly_topk, model_version, explanations=None, weeks=None, client=None,
+                     model=GEMINI_MODEL, workers=DEFAULT_WORKERS, per_minute=REQUESTS_PER_MINUTE,
+                     retries=MAX_RETRIES, overwrite=False, archive_dir=REPORT_ARCHIVE_DIR, cache=None) -> dict:
+    """
+    Berichte für alle Wochen erzeugen und unter <archive_dir>/<model_version>/<Woche>.json ablegen.
+    - bereits archivierte Wochen werden übersprungen (außer overwrite=True) → Backfill ist fortsetzbar
+    - Aufrufe laufen parallel in `workers` Threads, gemeinsam begrenzt auf `per_minute`
+    - Berichte laufen über den Berichts-Cache (gleiche Eingaben → kein erneuter API-Aufruf)
+    - fehlgeschlagene Wochen werden gesammelt, nicht archiviert
+    """
+    client = client or make_client()
+    if client is None:
+        raise ValueError("Kein Google API Key gefunden (GOOGLE_API_KEY) – oder GEMINI_FAKE=1 setzen.")
+    cache = cache or shared_report_cache()
+
+    with stage("reports.inputs", rows=len(df_all)):
+        inputs = weekly_report_inputs(df_all, weekly_topk, explanations, weeks)
+
+    future_weeks = {w for w, fut in zip(weekly_topk["weeks"], weekly_topk["is_future"]) if fut}
+    todo = {
+        week: week_inputs for week, week_inputs in inputs.items()
+        if overwrite or not archive_path(week, model_version, archive_dir).exists()
+    }
+    limiter = RateLimiter(per_minute)
+
+    def call_api(week_inputs):
+        limiter.acquire()
+        return request_report(week_inputs, model, client)
+
+    def run_week(week):
+        week_inputs = todo[week]
+        started = time.perf_counter()
+        text, hit = cache.get_or_create(
+            report_key(week_inputs, model),
+            lambda: with_retries(lambda: call_api(week_inputs), retries),
+            model=model,
+        )
+        _save_report({
+            "week": str(pd.Timestamp(week).date()),
+            "is_future": week in future_weeks,
+            "model_version": model_version,
+            "llm_model": model,
+            "inputs": week_inputs,
+            "text": text,
+            "cache_hit": hit,
+            "seconds": round(time.perf_counter() - started, 2),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }, archive_path(week, model_version, archive_dir))
+        return hit
+
+    hits, failed = 0, {}
+    with stage("reports.generate", rows=len(todo), workers=workers):
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {week: pool.submit(run_week, week) for week in todo}
+            for week, future in futures.items():
+                try:
+                    hits += future.result()
+                except Exception as e:
+                    failed[str(pd.Timestamp(week).date())] = str(e)
+
+    return {
+        "model_version": model_version,
+        "weeks": len(inputs),
+        "skipped": len(inputs) - len(todo),
+        "generated": len(todo) - len(failed),
+        "cache_hits": int(hits),
+        "failed": failed,
+    }
+
+
+# ____ CLI ____
+def load_predictions(artifact_dir=None, drivers=False):
+    """
+    Vorhersage-Datensatz aus dem Pipeline-Artefakt `combine` (df_all + weekly_topk).
+    `drivers=True` berechnet zusätzlich die Feature-Beiträge (ein Scoring-Durchlauf).
+    Rückgabe: (df_all, weekly_topk, explanations oder None).
+    """
+    from .pipeline import ARTIFACT_DIR, load_artifact
+
+    try:
+        combined = load_artifact("combine", artifact_dir or ARTIFACT_DIR)
+    except FileNotFoundError:
+        raise ValueError("Kein Pipeline-Artefakt 'combine' gefunden – zuerst python -m src.pipeline ausführen.")
+    df_all, weekly_topk = combined["df_all"], combined["weekly_topk"]
+    if not drivers:
+        return df_all, weekly_topk, None
+
+    from .explanations import Explanations
+    from .predict_pipeline import score_frame
+
+    df_all = df_all.reset_index(drop=True)
+    df_all["row_id"] = np.arange(len(df_all))
+    _, _, contrib = score_frame(df_all, explain=True)
+    return df_all, build_weekly_topk(df_all, k=10), Explanations(df_all["row_id"], contrib)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Gemini-Trendberichte für alle Wochen des Vorhersage-Datensatzes (Archiv pro Modellversion)."
+    )
+    parser.add_argument("--artifact-dir", type=Path, help="Pipeline-Artefakte (Standard: data/interim/pipeline)")
+    parser.add_argument("--model-version", help="Version für das Archiv (Standard: aktive Version der Registry)")
+    parser.add_argument("--start", help="Erste Woche, z. B. 2024-06-06")
+    parser.add_argument("--end", help="Letzte Woche")
+    parser.add_argument("--drivers", action="store_true", help="Einflussfaktoren der Top 10 in den Prompt aufnehmen")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Parallele Aufrufe")
+    parser.add_argument("--rpm", type=int, default=REQUESTS_PER_MINUTE, help="API-Aufrufe pro Minute")
+    parser.add_argument("--retries", type=int, default=MAX_RETRIES, help="Wiederholungen pro Woche")
+    parser.add_argument("--overwrite", action="store_true", help="Archivierte Wochen neu erzeugen")
+    parser.add_argument("--fake", action="store_true", help="Lokalen Fake-Client statt der Gemini-API verwenden")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    new_run("reports")
+    try:
+        df_all, weekly_topk, explanations = load_predictions(args.artifact_dir, args.drivers)
+        weeks = [
+            w for w in weekly_topk["weeks"]
+            if (args.start is None or w >= pd.Timestamp(args.start))
+            and (args.end is None or w <= pd.Timestamp(args.end))
+        ]
+        client = None
+        if args.fake:
+            from .fake_gemini import FakeGeminiClient
+            client = FakeGeminiClient()
+        summary = generate_archive(
+            df_all, weekly_topk, args.model_version or load_registry(MODEL_DIR)["active"],
+            explanations=explanations, weeks=weeks, client=client, workers=args.workers,
+            per_minute=args.rpm, retries=args.retries, overwrite=args.overwrite,
+        )
+    except ValueError as e:
+        print(f"Fehler: {e}", file=sys.stderr)
+        return 1
+
+    print(
+        f"{summary['model_version']}: {summary['generated']} Berichte erzeugt "
+        f"({summary['cache_hits']} aus dem Cache), {summary['skipped']} bereits archiviert, "
+        f"{len(summary['failed'])} fehlgeschlagen von {summary['weeks']} Wochen "
+        f"({time.perf_counter() - started:.1f} s)"
+    )
+    for week, error in summary["failed"].items():
+        print(f"  {week}: {error}", file=sys.stderr)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
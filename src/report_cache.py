@@ -0,0 +1,210 @@
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+from .instrumentation import count_cache
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+REPORT_CACHE_DIR = BASE_DIR / "data" / "cache" / "reports"
+
+# Berichte gelten einen Tag (gleiche Daten → gleicher Bericht, danach neu formulieren lassen)
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+
+def report_key(inputs, model) -> str:
+    """Schlüssel aus den Prompt-Eingaben (JSON, sortiert) und dem Modellnamen."""
+    inputs_str = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(f"{model}:{inputs_str}".encode()).hexdigest()
+
+
+class ReportStream:
+    """
+    Ein laufender Bericht als Stream, dem mehrere Leser folgen (jeder liest alle Stücke ab Beginn).
+    `stop` wird gesetzt, sobald kein Leser mehr übrig ist.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.done = False
+        self.error = None
+        self.readers = 0
+        self.stop = threading.Event()
+        self._cond = threading.Condition()
+
+    def append(self, text):
+        with self._cond:
+            self.parts.append(text)
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        with self._cond:
+            self.done = True
+            self.error = error
+            self._cond.notify_all()
+
+    def read(self, start, timeout):
+        """Stücke ab Position `start`, wartet höchstens `timeout` Sekunden. Rückgabe: (Stücke, fertig)."""
+        with self._cond:
+            if len(self.parts) <= start and not self.done:
+                self._cond.wait(timeout)
+            return self.parts[start:], self.done
+
+
+class ReportCache:
+    """
+    Berichte auf der Platte (eine JSON-Datei pro Schlüssel, mit TTL) – gilt für alle
+    Sessions und Prozesse. Gleiche gleichzeitige Anfragen im Prozess werden zusammengelegt
+    (nur ein API-Aufruf, die anderen warten auf dessen Ergebnis bzw. lesen den Stream mit).
+    Fehler werden nicht gespeichert.
+    """
+
+    def __init__(self, cache_dir=REPORT_CACHE_DIR, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self._inflight = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def path(self, key) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key):
+        """Gespeicherter Bericht oder None (fehlt, abgelaufen oder unlesbar)."""
+        path = self.path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+            path.unlink(missing_ok=True)
+            return None
+        return entry.get("text")
+
+    def put(self, key, text, model=None):
+        """Speichert atomar und räumt abgelaufene Einträge auf."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.prune()
+        path = self.path(key)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "model": model, "created_at": time.time(), "text": text}, f, ensure_ascii=False)
+        tmp_path.replace(path)
+
+    def prune(self) -> int:
+        """Löscht abgelaufene Einträge; Rückgabe: Anzahl gelöschter Dateien."""
+        if not self.cache_dir.exists():
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        for path in self.cache_dir.glob("*.json"):
+            if path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def get_or_create(self, key, generate, model=None):
+        """
+        Rückgabe: (text, hit).
+        1. Platten-Treffer: sofort
+        2. Gleiche Anfrage läuft bereits: auf deren Ergebnis warten (zählt als Treffer)
+        3. Sonst: generate() aufrufen und speichern
+        """
+        text = self.get(key)
+        if text is not None:
+            count_cache(hit=True)
+            return text, True
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            count_cache(hit=True)
+            return future.result(), True
+
+        try:
+            # Ein anderer Aufruf kann zwischen get() und Lock fertig geworden sein
+            text = self.get(key)
+            hit = text is not None
+            count_cache(hit=hit)
+            if not hit:
+                text = generate()
+                self.put(key, text, model)
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_result(text)
+        return text, hit
+
+    def join_stream(self, key, produce, model=None):
+        """
+        Gemeinsamer Stream pro Schlüssel. Der erste Aufruf startet produce(stream) in einem
+        Hintergrund-Thread (legt Stücke mit stream.append ab, Rückgabe True = vollständig);
+        gleiche Anfragen lesen denselben Stream mit. Vollständige Berichte werden gespeichert.
+        Jeder Aufruf muss mit leave_stream() beendet werden. Rückgabe: ReportStream.
+        """
+        with self._lock:
+            stream = self._streams.get(key)
+            owner = stream is None or stream.stop.is_set()
+            if owner:
+                stream = ReportStream()
+                self._streams[key] = stream
+            stream.readers += 1
+
+        if owner:
+            threading.Thread(target=self._run_stream, args=(key, stream, produce, model), daemon=True).start()
+        else:
+            count_cache(hit=True)
+        return stream
+
+    def leave_stream(self, key, stream):
+        with self._lock:
+            stream.readers -= 1
+            if stream.readers == 0 and not stream.done:
+                # Niemand liest mehr mit → der Worker verwirft den Rest des Streams
+                stream.stop.set()
+
+    def _run_stream(self, key, stream, produce, model):
+        error = None
+        try:
+            # Ein anderer Prozess kann den Bericht inzwischen gespeichert haben
+            text = self.get(key)
+            count_cache(hit=text is not None)
+            if text is not None:
+                stream.append(text)
+            elif produce(stream):
+                text = "".join(stream.parts)
+                if text:
+                    self.put(key, text, model)
+        except Exception as e:
+            error = e
+
+        with self._lock:
+            if self._streams.get(key) is stream:
+                self._streams.pop(key)
+        stream.finish(error)
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def shared_report_cache() -> ReportCache:
+    """Eine Instanz pro Prozess, damit alle Streamlit-Sessions dieselben In-Flight-Aufrufe sehen."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ReportCache()
+        return _shared_cache
@@ -0,0 +1,484 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from .pipeline import ARTIFACT_DIR, load_artifact
+from .track_index import TrackIndex
+from .versioning import MODEL_DIR, model_version
+from .weekly_topk import build_weekly_topk, get_topk
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Pflichtspalten für POST /score (siehe predict_pipeline.score_frame)
+SCORE_REQUIRED = ["ds", "genre_idx_lagged", "seasonality_score"]
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Größtes K für /topk (Top-K-Speicher wird einmal mit diesem K gebaut)
+DEFAULT_MAX_K = 10
+
+# Spalten der Antworten (Feature-Spalten bleiben intern)
+RESPONSE_COLUMNS = [
+    "ds", "region", "track_id", "artist_names", "track_name",
+    "rank", "streams", "probability", "is_rising", "is_future"
+]
+
+
+# ____ MICRO-BATCHING ____
+class ScoreBatcher:
+    """
+    Sammelt gleichzeitige Scoring-Anfragen und bewertet sie in einem Modellaufruf.
+    1. Anfragen landen in einer Queue (DataFrame + Future)
+    2. Ein Worker wartet max. `max_wait` Sekunden bzw. bis `max_rows` erreicht sind
+    3. Ein Aufruf von score_frame für alle gesammelten Zeilen, Ergebnis wird aufgeteilt
+    """
+
+    def __init__(self, score_fn, max_rows=50_000, max_wait=0.005):
+        self.score_fn = score_fn
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, df) -> Future:
+        future = Future()
+        self._queue.put((df, future))
+        return future
+
+    def score(self, df):
+        return self.submit(df).result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            rows = len(batch[0][0])
+            deadline = time.perf_counter() + self.max_wait
+            while rows < self.max_rows:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                rows += len(item[0])
+            self._score_batch(batch)
+
+    def _score_batch(self, batch):
+        try:
+            frames = [df for df, _ in batch]
+            preds, probs = self.score_fn(pd.concat(frames, ignore_index=True))
+            offsets = np.cumsum([0] + [len(df) for df in frames])
+            for (df, future), start, stop in zip(batch, offsets[:-1], offsets[1:]):
+                future.set_result((np.asarray(preds)[start:stop], np.asarray(probs)[start:stop]))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+
+# ____ ANTWORT-CACHE + COALESCING ____
+class ResponseCache:
+    """
+    LRU-Cache für fertige JSON-Antworten (bytes), Schlüssel enthält die Datenversion.
+    Gleiche gleichzeitige Anfragen werden zusammengelegt (nur eine Berechnung).
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            body = compute()
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._entries[key] = body
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._inflight.pop(key, None)
+        future.set_result(body)
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# ____ DATENSTAND ____
+def _records_json(df) -> str:
+    return df.to_json(orient="records", date_format="iso", force_ascii=False)
+
+
+def paginate(df, page=1, page_size=DEFAULT_PAGE_SIZE) -> str:
+    """JSON mit total/page/pages/items; page ist 1-basiert."""
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    total = len(df)
+    pages = max(1, -(-total // page_size))
+    page = max(1, min(int(page), pages))
+    part = df.iloc[(page - 1) * page_size: page * page_size]
+    return (
+        f'{{"total": {total}, "page": {page}, "pages": {pages}, '
+        f'"page_size": {page_size}, "items": {_records_json(part)}}}'
+    )
+
+
+class ScoringState:
+    """
+    Gescorte Daten eines Pipeline-Laufs + vorberechnete Zugriffsstrukturen
+    (Zeilenbereiche pro Woche, Top-K, Track-Index).
+    `model_version`: Modellstand, mit dem die Wahrscheinlichkeiten berechnet wurden (None = unbekannt).
+    """
+
+    def __init__(self, combine, max_k=DEFAULT_MAX_K):
+        df_all = combine["df_all"].sort_values("ds", kind="stable").reset_index(drop=True)
+        self.df_all = df_all
+        self.data_version = combine["data_version"]
+        self.model_version = combine.get("model_version")
+
+        # Gespeicherter Top-K-Speicher nur, wenn er mindestens max_k Zeilen pro Woche hält
+        weekly_topk = combine.get("weekly_topk")
+        if not weekly_topk or weekly_topk.get("k", DEFAULT_MAX_K) < max_k:
+            weekly_topk = build_weekly_topk(df_all, k=max_k)
+        self.weekly_topk = weekly_topk
+        self.max_k = max_k
+        self.track_index = TrackIndex(df_all)
+        self.columns = [c for c in RESPONSE_COLUMNS if c in df_all.columns]
+
+        ds = df_all["ds"].to_numpy()
+        starts = np.flatnonzero(np.r_[True, ds[1:] != ds[:-1]]) if len(ds) else np.array([], dtype=int)
+        stops = np.r_[starts[1:], len(ds)].astype(int)
+        self.week_ranges = {
+            pd.Timestamp(ds[start]).strftime("%Y-%m-%d"): (int(start), int(stop))
+            for start, stop in zip(starts, stops)
+        }
+
+    def week_frame(self, week, region=None):
+        if week not in self.week_ranges:
+            raise KeyError(f"Unbekannte Woche: {week}")
+        start, stop = self.week_ranges[week]
+        df = self.df_all.iloc[start:stop]
+        if region and "region" in df.columns:
+            df = df[df["region"] == region]
+        return df.sort_values("probability", ascending=False)[self.columns]
+
+
+    def rescored(self, preds, probs, model_version):
+        """Gleicher Datenstand mit neuen Vorhersagen (nach einem Modell-Promote)."""
+        df_all = self.df_all.copy()
+        df_all["is_rising"] = preds
+        df_all["probability"] = probs
+        return ScoringState(
+            {"df_all": df_all, "data_version": self.data_version, "model_version": model_version},
+            max_k=self.max_k
+        )
+
+
+def load_state_from_pipeline(artifact_dir=ARTIFACT_DIR, max_k=DEFAULT_MAX_K) -> ScoringState:
+    try:
+        return ScoringState(load_artifact("combine", artifact_dir), max_k=max_k)
+    except FileNotFoundError:
+        raise ValueError(
+            f"Kein gescorter Datenstand unter {artifact_dir}. Bitte zuerst `python -m src.pipeline run --week ...` ausführen."
+        )
+
+
+# ____ SERVICE ____
+class ScoringService:
+    """Hält Modelle und Datenstand warm und beantwortet die Endpunkte (ohne HTTP-Schicht)."""
+
+    def __init__(self, state, score_fn=None, model_dir=MODEL_DIR):
+        # Mit dem Standard-Scorer sind die Feature-Spalten bekannt (numerisch geprüft in score_rows)
+        self.uses_model_features = score_fn is None
+        if score_fn is None:
+            from .predict_pipeline import load_artefacts, score_frame
+
+            load_artefacts(model_dir)
+            score_fn = lambda df: score_frame(df, model_dir=model_dir)
+
+        self._state = state
+        self._state_lock = threading.Lock()
+        self.model_dir = model_dir
+        self.batcher = ScoreBatcher(score_fn)
+        self.cache = ResponseCache()
+
+    @property
+    def model_version(self):
+        # Pro Anfrage bestimmt: nach promote/update gelten alte Cache-Einträge nicht mehr
+        return model_version(self.model_dir)
+
+    @property
+    def state(self):
+        """
+        Datenstand passend zum aktuellen Modell: nach einem Promote werden die gespeicherten
+        Wahrscheinlichkeiten einmal mit dem neuen Modell neu berechnet (ein Batch-Aufruf).
+        """
+        version = self.model_version
+        with self._state_lock:
+            if self._state.model_version != version:
+                print(f"Modell {version}: Datenstand wird neu gescort …")
+                preds, probs = self.batcher.score(self._state.df_all)
+                self._state = self._state.rescored(preds, probs, version)
+                self.cache.clear()
+            return self._state
+
+    def _key(self, endpoint, params):
+        state = self.state
+        return (state.data_version, state.model_version, endpoint, tuple(sorted(params.items())))
+
+    # Endpunkte liefern fertige JSON-Bytes
+    def health(self, params):
+        body = {
+            "data_version": self.state.data_version,
+            "model_version": self.model_version,
+            "rows": len(self.state.df_all),
+            "weeks": len(self.state.week_ranges),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+        }
+        return json.dumps(body).encode()
+
+    def weeks(self, params):
+        return self.cache.get_or_compute(
+            self._key("weeks", params),
+            lambda: json.dumps(list(self.state.week_ranges)).encode()
+        )
+
+    def score_week(self, params):
+        week = params.get("week") or list(self.state.week_ranges)[-1]
+        region = params.get("region")
+        page, page_size = params.get("page", 1), params.get("page_size", DEFAULT_PAGE_SIZE)
+        return self.cache.get_or_compute(
+            self._key("score_week", {**params, "week": week}),
+            lambda: paginate(self.state.week_frame(week, region), page, page_size).encode()
+        )
+
+    def score_horizon(self, params):
+        periods = int(params.get("periods", 12))
+        page, page_size = params.get("page", 1), params.get("page_size", DEFAULT_PAGE_SIZE)
+        horizon = self.cache.get_or_compute(
+            self._key("horizon_frame", {"periods": periods}),
+            lambda: self._build_horizon(periods)
+        )
+        return self.cache.get_or_compute(
+            self._key("score_horizon", params),
+            lambda: paginate(horizon, page, page_size).encode()
+        )
+
+    def _build_horizon(self, periods):
+        from .forecast_horizon import build_forecast_horizon
+
+        df_hist = self.state.df_all[~self.state.df_all["is_future"].astype(bool)]
+        future_df = build_forecast_horizon(df_hist, periods=periods)
+        preds, probs = self.batcher.score(future_df)
+        future_df["is_rising"] = preds
+        future_df["probability"] = probs
+        future_df["is_future"] = True
+        columns = [c for c in RESPONSE_COLUMNS if c in future_df.columns]
+        return future_df.sort_values(["ds", "probability"], ascending=[True, False])[columns]
+
+    def topk(self, params):
+        week = params.get("week")
+        k = int(params.get("k", min(10, self.state.max_k)))
+        if not 1 <= k <= self.state.max_k:
+            raise ValueError(f"'k' muss zwischen 1 und {self.state.max_k} liegen.")
+
+        def compute():
+            target = pd.Timestamp(week) if week else self.state.weekly_topk["weeks"][-1]
+            df = get_topk(self.state.weekly_topk, target, k=k)
+            if df.empty:
+                raise KeyError(f"Unbekannte Woche: {week}")
+            return _records_json(df[[c for c in self.state.columns if c in df.columns]]).encode()
+
+        return self.cache.get_or_compute(self._key("topk", params), compute)
+
+    def series(self, params):
+        artist, track = params.get("artist"), params.get("track")
+        if not artist or not track:
+            raise ValueError("Parameter 'artist' und 'track' sind erforderlich.")
+
+        def compute():
+            df = self.state.track_index.series(artist, track)
+            if df.empty:
+                raise KeyError(f"Unbekannter Song: {artist} – {track}")
+            if params.get("region") and "region" in df.columns:
+                df = df[df["region"] == params["region"]]
+            return _records_json(df).encode()
+
+        return self.cache.get_or_compute(self._key("series", params), compute)
+
+    def _numeric_columns(self, df):
+        columns = list(SCORE_REQUIRED[1:])
+        if self.uses_model_features:
+            from .predict_pipeline import load_artefacts
+
+            columns += load_artefacts(self.model_dir)[3]
+        return [c for c in dict.fromkeys(columns) if c in df.columns]
+
+    def _check_rows(self, df):
+        """
+        Ungültige Werte vorab abweisen (400): eine fehlerhafte Anfrage soll weder einen gemeinsamen
+        Batch abbrechen noch im Batch stillschweigend als NaT/0 gescort werden.
+        """
+        ds = pd.to_datetime(df["ds"], errors="coerce")
+        bad = df.index[ds.isna()].tolist()
+        if bad:
+            raise ValueError(f"Ungültiges Datum in 'ds' (Zeilen {bad[:10]}).")
+        df["ds"] = ds
+
+        for col in self._numeric_columns(df):
+            values = pd.to_numeric(df[col], errors="coerce")
+            bad = df.index[values.isna() & df[col].notna()].tolist()
+            if bad:
+                raise ValueError(f"Nicht numerischer Wert in '{col}' (Zeilen {bad[:10]}).")
+            df[col] = values
+        return df
+
+    def score_rows(self, rows):
+        """POST /score: Feature-Zeilen (Liste von Dicts) → Wahrscheinlichkeiten (nicht gecacht)."""
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("'rows' muss eine Liste von Objekten sein.")
+        df = pd.DataFrame(rows)
+        if df.empty:
+            raise ValueError("Keine Zeilen übergeben.")
+        # Vor dem Batching prüfen, damit eine fehlerhafte Anfrage keinen gemeinsamen Batch abbricht
+        missing = [c for c in SCORE_REQUIRED if c not in df.columns]
+        if missing:
+            raise ValueError(f"Fehlende Spalten: {missing}")
+        df = self._check_rows(df)
+        preds, probs = self.batcher.score(df)
+        return json.dumps({
+            "is_rising": [int(p) for p in preds],
+            "probability": [float(p) for p in probs],
+        }).encode()
+
+
+ROUTES = {
+    "/health": "health",
+    "/weeks": "weeks",
+    "/score/week": "score_week",
+    "/score/horizon": "score_horizon",
+    "/topk": "topk",
+    "/series": "series",
+}
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, status, message):
+            self._send(status, json.dumps({"error": message}, ensure_ascii=False).encode())
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            endpoint = ROUTES.get(url.path)
+            if endpoint is None:
+                return self._error(404, f"Unbekannter Endpunkt: {url.path}")
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            self._dispatch(lambda: getattr(service, endpoint)(params))
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/score":
+                return self._error(404, f"Unbekannter Endpunkt: {self.path}")
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                return self._error(400, "Ungültiges JSON.")
+            if not isinstance(payload, dict):
+                return self._error(400, "Erwartet ein JSON-Objekt mit 'rows'.")
+            self._dispatch(lambda: service.score_rows(payload.get("rows", [])))
+
+        def _dispatch(self, call):
+            try:
+                self._send(200, call())
+            except KeyError as e:
+                self._error(404, str(e.args[0]) if e.args else "Nicht gefunden.")
+            except ValueError as e:
+                self._error(400, str(e))
+
+        def log_message(self, format, *args):
+            # Zugriffe nicht auf stderr protokollieren (Latenz bei vielen kleinen Anfragen)
+            pass
+
+    return Handler
+
+
+def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    print(f"Scoring-Service läuft auf http://{host}:{port} (Datenversion {service.state.data_version}).")
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lokaler Scoring-Service (HTTP, JSON).")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--artifacts", type=Path, default=ARTIFACT_DIR,
+                        help="Verzeichnis der Pipeline-Artefakte (combine.pkl)")
+    parser.add_argument("--max-k", type=int, default=DEFAULT_MAX_K, help="Größtes K für /topk")
+    args = parser.parse_args(argv)
+
+    try:
+        state = load_state_from_pipeline(args.artifacts, max_k=args.max_k)
+    except ValueError as e:
+        print(f"Fehler: {e}")
+        return 1
+
+    server = serve(ScoringService(state), args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,275 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .features import parse_genres
+from .history_store import load_history
+from .instrumentation import new_run, stage
+from .model_registry import active_artefacts, load_registry, next_version, register_version
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+MODEL_DIR = BASE_DIR / "models"
+
+DEFAULT_TOP_GENRES = 20
+
+# Segmente mit weniger Wochen werden nicht modelliert (Prophet braucht eine Jahresperiode)
+MIN_WEEKS = 52
+
+# Neutraler Wert für Zeilen ohne eigenes Segment (Trend relativ zum Segment-Mittel)
+NEUTRAL_TREND = 1.0
+
+# Event-Kalender aus notebooks/08_modeling.ipynb
+MARKET_EVENTS = {
+    "superstar_peak": ["2024-04-25", "2025-10-09"],
+    "viral_peak": ["2024-05-23"],
+    "christmas_peak": ["2024-12-12", "2024-12-26", "2025-12-25"],
+}
+
+
+def market_holidays() -> pd.DataFrame:
+    return pd.DataFrame([
+        {"holiday": name, "ds": pd.Timestamp(day), "lower_window": -1, "upper_window": 1}
+        for name, days in MARKET_EVENTS.items() for day in days
+    ])
+
+
+# ____ TREND-PARAMETER ____
+def trend_params(model) -> dict:
+    """
+    Parameter des stückweise linearen Prophet-Trends (wie Prophet.predict_trend).
+    Damit lässt sich der Trend ohne Prophet für beliebige Daten auswerten.
+    """
+    if model.growth != "linear":
+        raise ValueError(f"Nur lineares Wachstum unterstützt, nicht {model.growth}.")
+
+    params = {
+        "k": float(np.nanmean(model.params["k"])),
+        "m": float(np.nanmean(model.params["m"])),
+        "deltas": np.nanmean(model.params["delta"], axis=0).tolist(),
+        "changepoints_t": np.asarray(model.changepoints_t).tolist(),
+        "start": model.start.isoformat(),
+        "t_scale_seconds": model.t_scale.total_seconds(),
+        "y_scale": float(model.y_scale),
+        "floor": float(model.y_min) if model.scaling == "minmax" else 0.0,
+    }
+    # Mittleres Trendniveau im Trainingszeitraum → Trend relativ vergleichbar zwischen Segmenten
+    params["norm"] = float(np.mean(evaluate_trend(params, model.history["ds"].to_numpy(), relative=False)))
+    return params
+
+
+def evaluate_trend(params, ds, relative=True) -> np.ndarray:
+    """
+    Vektorisierte Auswertung des Trends für ein Array von Daten:
+    k_t = k + Σ δ_j [t ≥ s_j],  m_t = m − Σ s_j δ_j [t ≥ s_j],  trend = (k_t · t + m_t) · y_scale + floor.
+    `relative=True` teilt durch das mittlere Trendniveau des Segments.
+    """
+    ds = pd.to_datetime(np.asarray(ds))
+    t = ((ds - pd.Timestamp(params["start"])).total_seconds() / params["t_scale_seconds"]).to_numpy()
+    changepoints = np.asarray(params["changepoints_t"])
+    deltas_t = (changepoints[None, :] <= t[:, None]) * np.asarray(params["deltas"])
+    k_t = params["k"] + deltas_t.sum(axis=1)
+    m_t = params["m"] + (deltas_t * -changepoints).sum(axis=1)
+    trend = (k_t * t + m_t) * params["y_scale"] + params["floor"]
+    return trend / params["norm"] if relative else trend
+
+
+# ____ SEGMENTE ____
+def _genre_rows(df) -> pd.DataFrame:
+    """Eine Zeile pro (Zeile, Genre) – Index bleibt der Zeilenindex von df."""
+    genres = df["artist_genres"]
+    if not genres.map(lambda v: isinstance(v, list)).all():
+        genres = parse_genres(genres)
+    return genres.explode().rename("genre").to_frame()
+
+
+def top_genres(df, n=DEFAULT_TOP_GENRES) -> list:
+    """Genres mit den meisten Streams über die ganze Historie ('unknown' ausgenommen)."""
+    rows = _genre_rows(df).join(df["streams"])
+    totals = rows[rows["genre"] != "unknown"].groupby("genre")["streams"].sum()
+    return totals.nlargest(n).index.tolist()
+
+
+def segment_series(df, genres, period="chart_week") -> dict:
+    """
+    Wöchentliche Streams pro Segment: {"genre:pop": DataFrame(ds, y), "region:de": ...}.
+    Regionen nur, wenn die Historie mehrere enthält.
+    """
+    df = df.assign(ds=pd.to_datetime(df[period]))
+    series = {}
+
+    rows = _genre_rows(df).join(df[["ds", "streams"]])
+    rows = rows[rows["genre"].isin(genres)]
+    for genre, part in rows.groupby("genre"):
+        series[f"genre:{genre}"] = part.groupby("ds", as_index=False)["streams"].sum().rename(columns={"streams": "y"})
+
+    if "region" in df.columns and df["region"].nunique() > 1:
+        for region, part in df.groupby("region", observed=True):
+            series[f"region:{region}"] = part.groupby("ds", as_index=False)["streams"].sum().rename(columns={"streams": "y"})
+
+    return {key: s for key, s in series.items() if len(s) >= MIN_WEEKS}
+
+
+def _fit_segment(key, series, holidays):
+    """Ein Prophet-Modell pro Segment (läuft im Worker-Prozess)."""
+    import logging
+
+    from prophet import Prophet
+    from prophet.serialize import model_to_json
+
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+
+    t0 = time.perf_counter()
+    model = Prophet(
+        holidays=holidays,
+        seasonality_mode="multiplicative",
+        yearly_seasonality=True,
+        weekly_seasonality=False
+    )
+    model.fit(series)
+    fitted = model.predict(series[["ds"]])
+    mape = float(np.mean(np.abs(fitted["yhat"].to_numpy() - series["y"].to_numpy()) / series["y"].to_numpy()))
+
+    return key, {
+        "trend": trend_params(model),
+        "model": model_to_json(model),
+        "weeks": len(series),
+        "mape": mape,
+        "seconds": round(time.perf_counter() - t0, 2),
+    }
+
+
+def fit_segment_trends(df, n_genres=DEFAULT_TOP_GENRES, workers=None) -> dict:
+    """Alle Segmentmodelle parallel fitten (ein Prozess pro Modell, cmdstan ist CPU-gebunden)."""
+    genres = top_genres(df, n_genres)
+    series = segment_series(df, genres)
+    if not series:
+        raise ValueError(f"Kein Segment hat mindestens {MIN_WEEKS} Wochen Historie.")
+
+    holidays = market_holidays()
+    workers = workers or os.cpu_count() or 1
+    with stage("segments.fit", rows=len(series), workers=workers):
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_fit_segment, key, s, holidays) for key, s in series.items()]
+            segments = dict(f.result() for f in futures)
+
+    return {"genres": genres, "segments": segments}
+
+
+# ____ SCORING ____
+def load_segment_trends(path) -> dict:
+    """Nur die Trend-Parameter (die serialisierten Prophet-Modelle werden zum Scoren nicht gebraucht)."""
+    with open(path, "r") as f:
+        payload = json.load(f)
+    return {key: seg["trend"] for key, seg in payload["segments"].items()}
+
+
+def segment_trend(df, trends) -> np.ndarray:
+    """
+    Trend des eigenen Segments pro Zeile (relativ zum Segment-Mittel):
+    1. erstes Genre des Tracks mit eigenem Modell, sonst
+    2. Region mit eigenem Modell, sonst
+    3. NEUTRAL_TREND.
+    Ausgewertet wird einmal pro (Segment, Woche), nicht pro Zeile.
+    """
+    result = np.full(len(df), NEUTRAL_TREND)
+    if not trends or df.empty:
+        return result
+
+    df = df.reset_index(drop=True)
+    segment = pd.Series(None, index=df.index, dtype=object)
+
+    if "region" in df.columns:
+        region_key = "region:" + df["region"].astype(str)
+        segment = region_key.where(region_key.isin(trends.keys()))
+
+    if "artist_genres" in df.columns:
+        genre_key = "genre:" + _genre_rows(df)["genre"].astype(str)
+        primary = genre_key[genre_key.isin(trends.keys())].groupby(level=0).first()
+        segment.loc[primary.index] = primary
+
+    ds = pd.to_datetime(df["ds"])
+    for key, idx in segment.dropna().groupby(segment.dropna()).groups.items():
+        weeks = ds.loc[idx]
+        unique = weeks.unique()
+        values = pd.Series(evaluate_trend(trends[key], unique), index=unique)
+        result[idx.to_numpy()] = weeks.map(values).to_numpy()
+    return result
+
+
+# ____ CLI ____
+def build_segment_version(history_path, n_genres=DEFAULT_TOP_GENRES, workers=None, model_dir=MODEL_DIR, promote=False):
+    """
+    Fittet die Segmentmodelle und legt eine neue Registry-Version an
+    (Artefakte der aktiven Version + segment_trends_<version>.json).
+    """
+    started = time.perf_counter()
+    new_run("segments")
+    model_dir = Path(model_dir)
+
+    df = load_history(history_path)
+    payload = fit_segment_trends(df, n_genres, workers)
+
+    registry = load_registry(model_dir)
+    version = next_version(registry)
+    filename = f"segment_trends_{version}.json"
+    payload["created_at"] = datetime.now().isoformat(timespec="seconds")
+    with open(model_dir / filename, "w") as f:
+        json.dump(payload, f)
+
+    artefacts = {key: path.name for key, path in active_artefacts(model_dir).items()}
+    artefacts["segment_trends"] = filename
+    parent_entry = registry["versions"][registry["active"]]
+
+    segments = payload["segments"]
+    register_version(
+        version, artefacts,
+        metrics={"segments": {key: {"mape": seg["mape"], "weeks": seg["weeks"]} for key, seg in segments.items()}},
+        promote=promote, model_dir=model_dir,
+        kind="segment_trends",
+        parent=registry["active"],
+        threshold=parent_entry.get("threshold"),
+        data={**parent_entry.get("data", {}), "segment_history": Path(history_path).name},
+        params=parent_entry.get("params", {}),
+        seconds=round(time.perf_counter() - started, 2),
+    )
+    print(
+        f"Version {version}: {len(segments)} Segmentmodelle "
+        f"({sum(k.startswith('genre:') for k in segments)} Genres, "
+        f"{sum(k.startswith('region:') for k in segments)} Regionen) in {time.perf_counter() - started:.1f} s"
+    )
+    return version, payload
+
+
+def main(argv=None):
+    from .train import default_history_path
+
+    parser = argparse.ArgumentParser(
+        description="Prophet-Trendmodelle pro Top-Genre und Region (parallel gefittet)."
+    )
+    parser.add_argument("--history", type=Path, help="Historie (Standard: hist_data_updated.csv)")
+    parser.add_argument("--genres", type=int, default=DEFAULT_TOP_GENRES, help="Anzahl Top-Genres")
+    parser.add_argument("--workers", type=int, help="Prozesse (Standard: alle Kerne)")
+    parser.add_argument("--promote", action="store_true", help="Neue Version sofort aktivieren")
+    args = parser.parse_args(argv)
+
+    try:
+        build_segment_version(
+            args.history or default_history_path(), n_genres=args.genres,
+            workers=args.workers, promote=args.promote
+        )
+    except ValueError as e:
+        print(f"Fehler: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
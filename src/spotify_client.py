@@ -5,6 +5,7 @@ from tqdm import tqdm
 from dotenv import load_dotenv
 from pathlib import Path
 
+from .instrumentation import stage
 from .spotify_utils import (
     refresh_access_token,
     get_spotify_ids,
@@ -67,13 +68,14 @@ class SpotifyClient:
         tqdm.pandas()
         print("Starte Suche nach Spotify IDs...")
 
-        ids = df.progress_apply(
-            lambda row: get_spotify_ids(
-                row["track_name"],
-                row["artist_names"],
-                self.access_token
-            ), axis=1
-        )
+        with stage("spotify.map_ids", rows=len(df)):
+            ids = df.progress_apply(
+                lambda row: get_spotify_ids(
+                    row["track_name"],
+                    row["artist_names"],
+                    self.access_token
+                ), axis=1
+            )
         df[["track_id","artist_id"]] = pd.DataFrame(ids.tolist(), index=df.index)
 
         df.to_csv(output_csv, index=False)
@@ -89,8 +91,18 @@ class SpotifyClient:
         df_ids = pd.read_csv(input_csv).dropna(subset=["track_id","artist_id"])
 
         print(f"Starte Enrichment für {len(df_ids)} Tracks...")
-        all_enriched_data = []
+        with stage("spotify.enrich", rows=len(df_ids)):
+            all_enriched_data = self._enrich_batches(df_ids, batch_size, sleep_time)
+
+        df_final = pd.DataFrame(all_enriched_data)
+        df_final.to_csv(output_csv, index=False)
+
+        print(f"Fertig! {len(df_final)} Tracks angereichert.")
+        return df_final
 
+    def _enrich_batches(self, df_ids, batch_size, sleep_time):
+        """Track- und Artist-Batches abrufen und zu Zeilen zusammenführen."""
+        all_enriched_data = []
         for i in tqdm(range(0, len(df_ids), batch_size)):
             batch = df_ids.iloc[i:i + batch_size] 
             
@@ -129,11 +141,7 @@ class SpotifyClient:
 
             time.sleep(sleep_time)
 
-        df_final = pd.DataFrame(all_enriched_data)
-        df_final.to_csv(output_csv, index=False)
-
-        print(f"Fertig! {len(df_final)} Tracks angereichert.")
-        return df_final
+        return all_enriched_data
     
     # ____ KOMPLETTER WORKFLOW ____
     def run_full_pipeline(
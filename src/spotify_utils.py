@@ -4,6 +4,17 @@ import time
 import pandas as pd 
 from pprint import pprint
 
+from .instrumentation import stage
+
+
+def _request(method, url, endpoint, **kwargs):
+    """HTTP-Aufruf mit Messung (Dauer, Status, Antwortgröße) pro Spotify-Endpunkt."""
+    with stage(f"spotify.{endpoint}", kind="http") as record:
+        response = requests.request(method, url, **kwargs)
+        record["status"] = response.status_code
+        record["bytes"] = len(response.content)
+    return response
+
 def refresh_access_token(refresh_token, client_id, client_secret):
     """Diese Funktion sendet einen POST-Request an `/api/token` 
     und liefert den aktualisierten Access Token für die App.
@@ -31,7 +42,7 @@ def refresh_access_token(refresh_token, client_id, client_secret):
         "refresh_token": refresh_token
     }
     
-    response = requests.post(auth_url, headers=headers, data=data)
+    response = _request("POST", auth_url, "token", headers=headers, data=data)
     
     if response.status_code == 200:
         return response.json().get("access_token")
@@ -54,7 +65,7 @@ def get_spotify_ids(track_name, artist_name, token):
     }
     
     try:
-        res = requests.get(search_url, headers=headers, params=params)
+        res = _request("GET", search_url, "search", headers=headers, params=params)
         if res.status_code == 200:
             items = res.json().get('tracks', {}).get('items', [])
             if items:
@@ -73,7 +84,7 @@ def get_artists_batch(id_list, token):
     # requests.get baut mit 'params' automatisch das richtige ?ids=ID1,ID2 Format
     params = {"ids": ",".join(id_list)}
     
-    response = requests.get(url, headers=headers, params=params)
+    response = _request("GET", url, "artists", headers=headers, params=params)
     if response.status_code == 200:
         return response.json().get('artists', [])
     else:
@@ -86,7 +97,7 @@ def get_tracks_batch(id_list, token):
     headers = {"Authorization": f"Bearer {token}"}
     params = {"ids": ",".join(id_list)}
     
-    response = requests.get(url, headers=headers, params=params)
+    response = _request("GET", url, "tracks", headers=headers, params=params)
     if response.status_code == 200:
         return response.json().get('tracks', [])
     else:
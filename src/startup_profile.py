@@ -0,0 +1,160 @@
+import argparse
+import ast
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+
+# Dashboard-Skripte, deren Top-Level-Importe den Kaltstart bestimmen
+PAGE_FILES = [BASE_DIR / "Home.py", *sorted((BASE_DIR / "pages").glob("*.py"))]
+
+# Module, die beim Kaltstart NICHT geladen sein dürfen
+HEAVY_MODULES = ["prophet", "lightgbm", "google.genai", "tqdm", "scipy"]
+
+# Kaltstart-Budget in Sekunden
+DEFAULT_BUDGET_S = 4.0
+
+
+# ____ IMPORT-PROFIL ____
+def page_imports(paths=PAGE_FILES) -> list:
+    """
+    Module, die die Seiten auf Modul-Top-Level importieren (per AST, ohne die Seiten auszuführen).
+    Importe in Funktionen oder Bedingungen (z. B. nach einem Upload) zählen nicht zum Kaltstart.
+    """
+    modules = []
+    for path in paths:
+        for node in ast.parse(Path(path).read_text(encoding="utf-8")).body:
+            if isinstance(node, ast.Import):
+                modules += [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0:
+                modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+# Bei jedem Lauf aus den Seiten abgeleitet → bleibt aktuell, wenn Seiten neue Module importieren
+PAGE_IMPORTS = page_imports()
+
+
+def _run_python(code: str, importtime: bool = False):
+    """Startet einen frischen Interpreter im Projektverzeichnis (kein Modul-Cache)."""
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", code]
+    return subprocess.run(cmd, cwd=BASE_DIR, capture_output=True, text=True)
+
+
+def profile_imports(modules=PAGE_IMPORTS, top=15):
+    """
+    Erstellt ein Import-Profil über `python -X importtime`.
+    Gibt die `top` teuersten Top-Level-Pakete (kumulativ, in Sekunden) zurück.
+    """
+    code = "\n".join(f"import {m}" for m in modules)
+    result = _run_python(code, importtime=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Import fehlgeschlagen:\n{result.stderr[-2000:]}")
+
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # Format: "import time: <self> | <cumulative> | <paket>"
+        _, cumulative_us, name = line.split("|")
+        # Nur Top-Level-Einträge (ohne Einrückung) zählen, sonst doppelt
+        if name.startswith("  "):
+            continue
+        name = name.strip()
+        packages[name] = packages.get(name, 0) + int(cumulative_us) / 1e6
+
+    ranking = sorted(packages.items(), key=lambda kv: kv[1], reverse=True)
+    return [{"module": name, "seconds": round(sec, 4)} for name, sec in ranking[:top]]
+
+
+def measure_cold_start(modules=PAGE_IMPORTS, repeats=3):
+    """
+    Misst die Import-Zeit der Seiten-Module in frischen Prozessen (Minimum aus
+    `repeats` Läufen) und prüft, welche schweren Module dabei mitgeladen werden.
+    """
+    code = (
+        "import sys, time\n"
+        "t0 = time.perf_counter()\n"
+        + "\n".join(f"import {m}" for m in modules)
+        + "\nprint(time.perf_counter() - t0)\n"
+        + f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+
+    timings = []
+    loaded_heavy = []
+    for _ in range(repeats):
+        result = _run_python(code)
+        if result.returncode != 0:
+            raise RuntimeError(f"Import fehlgeschlagen:\n{result.stderr[-2000:]}")
+        lines = result.stdout.splitlines()
+        timings.append(float(lines[-2]))
+        loaded_heavy = [m for m in lines[-1].split(",") if m]
+
+    return {
+        "seconds": round(min(timings), 4),
+        "runs": [round(t, 4) for t in timings],
+        "heavy_modules_loaded": loaded_heavy,
+    }
+
+
+# ____ BUDGET-CHECK ____
+def check_budget(budget_s=DEFAULT_BUDGET_S, modules=PAGE_IMPORTS, repeats=3, top=15):
+    """Kombiniert Import-Profil und Kaltstart-Messung zu einem Bericht."""
+    cold = measure_cold_start(modules, repeats=repeats)
+    report = {
+        "budget_seconds": budget_s,
+        "cold_start": cold,
+        "top_imports": profile_imports(modules, top=top),
+        "within_budget": cold["seconds"] <= budget_s and not cold["heavy_modules_loaded"],
+    }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Import-Profil und Kaltstart-Budget für das Dashboard."
+    )
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_S,
+                        help="Maximale Import-Zeit in Sekunden.")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", type=Path, default=None,
+                        help="Optional: Bericht als JSON speichern.")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    report = check_budget(args.budget, repeats=args.repeats, top=args.top)
+
+    print(f"Kaltstart (Minimum aus {args.repeats} Läufen): "
+          f"{report['cold_start']['seconds']:.3f} s (Budget: {args.budget:.2f} s)")
+    print("Teuerste Importe:")
+    for entry in report["top_imports"]:
+        print(f"  {entry['seconds']:8.3f} s  {entry['module']}")
+
+    if report["cold_start"]["heavy_modules_loaded"]:
+        print(f"Schwere Module beim Kaltstart geladen: "
+              f"{report['cold_start']['heavy_modules_loaded']}")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"Bericht gespeichert unter: {args.output}")
+
+    print(f"Profil erstellt in {time.perf_counter() - started:.1f} s.")
+
+    if not report["within_budget"]:
+        print("Kaltstart-Budget überschritten!")
+        return 1
+
+    print("Kaltstart innerhalb des Budgets.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
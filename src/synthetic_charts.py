@@ -0,0 +1,182 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Genres für synthetische Künstler (Format wie nach dem Enrichment: "a|b|c")
+SYNTHETIC_GENRES = [
+    "pop", "dance pop", "k-pop", "j-pop", "latin pop", "reggaeton", "trap latino",
+    "urbano latino", "hip hop", "rap", "trap", "drill", "uk drill", "r&b",
+    "alternative r&b", "afrobeats", "amapiano", "house", "edm", "techno",
+    "indie", "indie pop", "alternative rock", "rock", "metal", "country",
+    "sertanejo", "piseiro", "corrido", "corridos tumbados", "soul", "funk",
+    "bossa nova", "christmas", "soundtrack", "singer-songwriter", "bedroom pop",
+    "german hip hop", "schlager", "french pop",
+]
+
+REGIONS = ["global", "de", "us", "gb", "br", "mx", "jp", "kr", "fr", "es", "it", "nl"]
+
+
+# ____ STAMMDATEN ____
+def _track_pool(n_tracks, n_artists, rng):
+    """Songs mit 1–4 Künstler-Credits (Hauptkünstler + Features, ~25 % Kollaborationen)."""
+    artists = np.array([f"Artist {i:05d}" for i in range(n_artists)], dtype=object)
+
+    # Beliebte Künstler haben mehr Songs (Zipf-artige Verteilung)
+    weights = 1.0 / np.arange(1, n_artists + 1) ** 0.8
+    primary = rng.choice(n_artists, size=n_tracks, p=weights / weights.sum())
+    n_features = np.minimum(rng.geometric(0.75, size=n_tracks) - 1, 3)
+
+    credits = []
+    for main, extra in zip(primary, n_features):
+        names = [artists[main]]
+        if extra:
+            names += list(artists[rng.choice(n_artists, size=extra, replace=False)])
+        credits.append(", ".join(dict.fromkeys(names)))
+
+    return pd.DataFrame({
+        "track_id": [f"syn{i:019d}" for i in range(n_tracks)],
+        "track_name": [f"Song {i:06d}" for i in range(n_tracks)],
+        "artist_names": credits,
+        "artist_index": primary,
+        "source": [f"Label {i % 97:02d}" for i in range(n_tracks)],
+    })
+
+
+def _artist_meta(n_artists, rng):
+    genre_count = rng.integers(0, 4, size=n_artists)
+    genres = [
+        "|".join(rng.choice(SYNTHETIC_GENRES, size=k, replace=False)) if k else "unknown"
+        for k in genre_count
+    ]
+    return pd.DataFrame({
+        "artist_id": [f"syn_artist{i:012d}" for i in range(n_artists)],
+        "artist_genres": genres,
+        "artist_followers": np.round(rng.lognormal(13, 1.8, size=n_artists)),
+        "artist_popularity": rng.integers(30, 100, size=n_artists).astype(float),
+    })
+
+
+# ____ CHARTS ____
+def generate_charts(
+    n_weeks=52,
+    n_regions=1,
+    chart_size=200,
+    start="2024-01-04",
+    churn=0.08,
+    zipf_s=0.9,
+    seed=0
+):
+    """
+    Erzeugt realistische Wochencharts für n_weeks × n_regions.
+    - Streams folgen einem Zipf-Gesetz über den Rang (plus Rauschen)
+    - Pro Woche fallen ~`churn` der Songs heraus (bevorzugt untere Ränge), neue rücken nach
+    - Mehrfach-Credits ("A, B") und Genre-Listen wie in den echten Daten
+    Rückgabe: (charts, enriched) – Charts im Format nach prepare_unique_tracks,
+    enriched im Format von SpotifyClient.enrich_tracks.
+    """
+    if n_regions > len(REGIONS):
+        raise ValueError(f"Maximal {len(REGIONS)} Regionen verfügbar.")
+
+    rng = np.random.default_rng(seed)
+    n_tracks = int(chart_size * (2 + churn * n_weeks) * max(1, n_regions * 0.6))
+    n_artists = max(50, n_tracks // 3)
+
+    pool = _track_pool(n_tracks, n_artists, rng)
+    weeks = pd.date_range(start=start, periods=n_weeks, freq="7D")
+    regions = REGIONS[:n_regions]
+
+    # Popularität pro Song: bestimmt, wer neu in die Charts kommt und wie gut er läuft
+    appeal = rng.lognormal(0, 1, size=n_tracks)
+    base = chart_size ** zipf_s * 2.0e5
+
+    frames = []
+    for r, region in enumerate(regions):
+        scale = 1.0 if region == "global" else rng.uniform(0.02, 0.25)
+        current = rng.choice(n_tracks, size=chart_size, replace=False, p=appeal / appeal.sum())
+        prev_rank = np.full(n_tracks, -1, dtype=np.int32)
+        peak = np.full(n_tracks, np.iinfo(np.int32).max, dtype=np.int32)
+        weeks_on = np.zeros(n_tracks, dtype=np.int32)
+
+        for w, week in enumerate(weeks):
+            if w:
+                # Churn: untere Ränge fallen eher heraus
+                n_out = rng.binomial(chart_size, churn)
+                drop_p = np.linspace(0.2, 1.8, chart_size)
+                out = rng.choice(chart_size, size=n_out, replace=False, p=drop_p / drop_p.sum())
+                keep = np.delete(current, out)
+                candidates = np.setdiff1d(np.arange(n_tracks), keep)
+                cand_p = appeal[candidates] / appeal[candidates].sum()
+                fresh = rng.choice(candidates, size=chart_size - len(keep), replace=False, p=cand_p)
+                current = np.r_[keep, fresh]
+
+            # Streams: Zipf über Position + Song-Appeal + Rauschen, dann neu ranken
+            score = appeal[current] * rng.lognormal(0, 0.15, size=chart_size)
+            order = np.argsort(-score, kind="stable")
+            current = current[order]
+            ranks = np.arange(1, chart_size + 1, dtype=np.int32)
+            streams = (base * scale * ranks ** -zipf_s * rng.lognormal(0, 0.05, size=chart_size)).astype(np.int64)
+            streams = np.sort(streams)[::-1]
+
+            weeks_on[current] += 1
+            peak[current] = np.minimum(peak[current], ranks)
+
+            frames.append(pd.DataFrame({
+                "chart_week": week,
+                "region": region,
+                "rank": ranks,
+                "uri": "spotify:track:" + pool["track_id"].to_numpy()[current],
+                "artist_names": pool["artist_names"].to_numpy()[current],
+                "track_name": pool["track_name"].to_numpy()[current],
+                "source": pool["source"].to_numpy()[current],
+                "peak_rank": peak[current],
+                "previous_rank": prev_rank[current],
+                "weeks_on_chart": weeks_on[current],
+                "streams": streams,
+            }))
+
+            prev_rank[:] = -1
+            prev_rank[current] = ranks
+
+    charts = pd.concat(frames, ignore_index=True)
+
+    artists = _artist_meta(n_artists, rng)
+    enriched = pd.DataFrame({
+        "track_id": pool["track_id"],
+        "track_name": pool["track_name"],
+        "artist_id": artists["artist_id"].to_numpy()[pool["artist_index"]],
+        "release_date": (
+            pd.Timestamp(start) - pd.to_timedelta(rng.integers(0, 3650, size=n_tracks), unit="D")
+        ).strftime("%Y-%m-%d"),
+        "explicit": rng.random(n_tracks) < 0.3,
+        "track_popularity": rng.integers(20, 100, size=n_tracks).astype(float),
+    })
+    enriched = pd.concat(
+        [enriched, artists.drop(columns="artist_id").iloc[pool["artist_index"]].reset_index(drop=True)],
+        axis=1
+    )
+    return charts, enriched
+
+
+def to_history(charts, enriched):
+    """Flache Historie wie hist_data_updated.csv (Charts + Metadaten, track_id statt uri)."""
+    df = charts.copy()
+    df["track_id"] = df["uri"].str.replace("spotify:track:", "", regex=False)
+    df = df.drop(columns=["uri"]).merge(
+        enriched.drop(columns=["track_name"]), on="track_id", how="left"
+    )
+    df["chart_week"] = df["chart_week"].dt.strftime("%Y-%m-%d")
+    return df
+
+
+def write_raw_week(charts, week, raw_dir) -> list:
+    """Schreibt eine Woche im Download-Format von charts.spotify.com (eine Datei pro Region)."""
+    raw_dir = Path(raw_dir)
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    week = pd.Timestamp(week)
+    paths = []
+    for region, part in charts[charts["chart_week"] == week].groupby("region"):
+        path = raw_dir / f"regional-{region}-weekly-{week:%Y-%m-%d}.csv"
+        part.drop(columns=["chart_week", "region"]).to_csv(path, index=False)
+        paths.append(path)
+    return paths
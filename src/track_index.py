@@ -0,0 +1,107 @@
+import bisect
+import difflib
+
+import numpy as np
+import streamlit as st
+
+# Spalten, die für die Song-Zeitreihe benötigt werden
+SERIES_COLUMNS = ["ds", "region", "probability", "is_future", "row_id"]
+
+
+class TrackIndex:
+    """
+    Index Künstler → Songs → Zeilenbereich.
+    1. Frame einmalig nach (artist_names, track_name, [region,] ds) sortieren
+    2. Jede Zeitreihe liegt zusammenhängend im Frame (start, stop)
+    3. Selectbox-Optionen und Zeitreihen kosten nur noch O(Ergebnisgröße)
+    4. Präfix-Suche (bisect) und unscharfe Suche (difflib) über Songtitel
+    """
+
+    def __init__(self, df, columns=SERIES_COLUMNS):
+        keys = ["artist_names", "track_name"]
+        cols = keys + [c for c in columns if c in df.columns and c not in keys]
+
+        frame = df.dropna(subset=keys)[cols]
+        order = keys + [c for c in ["region"] if c in frame.columns] + ["ds"]
+        frame = frame.sort_values(order, kind="stable").reset_index(drop=True)
+        self.frame = frame
+
+        # Grenzen der (Künstler, Song)-Blöcke bestimmen
+        artists = frame["artist_names"].to_numpy()
+        tracks = frame["track_name"].to_numpy()
+        n = len(frame)
+        if n:
+            changed = np.r_[True, (artists[1:] != artists[:-1]) | (tracks[1:] != tracks[:-1])]
+            starts = np.flatnonzero(changed)
+        else:
+            starts = np.array([], dtype=int)
+        stops = np.r_[starts[1:], n].astype(int)
+
+        self.ranges = {}
+        self._artist_tracks = {}
+        for start, stop in zip(starts, stops):
+            artist, track = artists[start], tracks[start]
+            self.ranges[(artist, track)] = (int(start), int(stop))
+            self._artist_tracks.setdefault(artist, []).append(track)
+
+        self.artists = list(self._artist_tracks)
+
+        # Sortierte Suchschlüssel: (titel_lower, künstler, titel)
+        self._search_keys = sorted(
+            (str(track).lower(), artist, track) for artist, track in self.ranges
+        )
+        self._search_titles = [key[0] for key in self._search_keys]
+
+    # ____ ABFRAGEN ____
+    def tracks(self, artist):
+        """Songs eines Künstlers (bereits sortiert)."""
+        return self._artist_tracks.get(artist, [])
+
+    def series(self, artist, track):
+        """Zeitreihe eines Songs, nach 'ds' sortiert (Slice ohne Filter-Scan)."""
+        start, stop = self.ranges.get((artist, track), (0, 0))
+        return self.frame.iloc[start:stop]
+
+    def search(self, query, limit=25, fuzzy_cutoff=0.6):
+        """
+        Sucht Songs per Präfix (bisect) und füllt mit unscharfen Treffern auf.
+        Gibt eine Liste von (künstler, song)-Tupeln zurück.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        results = []
+        pos = bisect.bisect_left(self._search_titles, query)
+        while (
+            pos < len(self._search_titles)
+            and self._search_titles[pos].startswith(query)
+            and len(results) < limit
+        ):
+            _, artist, track = self._search_keys[pos]
+            results.append((artist, track))
+            pos += 1
+
+        if len(results) < limit:
+            seen = set(results)
+            close = difflib.get_close_matches(
+                query, self._search_titles, n=limit, cutoff=fuzzy_cutoff
+            )
+            for title in dict.fromkeys(close):
+                pos = bisect.bisect_left(self._search_titles, title)
+                while pos < len(self._search_titles) and self._search_titles[pos] == title:
+                    _, artist, track = self._search_keys[pos]
+                    if (artist, track) not in seen:
+                        results.append((artist, track))
+                        seen.add((artist, track))
+                    pos += 1
+                if len(results) >= limit:
+                    break
+
+        return results[:limit]
+
+
+@st.cache_resource(max_entries=4)
+def get_track_index(data_version, _df):
+    """Baut den TrackIndex einmal pro Datenversion (geteilt zwischen Sessions)."""
+    return TrackIndex(_df)
@@ -0,0 +1,573 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .features import build_features
+from .history_store import load_history
+from .instrumentation import new_run, recent_records, stage, summarize
+from .segment_trends import load_segment_trends, segment_trend
+from .model_registry import active_artefacts, load_registry, next_version, promote_version, register_version
+from .versioning import data_version
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+MODEL_DIR = BASE_DIR / "models"
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+
+# Features wie in notebooks/08_modeling.ipynb
+FEATURE_COLS = [
+    "artist_growth_rate",
+    "genre_pop_idx",
+    "seasonality_score",
+    "track_popularity",
+    "prophet_trend",
+]
+
+# Optionales Feature: Trend des eigenen Genres/der Region (src/segment_trends.py)
+SEGMENT_FEATURE = "segment_trend"
+
+# LightGBM-Parameter aus dem Notebook ('class_weight' wirkt nur in der sklearn-API
+# und wurde von lgb.train ignoriert → weggelassen, damit v1 reproduzierbar bleibt)
+BASE_PARAMS = {
+    "objective": "binary",
+    "metric": "binary_logloss",
+    "boosting_type": "gbdt",
+    "learning_rate": 0.03,
+    "num_leaves": 63,
+    "max_depth": -1,
+    "feature_fraction": 0.8,
+    "bagging_fraction": 0.8,
+    "bagging_freq": 5,
+    "min_data_in_leaf": 30,
+    "verbose": -1,
+}
+
+# Suchraum für Hyperparameter-Trials (Trial 0 sind immer die Notebook-Parameter)
+SEARCH_SPACE = {
+    "learning_rate": [0.03, 0.05, 0.1],
+    "num_leaves": [31, 63, 127],
+    "min_data_in_leaf": [30, 100],
+    "feature_fraction": [0.8, 1.0],
+}
+
+NUM_BOOST_ROUND = 2000
+EARLY_STOPPING_ROUNDS = 100
+
+# Inkrementelles Update: feste Anzahl zusätzlicher Bäume auf den neu gelabelten Wochen
+# (kein Early Stopping – die Validierungswoche bleibt allein für die Guardrails)
+UPDATE_BOOST_ROUND = 50
+
+# Guardrails: das Update darf auf der Validierungswoche höchstens so viel schlechter sein
+MAX_LOGLOSS_INCREASE = 0.01  # relativ
+MAX_AUC_DROP = 0.005         # absolut
+
+# Threshold-Kandidaten wie im Notebook
+THRESHOLDS = np.round(np.arange(0.1, 0.9, 0.01), 2)
+
+
+# ____ DATEN ____
+def make_labels(df) -> pd.Series:
+    """Rising = mehr als 15 Plätze gestiegen oder in den TOP 50 (Definition aus dem Notebook)."""
+    rank_change = df["previous_rank"] - df["rank"]
+    return ((rank_change > 15) | (df["rank"] <= 50)).astype(int)
+
+
+def default_history_path() -> Path:
+    updated = PROCESSED_DIR / "hist_data_updated.csv"
+    return updated if updated.exists() else PROCESSED_DIR / "hist_data_24-25.csv"
+
+
+def load_training_frame(history_path, model_dir=MODEL_DIR):
+    """
+    Historie → Features der Produktions-Pipeline (build_features) → Prophet-Trend → Label.
+    Der Prophet-Trend kommt aus dem Prophet-Modell der aktiven Version.
+    """
+    from prophet.serialize import model_from_json
+    from .predict_pipeline import prophet_trend
+
+    with stage("train.load_history") as rec:
+        df = load_history(history_path)
+        rec["rows"] = len(df)
+
+    with stage("train.features", rows=len(df)):
+        df = build_features.__wrapped__(df)
+        df["ds"] = pd.to_datetime(df["chart_week"], errors="coerce")
+
+    artefacts = active_artefacts(model_dir)
+    with open(artefacts["prophet"], "r") as f:
+        prophet_model = model_from_json(f.read())
+    df["prophet_trend"] = prophet_trend(df, prophet_model)
+    if "segment_trends" in artefacts:
+        df[SEGMENT_FEATURE] = segment_trend(df, load_segment_trends(artefacts["segment_trends"]))
+
+    df["is_rising"] = make_labels(df)
+    return df.sort_values("ds").reset_index(drop=True)
+
+
+# ____ FOLDS & TRIALS ____
+def time_series_folds(weeks, n_folds=4, val_weeks=4, min_train_weeks=12):
+    """
+    Expanding-Window-Folds über die sortierten Wochen.
+    Rückgabe: Liste von (train_weeks, val_weeks), älteste Validierung zuerst.
+    """
+    weeks = sorted(weeks)
+    folds = []
+    for k in range(n_folds):
+        end = len(weeks) - k * val_weeks
+        start = end - val_weeks
+        if start < min_train_weeks:
+            break
+        folds.append((weeks[:start], weeks[start:end]))
+
+    if not folds:
+        raise ValueError(
+            f"Zu wenige Wochen ({len(weeks)}) für {val_weeks} Validierungswochen "
+            f"und mindestens {min_train_weeks} Trainingswochen."
+        )
+    return folds[::-1]
+
+
+def sample_trials(n_trials=1, seed=42) -> list:
+    """Trial 0 = Notebook-Parameter, danach zufällige Kombinationen aus SEARCH_SPACE."""
+    grid = [dict(zip(SEARCH_SPACE, values)) for values in itertools.product(*SEARCH_SPACE.values())]
+    rng = np.random.default_rng(seed)
+    picks = rng.permutation(len(grid))
+
+    trials = [dict(BASE_PARAMS)]
+    for i in picks:
+        if len(trials) >= n_trials:
+            break
+        params = {**BASE_PARAMS, **grid[i]}
+        if params not in trials:
+            trials.append(params)
+    return trials
+
+
+# ____ METRIKEN ____
+def roc_auc(y, prob) -> float:
+    """ROC-AUC über Ränge (Mann-Whitney), ohne sklearn."""
+    y = np.asarray(y)
+    n_pos = y.sum()
+    n_neg = len(y) - n_pos
+    if n_pos == 0 or n_neg == 0:
+        return float("nan")
+    ranks = pd.Series(prob).rank().to_numpy()
+    return float((ranks[y == 1].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg))
+
+
+def binary_metrics(y, prob, threshold) -> dict:
+    y = np.asarray(y)
+    prob = np.asarray(prob)
+    pred = prob > threshold
+    tp = int((pred & (y == 1)).sum())
+    fp = int((pred & (y == 0)).sum())
+    fn = int((~pred & (y == 1)).sum())
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    eps = 1e-15
+    clipped = np.clip(prob, eps, 1 - eps)
+    return {
+        "precision": precision,
+        "recall": recall,
+        "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        "auc": roc_auc(y, prob),
+        "logloss": float(-np.mean(y * np.log(clipped) + (1 - y) * np.log(1 - clipped))),
+        "positive_rate": float(y.mean()),
+        "rows": int(len(y)),
+    }
+
+
+def select_threshold(y, prob, thresholds=THRESHOLDS):
+    """Threshold mit maximalem F1 für die Klasse 'rising'. Rückgabe: (threshold, f1)."""
+    y = np.asarray(y)
+    prob = np.asarray(prob)
+    scores = [binary_metrics(y, prob, t)["f1"] for t in thresholds]
+    best = int(np.argmax(scores))
+    return float(thresholds[best]), float(scores[best])
+
+
+# ____ TRAINING ____
+def fit_booster(params, X_train, y_train, X_val, y_val, num_threads=0, seed=42):
+    """Ein LightGBM-Lauf mit Early Stopping auf den Validierungsdaten."""
+    import lightgbm as lgb
+
+    params = {**params, "num_threads": num_threads, "seed": seed, "deterministic": True}
+    train_data = lgb.Dataset(X_train, label=y_train)
+    val_data = lgb.Dataset(X_val, label=y_val, reference=train_data)
+    return lgb.train(
+        params,
+        train_data,
+        num_boost_round=NUM_BOOST_ROUND,
+        valid_sets=[val_data],
+        callbacks=[lgb.early_stopping(stopping_rounds=EARLY_STOPPING_ROUNDS, verbose=False)]
+    )
+
+
+def cross_validate(df, trials, folds, workers=None, seed=42, feature_cols=FEATURE_COLS):
+    """
+    Alle (Trial, Fold)-Kombinationen parallel trainieren.
+    LightGBM gibt den GIL frei → Thread-Pool; die Kerne werden auf die Worker verteilt.
+    Rückgabe: DataFrame mit einer Zeile pro (Trial, Fold).
+    """
+    workers = workers or os.cpu_count() or 1
+    threads_per_job = max(1, (os.cpu_count() or 1) // workers)
+
+    X = df[feature_cols].fillna(0)
+    y = df["is_rising"].to_numpy()
+    ds = df["ds"].to_numpy()
+
+    def run(job):
+        trial_id, fold_id = job
+        train_weeks, val_weeks = folds[fold_id]
+        train_mask = np.isin(ds, train_weeks)
+        val_mask = np.isin(ds, val_weeks)
+        booster = fit_booster(
+            trials[trial_id], X[train_mask], y[train_mask], X[val_mask], y[val_mask],
+            num_threads=threads_per_job, seed=seed
+        )
+        prob = booster.predict(X[val_mask], num_iteration=booster.best_iteration)
+        threshold, _ = select_threshold(y[val_mask], prob)
+        return {
+            "trial": trial_id,
+            "fold": fold_id,
+            "val_start": str(pd.Timestamp(val_weeks[0]).date()),
+            "best_iteration": booster.best_iteration,
+            "threshold": threshold,
+            **binary_metrics(y[val_mask], prob, threshold),
+        }
+
+    jobs = [(t, f) for t in range(len(trials)) for f in range(len(folds))]
+    with stage("train.cross_validation", rows=len(df), jobs=len(jobs), workers=workers):
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(run, jobs))
+    return pd.DataFrame(rows)
+
+
+def _write_json(path, payload):
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2, default=str)
+
+
+def train_model(
+    history_path=None,
+    n_folds=4,
+    val_weeks=4,
+    n_trials=1,
+    workers=None,
+    seed=42,
+    model_dir=MODEL_DIR,
+    promote=False,
+    use_segment_trends=False
+):
+    """
+    Kompletter Trainingslauf:
+    1. Features aus der Historie (wie im Dashboard)
+    2. Zeitreihen-CV über n_folds × n_trials (parallel), beste Parameter nach mittlerem Logloss
+    3. Finales Modell auf allen Wochen vor Validierung und Holdout, Early Stopping + Threshold
+       auf den val_weeks Validierungswochen, Metriken auf den letzten val_weeks Wochen (Holdout)
+    4. Neue Version in models/ schreiben und in models/registry.json eintragen
+    `use_segment_trends=True` nimmt segment_trend als Feature dazu
+    (setzt Segmentmodelle in der aktiven Version voraus).
+    Rückgabe: (Version, Registry-Eintrag).
+    """
+    started = time.perf_counter()
+    run_id = new_run("train")
+    history_path = Path(history_path) if history_path else default_history_path()
+    model_dir = Path(model_dir)
+
+    df = load_training_frame(history_path, model_dir)
+    feature_cols = list(FEATURE_COLS)
+    if use_segment_trends:
+        if SEGMENT_FEATURE not in df.columns:
+            raise ValueError("Die aktive Version enthält keine Segment-Trends (python -m src.segment_trends).")
+        feature_cols.append(SEGMENT_FEATURE)
+    weeks = np.sort(df["ds"].dropna().unique())
+    if len(weeks) <= 2 * val_weeks:
+        raise ValueError(f"Zu wenige Wochen in {history_path.name}: {len(weeks)}")
+
+    # Die letzten val_weeks Wochen bleiben unberührt (Holdout, nur für die Metriken),
+    # die val_weeks davor steuern Early Stopping und Threshold des finalen Modells
+    holdout_weeks, cv_weeks = weeks[-val_weeks:], weeks[:-val_weeks]
+    stop_weeks = weeks[-2 * val_weeks:-val_weeks]
+    folds = time_series_folds(cv_weeks, n_folds=n_folds, val_weeks=val_weeks)
+    trials = sample_trials(n_trials, seed=seed)
+    print(f"{len(df):,} Zeilen, {len(weeks)} Wochen – {len(trials)} Trial(s) × {len(folds)} Fold(s)")
+
+    cv = cross_validate(df, trials, folds, workers=workers, seed=seed, feature_cols=feature_cols)
+    by_trial = cv.groupby("trial")[["logloss", "auc", "f1", "best_iteration"]].mean()
+    best_trial = int(by_trial["logloss"].idxmin())
+    params = trials[best_trial]
+    print(f"Beste Parameter (Trial {best_trial}): " + ", ".join(f"{k}={params[k]}" for k in SEARCH_SPACE))
+
+    # Finales Modell
+    X = df[feature_cols].fillna(0)
+    y = df["is_rising"].to_numpy()
+    holdout = np.isin(df["ds"].to_numpy(), holdout_weeks)
+    stop = np.isin(df["ds"].to_numpy(), stop_weeks)
+    fit = ~(holdout | stop)
+    with stage("train.final_model", rows=int(fit.sum())):
+        booster = fit_booster(params, X[fit], y[fit], X[stop], y[stop], seed=seed)
+    best_t, _ = select_threshold(y[stop], booster.predict(X[stop], num_iteration=booster.best_iteration))
+    prob = booster.predict(X[holdout], num_iteration=booster.best_iteration)
+    holdout_metrics = binary_metrics(y[holdout], prob, best_t)
+
+    # Artefakte schreiben
+    registry = load_registry(model_dir)
+    version = next_version(registry)
+    parent_artefacts = active_artefacts(model_dir)
+    artefacts = {
+        "prophet": parent_artefacts["prophet"].name,
+        "lgbm": f"rising_artist_lgbm_{version}.txt",
+        "threshold": f"rising_artist_threshold_{version}.json",
+        "features": f"rising_artist_features_{version}.json",
+        "metrics": f"rising_artist_metrics_{version}.json",
+    }
+    if "segment_trends" in parent_artefacts:
+        artefacts["segment_trends"] = parent_artefacts["segment_trends"].name
+    booster.save_model(str(model_dir / artefacts["lgbm"]), num_iteration=booster.best_iteration)
+    _write_json(model_dir / artefacts["threshold"], {"best_threshold": best_t})
+    _write_json(model_dir / artefacts["features"], feature_cols)
+
+    metrics = {
+        "holdout": holdout_metrics,
+        "cv_mean": by_trial.loc[best_trial].to_dict(),
+        "cv_folds": cv[cv["trial"] == best_trial].to_dict(orient="records"),
+        "trials": by_trial.reset_index().to_dict(orient="records"),
+    }
+    _write_json(model_dir / artefacts["metrics"], metrics)
+
+    entry_info = {
+        "kind": "full",
+        "parent": registry["active"],
+        "params": params,
+        "best_iteration": booster.best_iteration,
+        "threshold": best_t,
+        "seed": seed,
+        "data": {
+            "history": history_path.name,
+            "data_version": data_version(df),
+            "rows": len(df),
+            "first_week": str(pd.Timestamp(weeks[0]).date()),
+            # Letzte Woche, auf der das Modell trainiert wurde (update_model setzt danach an)
+            "last_week": str(pd.Timestamp(weeks[-2 * val_weeks - 1]).date()),
+            "validation_weeks": [str(pd.Timestamp(w).date()) for w in stop_weeks],
+            "holdout_weeks": [str(pd.Timestamp(w).date()) for w in holdout_weeks],
+        },
+        "seconds": round(time.perf_counter() - started, 2),
+        "timings": summarize(recent_records(run_id))[["name", "wall_ms"]].round(1).to_dict(orient="records"),
+    }
+    registry = register_version(
+        version, artefacts, metrics={"holdout": holdout_metrics, "cv_mean": metrics["cv_mean"]},
+        promote=promote, model_dir=model_dir, **entry_info
+    )
+
+    print(
+        f"Version {version} gespeichert ({entry_info['seconds']:.1f} s). "
+        f"Holdout: F1 {holdout_metrics['f1']:.3f}, AUC {holdout_metrics['auc']:.3f}, Threshold {best_t}"
+    )
+    if promote:
+        print(f"Version {version} ist jetzt aktiv.")
+    return version, registry["versions"][version]
+
+
+# ____ INKREMENTELLES UPDATE ____
+def check_guardrails(current, candidate, max_logloss_increase=MAX_LOGLOSS_INCREASE, max_auc_drop=MAX_AUC_DROP) -> dict:
+    """Vergleicht Kandidat und aktuelle Version auf denselben Validierungsdaten."""
+    logloss_ok = candidate["logloss"] <= current["logloss"] * (1 + max_logloss_increase)
+    auc_ok = np.isnan(current["auc"]) or candidate["auc"] >= current["auc"] - max_auc_drop
+    return {
+        "passed": bool(logloss_ok and auc_ok),
+        "logloss_ok": bool(logloss_ok),
+        "auc_ok": bool(auc_ok),
+        "current": current,
+        "candidate": candidate,
+    }
+
+
+def update_model(
+    history_path=None,
+    since=None,
+    val_weeks=1,
+    num_rounds=UPDATE_BOOST_ROUND,
+    seed=42,
+    model_dir=MODEL_DIR,
+    promote=True
+):
+    """
+    Setzt das Boosting der aktiven Version auf den neu gelabelten Wochen fort (init_model).
+    1. Neue Wochen = alle Wochen nach dem letzten Trainingsstand der aktiven Version (oder `since`)
+    2. num_rounds zusätzliche Bäume (feste Anzahl, ohne Early Stopping)
+    3. Die letzten val_weeks dienen nur als Validierung für die Guardrails,
+       sie werden beim nächsten Update mittrainiert
+    4. Kandidat wird als neue Version gespeichert; aktiviert nur, wenn die Guardrails bestehen
+    Der Threshold der aktiven Version wird übernommen (zu wenige Wochen für eine neue Wahl).
+    Rückgabe: (Version, Registry-Eintrag).
+    """
+    import lightgbm as lgb
+
+    started = time.perf_counter()
+    run_id = new_run("train.update")
+    history_path = Path(history_path) if history_path else default_history_path()
+    model_dir = Path(model_dir)
+
+    registry = load_registry(model_dir)
+    parent = registry["active"]
+    entry = registry["versions"][parent]
+    artefacts = active_artefacts(model_dir)
+
+    since = since or entry.get("data", {}).get("last_week")
+    if since is None:
+        raise ValueError(f"Version {parent} kennt ihren Trainingsstand nicht – bitte --since angeben.")
+
+    with open(artefacts["features"], "r") as f:
+        feature_cols = json.load(f)
+    with open(artefacts["threshold"], "r") as f:
+        threshold = json.load(f)["best_threshold"]
+    current = lgb.Booster(model_file=str(artefacts["lgbm"]))
+
+    # Features über die ganze Historie (Lags/Wachstum brauchen die Vorwochen)
+    df = load_training_frame(history_path, model_dir)
+    new_rows = df[df["ds"] > pd.Timestamp(since)]
+    weeks = np.sort(new_rows["ds"].unique())
+    if len(weeks) <= val_weeks:
+        raise ValueError(
+            f"Zu wenige neue Wochen nach {since}: {len(weeks)} (mindestens {val_weeks + 1} nötig)."
+        )
+
+    train_weeks, check_weeks = weeks[:-val_weeks], weeks[-val_weeks:]
+    X = new_rows[feature_cols].fillna(0)
+    y = new_rows["is_rising"].to_numpy()
+    val = np.isin(new_rows["ds"].to_numpy(), check_weeks)
+
+    params = {**BASE_PARAMS, **entry.get("params", {}), "seed": seed, "deterministic": True}
+    with stage("train.update", rows=int((~val).sum())):
+        train_data = lgb.Dataset(X[~val], label=y[~val])
+        booster = lgb.train(params, train_data, num_boost_round=num_rounds, init_model=current)
+
+    guardrails = check_guardrails(
+        binary_metrics(y[val], current.predict(X[val]), threshold),
+        binary_metrics(y[val], booster.predict(X[val]), threshold)
+    )
+
+    version = next_version(registry)
+    new_artefacts = {
+        "prophet": artefacts["prophet"].name,
+        "lgbm": f"rising_artist_lgbm_{version}.txt",
+        "threshold": artefacts["threshold"].name,
+        "features": artefacts["features"].name,
+    }
+    if "segment_trends" in artefacts:
+        new_artefacts["segment_trends"] = artefacts["segment_trends"].name
+    booster.save_model(str(model_dir / new_artefacts["lgbm"]))
+
+    promoted = promote and guardrails["passed"]
+    registry = register_version(
+        version, new_artefacts, metrics={"holdout": guardrails["candidate"], "guardrails": guardrails},
+        promote=promoted, model_dir=model_dir,
+        kind="incremental",
+        parent=parent,
+        params={k: v for k, v in params.items() if k not in ("seed", "deterministic")},
+        best_iteration=booster.current_iteration(),
+        threshold=threshold,
+        seed=seed,
+        data={
+            "history": history_path.name,
+            "data_version": data_version(new_rows),
+            "rows": len(new_rows),
+            "first_week": str(pd.Timestamp(weeks[0]).date()),
+            "last_week": str(pd.Timestamp(train_weeks[-1]).date()),
+            "holdout_weeks": [str(pd.Timestamp(w).date()) for w in check_weeks],
+        },
+        seconds=round(time.perf_counter() - started, 2),
+        timings=summarize(recent_records(run_id))[["name", "wall_ms"]].round(1).to_dict(orient="records"),
+    )
+
+    cur, cand = guardrails["current"], guardrails["candidate"]
+    print(
+        f"Update {version} ({len(train_weeks)} neue Woche(n), {num_rounds} neue Bäume): "
+        f"Logloss {cur['logloss']:.4f} → {cand['logloss']:.4f}, AUC {cur['auc']:.3f} → {cand['auc']:.3f}"
+    )
+    if promoted:
+        print(f"Guardrails bestanden – Version {version} ist jetzt aktiv.")
+    elif not guardrails["passed"]:
+        print(f"Guardrails nicht bestanden – {parent} bleibt aktiv.")
+    return version, registry["versions"][version]
+
+
+def format_versions(registry) -> str:
+    lines = [f"{'Version':<8} {'Art':<15} {'Erstellt':<20} {'F1':>6} {'AUC':>6}"]
+    for version, entry in registry["versions"].items():
+        holdout = entry.get("metrics", {}).get("holdout", {})
+        f1 = f"{holdout['f1']:.3f}" if "f1" in holdout else "–"
+        auc = f"{holdout['auc']:.3f}" if "auc" in holdout else "–"
+        marker = " *" if version == registry["active"] else ""
+        lines.append(
+            f"{version:<8} {entry.get('kind', 'notebook'):<15} {entry.get('created_at', '–'):<20} {f1:>6} {auc:>6}{marker}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Training des Rising-Artist-Modells (LightGBM) mit Zeitreihen-CV und Versionierung."
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train = sub.add_parser("train", help="Neues Modell trainieren und als Version speichern")
+    train.add_argument("--history", type=Path, help="Historie (Standard: hist_data_updated.csv)")
+    train.add_argument("--folds", type=int, default=4)
+    train.add_argument("--val-weeks", type=int, default=4)
+    train.add_argument("--trials", type=int, default=1, help="Anzahl Hyperparameter-Trials")
+    train.add_argument("--workers", type=int, help="Parallele Trainingsjobs (Standard: alle Kerne)")
+    train.add_argument("--seed", type=int, default=42)
+    train.add_argument("--promote", action="store_true", help="Neue Version sofort aktivieren")
+    train.add_argument("--segment-trends", action="store_true",
+                       help="segment_trend als Feature (Segmentmodelle der aktiven Version)")
+
+    update = sub.add_parser("update", help="Aktive Version mit neu gelabelten Wochen fortschreiben")
+    update.add_argument("--history", type=Path, help="Historie (Standard: hist_data_updated.csv)")
+    update.add_argument("--since", help="Letzte bereits trainierte Woche (Standard: aus der Registry)")
+    update.add_argument("--val-weeks", type=int, default=1)
+    update.add_argument("--rounds", type=int, default=UPDATE_BOOST_ROUND)
+    update.add_argument("--seed", type=int, default=42)
+    update.add_argument("--no-promote", action="store_true", help="Nur speichern, nicht aktivieren")
+
+    sub.add_parser("list", help="Alle Modellversionen anzeigen (* = aktiv)")
+
+    promote = sub.add_parser("promote", help="Eine Version aktivieren")
+    promote.add_argument("version")
+
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "train":
+            train_model(
+                history_path=args.history, n_folds=args.folds, val_weeks=args.val_weeks,
+                n_trials=args.trials, workers=args.workers, seed=args.seed, promote=args.promote,
+                use_segment_trends=args.segment_trends
+            )
+        elif args.command == "update":
+            update_model(
+                history_path=args.history, since=args.since, val_weeks=args.val_weeks,
+                num_rounds=args.rounds, seed=args.seed, promote=not args.no_promote
+            )
+        elif args.command == "promote":
+            promote_version(args.version, MODEL_DIR)
+            print(f"Version {args.version} ist jetzt aktiv.")
+        else:
+            print(format_versions(load_registry(MODEL_DIR)))
+    except ValueError as e:
+        print(f"Fehler: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
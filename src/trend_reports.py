@@ -1,53 +1,111 @@
 import os
+import time
+
 import pandas as pd
-from google import genai
 
-def generate_gemini_report(df_display, top_10):
+from .explanations import format_drivers
+from .report_cache import report_key, shared_report_cache
+
+GEMINI_MODEL = "models/gemini-2.5-flash"
+
+# Maximale Dauer eines gestreamten Berichts (Sekunden), über GEMINI_TIMEOUT einstellbar
+REPORT_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT", "90"))
+
+# Anzahl Genres im Prompt
+TOP_GENRES = 5
+
+# Schwelle für „Rising Artists“ im Prompt (wie der KPI der Radar-Seite)
+RISING_THRESHOLD = 0.9
+
+# Wie oft der Stream auf Abbruch/Zeitüberschreitung prüft
+POLL_SECONDS = 0.1
+
+
+def make_client(api_key=None):
     """
-    Erstellt einen KI-Trendbericht basierend auf den aktuellen Dashboard-Daten.
+    genai.Client oder – mit GEMINI_FAKE=1 – der lokale FakeGeminiClient.
+    None, wenn kein API-Key vorhanden ist.
     """
-    # API-Key laden
-    api_key = os.getenv("GOOGLE_API_KEY")
+    if os.getenv("GEMINI_FAKE", "0") != "0":
+        from .fake_gemini import FakeGeminiClient
+        return FakeGeminiClient()
+
+    api_key = api_key or os.getenv("GOOGLE_API_KEY")
     if not api_key:
-        return "Fehler: Kein Google API Key in der .env gefunden."
-        
-    client = genai.Client(api_key=api_key)
+        return None
 
-    # Datencheck
-    if df_display.empty:
-        return "Keine Daten verfügbar, um einen Bericht zu erstellen."
+    # google-genai erst bei Bedarf importieren (teurer Import)
+    from google import genai
+    return genai.Client(api_key=api_key)
 
-    if top_10.empty:
-        return "Top-10-Daten fehlen. Ein Bericht kann nicht erstellt werden."
-    
+
+def genre_list(value) -> list:
+    return value if isinstance(value, list) else [str(value)] if pd.notna(value) else ["unknown"]
+
+
+def report_inputs(df_display, top_10, explanations=None) -> dict:
+    """
+    Alle Werte, die in den Prompt eingehen (JSON-serialisierbar).
+    Gleiche Eingaben → gleicher Cache-Schlüssel → gleicher Bericht.
+    """
     # Daten-Aggregation für den Prompt
     if "artist_genres" in df_display.columns:
         df_genres = df_display.copy()
-        df_genres["artist_genres"] = df_genres["artist_genres"].apply(
-            lambda x: x if isinstance(x, list) else [str(x)] if pd.notna(x) else ["unknown"]
-        )
+        df_genres["artist_genres"] = df_genres["artist_genres"].apply(genre_list)
         df_genres = df_genres.explode("artist_genres")
+        counts = df_genres["artist_genres"].value_counts().rename_axis("genre").reset_index(name="n")
+        # Gleichstand alphabetisch → dieselbe Reihenfolge wie im Batch-Archiv (src.report_archive)
         top_genres = (
-            df_genres["artist_genres"]
-            .value_counts()
-            .head(5)
-            .index
+            counts
+            .sort_values(["n", "genre"], ascending=[False, True])
+            .head(TOP_GENRES)["genre"]
             .tolist()
         )
     else:
         top_genres = ["unknown"]
-        
+
     # Top-Song & Artist
     top_artist = top_10.iloc[0].get("artist_names", "Unbekannter Artist")
     top_song = top_10.iloc[0].get("track_name", "Unbekannter Song")
 
     # Rising Artists
     rising_count = (
-        df_display["probability"] >= 0.9
+        df_display["probability"] >= RISING_THRESHOLD
     ).sum() if "probability" in df_display.columns else 0
-        
 
-    prompt = f"""
+    # Einflussfaktoren der Top 10 (Lookup, kein erneutes Scoring)
+    drivers = driver_lines(top_10, explanations)
+
+    return {
+        "top_genres": [str(g) for g in top_genres],
+        "top_artist": str(top_artist),
+        "top_song": str(top_song),
+        "rising_count": int(rising_count),
+        "n_tracks": len(df_display),
+        "drivers": drivers,
+    }
+
+
+def driver_lines(top_10, explanations) -> list:
+    """Eine Zeile pro Top-Song mit den wichtigsten Einflussfaktoren (leer ohne Erklärungen)."""
+    if explanations is None or "row_id" not in top_10.columns:
+        return []
+    return [
+        f"{row['artist_names']} – '{row['track_name']}' ({row['probability']:.0%}): "
+        f"{format_drivers(explanations.top_drivers(row['row_id']))}"
+        for _, row in top_10.iterrows()
+    ]
+
+
+def build_prompt(inputs) -> str:
+    drivers_text = ""
+    if inputs["drivers"]:
+        drivers_text = (
+            "\n    🔍 Wichtigste Einflussfaktoren pro Song (Beitrag in Log-Odds, positiv = erhöht die Wahrscheinlichkeit):\n"
+            + "\n".join(f"    - {line}" for line in inputs["drivers"])
+        )
+
+    return f"""
     Du bist ein professioneller Musik-Datenanalyst für Spotify Trends.
     
     Erstelle eine Prognose für die kommende Woche. 
@@ -57,21 +115,142 @@ def generate_gemini_report(df_display, top_10):
     
     Nutze die Modell-Ergebnisse, um einzuschätzen, welche Artists in der nächsten Woche besonders stark an Momentum gewinnen werden:
     
-    🎧 Prognostisch relevante Genres: {', '.join(top_genres)}
-    ⭐ Höchstbewerteter Artist laut Modell: {top_artist} – Song: '{top_song}'
-    📈 Anzahl prognostizierter Rising Artists (>90% Wahrscheinlichkeit): {rising_count}
-    📊 Datenbasis der Modellberechnung: {len(df_display)} Tracks
+    🎧 Prognostisch relevante Genres: {', '.join(inputs['top_genres'])}
+    ⭐ Höchstbewerteter Artist laut Modell: {inputs['top_artist']} – Song: '{inputs['top_song']}'
+    📈 Anzahl prognostizierter Rising Artists (>90% Wahrscheinlichkeit): {inputs['rising_count']}
+    📊 Datenbasis der Modellberechnung: {inputs['n_tracks']} Tracks{drivers_text}
     
     Schreibe einen kurzen, prägnanten Bericht auf Deutsch.
     Verwende Emojis, klare Bulletpoints und formuliere wie ein echter Musik-Analyst.
     """
 
-    # Anfrage an Gemini 2.5 Flash
+
+def _check_data(df_display, top_10):
+    """Fehlermeldung bei fehlenden Daten, sonst None."""
+    if df_display.empty:
+        return "Keine Daten verfügbar, um einen Bericht zu erstellen."
+    if top_10.empty:
+        return "Top-10-Daten fehlen. Ein Bericht kann nicht erstellt werden."
+    return None
+
+
+def cached_report(df_display, top_10, explanations=None, model=GEMINI_MODEL, cache=None):
+    """Bereits gespeicherter Bericht für genau diese Daten oder None (kein API-Aufruf)."""
+    if _check_data(df_display, top_10):
+        return None
+    cache = cache or shared_report_cache()
+    return cache.get(report_key(report_inputs(df_display, top_10, explanations), model))
+
+
+def generate_gemini_report(df_display, top_10, explanations=None, model=GEMINI_MODEL, cache=None, client=None):
+    """
+    Erstellt einen KI-Trendbericht basierend auf den aktuellen Dashboard-Daten.
+    `explanations` (src.explanations.Explanations) ergänzt die wichtigsten Einflussfaktoren der Top 10.
+    Berichte werden über den Hash der Prompt-Eingaben und des Modells gecacht (src.report_cache).
+    """
+    # API-Key prüfen
+    if client is None and not os.getenv("GOOGLE_API_KEY") and os.getenv("GEMINI_FAKE", "0") == "0":
+        return "Fehler: Kein Google API Key in der .env gefunden."
+
+    # Datencheck
+    error = _check_data(df_display, top_10)
+    if error:
+        return error
+
+    inputs = report_inputs(df_display, top_10, explanations)
+
+    # Anfrage an Gemini (nur bei Cache-Fehlschlag)
     try:
-        response = client.models.generate_content(
-            model="models/gemini-2.5-flash",
-            contents=prompt
-        )
-        return response.text or "Fehler: Leere Antwort von Gemini."
+        report, _ = report_for_inputs(inputs, model, cache, client)
+        return report
     except Exception as e:
         return f"KI-Fehler: {str(e)}"
+
+
+def request_report(inputs, model=GEMINI_MODEL, client=None) -> str:
+    """Ein API-Aufruf ohne Cache; Fehler (auch leere Antworten) werden als Exception gemeldet."""
+    response = (client or make_client()).models.generate_content(
+        model=model,
+        contents=build_prompt(inputs)
+    )
+    if not response.text:
+        raise ValueError("Leere Antwort von Gemini.")
+    return response.text
+
+
+def report_for_inputs(inputs, model=GEMINI_MODEL, cache=None, client=None):
+    """Bericht für fertige Prompt-Eingaben über den Berichts-Cache. Rückgabe: (text, hit)."""
+    cache = cache or shared_report_cache()
+    return cache.get_or_create(
+        report_key(inputs, model), lambda: request_report(inputs, model, client), model=model
+    )
+
+
+# ____ STREAMING ____
+def _stream_worker(client, model, prompt, stream) -> bool:
+    """Läuft im Hintergrund-Thread: Stücke in den gemeinsamen Stream legen. Rückgabe: vollständig?"""
+    for chunk in client.models.generate_content_stream(model=model, contents=prompt):
+        if stream.stop.is_set():
+            return False
+        if chunk.text:
+            stream.append(chunk.text)
+    return True
+
+
+def stream_gemini_report(df_display, top_10, explanations=None, model=GEMINI_MODEL, cache=None,
+                         client=None, timeout=REPORT_TIMEOUT_SECONDS, cancel=None):
+    """
+    Wie generate_gemini_report, aber als Generator von Textstücken (z. B. für st.write_stream).
+    Der API-Aufruf läuft in einem eigenen Thread; gleiche gleichzeitige Anfragen teilen sich
+    einen Stream (ReportCache.join_stream, Folgeanfragen lesen ab dem ersten Stück mit).
+    Der Generator wartet jeweils höchstens POLL_SECONDS auf das nächste Stück und bricht ab, wenn
+    - `timeout` Sekunden insgesamt überschritten sind (Meldung wird als letztes Stück geliefert),
+    - `cancel` (threading.Event) gesetzt ist oder der Generator geschlossen wird (Streamlit-Rerun).
+    Der API-Stream selbst endet erst, wenn kein Leser mehr übrig ist.
+    Nur vollständige Berichte landen im Cache; ein Cache-Treffer kommt als ein einziges Stück.
+    """
+    if client is None and not os.getenv("GOOGLE_API_KEY") and os.getenv("GEMINI_FAKE", "0") == "0":
+        yield "Fehler: Kein Google API Key in der .env gefunden."
+        return
+
+    error = _check_data(df_display, top_10)
+    if error:
+        yield error
+        return
+
+    inputs = report_inputs(df_display, top_10, explanations)
+    cache = cache or shared_report_cache()
+    key = report_key(inputs, model)
+
+    cached = cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    client = client or make_client()
+    prompt = build_prompt(inputs)
+    stream = cache.join_stream(key, lambda s: _stream_worker(client, model, prompt, s), model)
+
+    deadline = time.monotonic() + timeout
+    position = 0
+    try:
+        while True:
+            if cancel is not None and cancel.is_set():
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                yield f"\n\nKI-Fehler: Keine vollständige Antwort nach {timeout:g} Sekunden."
+                return
+
+            parts, done = stream.read(position, min(remaining, POLL_SECONDS))
+            position += len(parts)
+            yield from parts
+            if done:
+                break
+
+        if stream.error is not None:
+            yield f"\n\nKI-Fehler: {str(stream.error)}"
+        elif position == 0:
+            yield "Fehler: Leere Antwort von Gemini."
+    finally:
+        cache.leave_stream(key, stream)
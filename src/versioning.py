@@ -0,0 +1,44 @@
+import hashlib
+from pathlib import Path
+
+import pandas as pd
+
+MODEL_DIR = "models/"
+
+# Spalten, die eine Datenversion eindeutig beschreiben
+VERSION_COLUMNS = ["ds", "chart_week", "region", "track_id", "streams", "probability", "is_future"]
+
+
+def data_version(df, columns=VERSION_COLUMNS) -> str:
+    """
+    Kurzer, stabiler Fingerprint eines DataFrames (Form + Inhalt der Schlüsselspalten).
+    Dient als Cache-Schlüssel für vorberechnete Strukturen.
+    """
+    h = hashlib.sha1()
+    h.update(str(df.shape).encode())
+
+    for col in [c for c in columns if c in df.columns]:
+        values = df[col]
+        # Listen/Objekte sind nicht direkt hashbar -> als String hashen
+        if values.dtype == object:
+            values = values.astype(str)
+        h.update(col.encode())
+        h.update(pd.util.hash_pandas_object(values, index=False).values.tobytes())
+
+    return h.hexdigest()[:16]
+
+
+def model_version(model_dir=MODEL_DIR) -> str:
+    """Fingerprint der Modell-Artefakte (Dateiname, Größe, Änderungszeit)."""
+    h = hashlib.sha1()
+    for path in sorted(Path(model_dir).glob("*")):
+        if path.is_file():
+            stat = path.stat()
+            h.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return h.hexdigest()[:16]
+
+
+def file_version(path) -> str:
+    """Fingerprint einer Datendatei (Größe + Änderungszeit), z. B. für den Figuren-Cache."""
+    stat = Path(path).stat()
+    return hashlib.sha1(f"{Path(path).name}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
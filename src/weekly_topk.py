@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+TOPK_KEYS = ["artist_names", "track_name"]
+
+
+# ____ TOP-K PRO WOCHE ____
+def build_weekly_topk(df, k=10, value_col="probability", keys=TOPK_KEYS):
+    """
+    Baut einmal pro Scoring-Lauf die Top-K Songs jeder Woche.
+    1. Pro (Woche, Künstler, Song) nur die Zeile mit der höchsten Wahrscheinlichkeit
+    2. Pro Woche Top-K per argpartition (Partial Sort), danach nur K Werte sortieren
+
+    Rückgabe (dict):
+        weeks     – sortierte Wochen (Timestamps)
+        is_future – bool pro Woche
+        topk      – {Woche: DataFrame mit höchstens K Zeilen, absteigend sortiert}
+        k         – K, mit dem der Speicher gebaut wurde (mehr Zeilen gibt es nicht)
+    """
+    df = df.dropna(subset=[value_col])
+
+    # Deduplizieren: beste Zeile pro (Woche, Künstler, Song)
+    best_idx = df.groupby(["ds"] + keys, sort=False, dropna=False, observed=True)[value_col].idxmax()
+    dedup = df.loc[best_idx.to_numpy()].sort_values("ds", kind="stable")
+
+    ds = dedup["ds"].to_numpy()
+    values = dedup[value_col].to_numpy()
+    if len(ds):
+        starts = np.flatnonzero(np.r_[True, ds[1:] != ds[:-1]])
+    else:
+        starts = np.array([], dtype=int)
+    stops = np.r_[starts[1:], len(ds)].astype(int)
+
+    topk = {}
+    is_future = []
+    for start, stop in zip(starts, stops):
+        segment = values[start:stop]
+        n = min(k, len(segment))
+        part = np.argpartition(-segment, n - 1)[:n]
+        order = part[np.argsort(-segment[part], kind="stable")]
+
+        week = pd.Timestamp(ds[start])
+        rows = dedup.iloc[start + order]
+        topk[week] = rows.reset_index(drop=True)
+        is_future.append(bool(rows["is_future"].any()) if "is_future" in rows.columns else False)
+
+    return {
+        "weeks": list(topk),
+        "is_future": np.array(is_future, dtype=bool),
+        "topk": topk,
+        "k": k,
+    }
+
+
+# ____ ZUGRIFF ____
+def last_hist_week(store):
+    """Letzte historische Woche (oder None)."""
+    weeks = [w for w, fut in zip(store["weeks"], store["is_future"]) if not fut]
+    return weeks[-1] if weeks else None
+
+
+def first_future_week(store):
+    """Erste Forecast-Woche (oder None)."""
+    weeks = [w for w, fut in zip(store["weeks"], store["is_future"]) if fut]
+    return weeks[0] if weeks else None
+
+
+def get_topk(store, week, k=10):
+    """Top-K einer Woche; leerer DataFrame, falls die Woche fehlt."""
+    if store is None or week is None or week not in store["topk"]:
+        return pd.DataFrame()
+    return store["topk"][week].head(k)